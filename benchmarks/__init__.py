@@ -0,0 +1,10 @@
+import os
+
+# The benchmarks always render through EGL, so PyOpenGL must be told before it
+# is first imported.
+if 'PYOPENGL_PLATFORM' not in os.environ:
+    os.environ['PYOPENGL_PLATFORM'] = 'egl'
+
+# pylint: disable=wrong-import-position
+from . import bench_ingest  # noqa: F401
+from . import bench_render  # noqa: F401
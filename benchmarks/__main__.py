@@ -0,0 +1,12 @@
+'''
+Runs the benchmarks headlessly; see harness.py.  Use as:
+
+    python3 -m benchmarks [--quick] [-o results.json] [-c previous.json]
+'''
+import sys
+
+from .harness import main
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+'''
+Benchmarks of getting data onto the GPU: appending to and replacing the data
+of a Series or of a DataBuffer shared by several plots, and raw VBO uploads.
+'''
+import numpy as np
+
+import glotlib
+from glotlib.vbo import VBO
+
+from .harness import benchmark, measure
+
+
+APPEND_CHUNKS = (100, 10000)
+
+
+def _measure_append(ctx, n, chunk):
+    X     = np.arange(n, dtype=np.float64)
+    Y     = np.sin(X / 100)
+    state = {}
+
+    def setup():
+        p              = ctx.new_plot(limits=(0, -1, n, 1))
+        state['s']     = p.add_lines(X=X[:0], Y=Y[:0])
+        state['index'] = 0
+
+    def append():
+        i = state['index'] % n
+        if i == 0:
+            state['s'].set_x_y_data(X[:0], Y[:0])
+        state['s'].append_x_y_data(X[i:i + chunk], Y[i:i + chunk])
+        state['index'] = i + chunk
+
+    return measure(ctx, 'series.append_x_y_data', append,
+                   params={'n' : n, 'chunk' : chunk}, items=chunk,
+                   unit='points', setup=setup)
+
+
+@benchmark
+def bench_append(ctx):
+    '''
+    Points per second appended to a series through append_x_y_data(), in
+    chunks of each of the APPEND_CHUNKS sizes, until the series holds n
+    points and then starting over.
+    '''
+    for chunk in APPEND_CHUNKS:
+        for n in ctx.sizes:
+            if n >= chunk:
+                yield _measure_append(ctx, n, chunk)
+
+
+def _measure_set_y_data(ctx, n):
+    X = np.arange(n, dtype=np.float64)
+    Y = [np.sin(X / 100), np.cos(X / 100)]
+    p = ctx.new_plot(limits=(0, -1, n, 1))
+    s = p.add_lines(X=X, Y=Y[0])
+
+    def set_y():
+        Y.reverse()
+        s.set_y_data(Y[0])
+
+    return measure(ctx, 'series.set_y_data', set_y, params={'n' : n},
+                   items=n, unit='points')
+
+
+@benchmark
+def bench_set_y_data(ctx):
+    '''
+    Latency of replacing all the Y values of a series of each size.
+    '''
+    for n in ctx.sizes:
+        yield _measure_set_y_data(ctx, n)
+
+
+def _set_y_data(targets, Y):
+    Y.reverse()
+    for t in targets:
+        t.set_y_data(Y[0])
+
+
+@benchmark
+def bench_shared_set_y_data(ctx):
+    '''
+    Latency of replacing all the Y values of data shown in two plots, held
+    either in a RENORM_GPU series per plot or in a single DataBuffer drawn by
+    both plots.
+    '''
+    w = ctx.window
+    for n in ctx.sizes:
+        X = np.arange(n, dtype=np.float64)
+        Y = [np.sin(X / 100), np.cos(X / 100)]
+        for shared in (False, True):
+            w.clear()
+            ps = [w.add_plot(b, limits=(0, -1, n, 1)) for b in (211, 212)]
+            if shared:
+                buf     = glotlib.DataBuffer(X=X, Y=Y[0])
+                targets = [buf]
+                for p in ps:
+                    p.add_lines(data=buf)
+            else:
+                buf     = None
+                targets = [p.add_lines(X=X, Y=Y[0],
+                                       renorm_mode=glotlib.RENORM_GPU)
+                           for p in ps]
+
+            yield measure(ctx, 'plots.set_y_data',
+                          (lambda targets=targets, Y=Y:
+                           _set_y_data(targets, Y)),
+                          params={'n' : n, 'shared' : shared}, items=n,
+                          unit='points')
+            w.clear()
+            if buf is not None:
+                buf._destroy()
+
+
+@benchmark
+def bench_vbo_upload(ctx):
+    '''
+    Bandwidth of replacing all the data in a VBO of 2-component float32
+    vertices, with and without buffer orphaning.
+    '''
+    for streaming in (False, True):
+        for n in ctx.sizes:
+            V   = np.zeros((n, 2), dtype=np.float32)
+            vbo = VBO(V, ncomponents=2, streaming=streaming)
+
+            yield measure(ctx, 'vbo.set_data',
+                          lambda vbo=vbo, V=V: vbo.set_data(V, copy=False),
+                          params={'n' : n, 'streaming' : streaming},
+                          items=V.nbytes / 1e6, unit='MB')
+            vbo._destroy()
@@ -0,0 +1,143 @@
+'''
+Benchmarks of the per-frame work: tick generation while dragging a plot, text
+layout and drawing a whole frame.
+'''
+import math
+
+import numpy as np
+
+import glotlib
+from glotlib import fonts
+from glotlib.window import MouseButtonState
+
+from .harness import benchmark, measure
+
+
+DRAG_STEPS  = 100
+SHARED_ROWS = 20
+TEXT        = 'The quick brown fox jumps over the lazy dog. 0123456789\n' * 4
+
+
+def _drag_positions(p):
+    xc = p.x + p.w / 2
+    yc = p.y + p.h / 2
+    return [(xc + p.w / 4 * math.sin(i * 2 * math.pi / DRAG_STEPS),
+             yc + p.h / 4 * math.cos(i * 2 * math.pi / DRAG_STEPS))
+            for i in range(DRAG_STEPS)]
+
+
+def _measure_drag(ctx, name, p, events_per_frame):
+    mbs   = MouseButtonState(p, glotlib.MOUSE_BUTTON_LEFT, p.x + p.w / 2,
+                             p.y + p.h / 2, 0)
+    pos   = _drag_positions(p)
+    state = {'i' : 0}
+
+    def frame():
+        for _ in range(events_per_frame):
+            state['i'] = (state['i'] + 1) % DRAG_STEPS
+            p.handle_mouse_moved(*pos[state['i']])
+        for q in ctx.window.plots:
+            q._apply_pending_view()
+
+    p.handle_mouse_down(mbs)
+    r = measure(ctx, name, frame, params={'events' : events_per_frame})
+    p.handle_mouse_up(mbs)
+    return r
+
+
+@benchmark
+def bench_drag(ctx):
+    '''
+    The per-frame cost of dragging a plot, with one and several mouse-move
+    events per frame, alone and as the top plot of a column of SHARED_ROWS
+    plots sharing the X axis, and the cost of tick generation alone.
+    '''
+    p = ctx.new_plot(limits=(0, -1, 1000, 1))
+    for events in (1, 4):
+        yield _measure_drag(ctx, 'plot.drag', p, events)
+    yield measure(ctx, 'plot._gen_ticks', p._gen_ticks)
+
+    p = ctx.new_plot(bounds=(SHARED_ROWS, 1, 1), limits=(0, -1, 1000, 1))
+    for i in range(2, SHARED_ROWS + 1):
+        ctx.window.add_plot((SHARED_ROWS, 1, i), limits=(0, -1, 1000, 1),
+                            sharex=p)
+    for events in (1, 4):
+        yield _measure_drag(ctx, 'plot.drag_shared', p, events)
+
+
+@benchmark
+def bench_text_layout(ctx):
+    '''
+    Characters per second laid out by gen_vertices_left() for each kind of
+    font.
+    '''
+    fonts_by_kind = {
+        'static'  : fonts.vera(12, 0),
+        'dynamic' : fonts.vera(12, 0, dynamic=True),
+        'sdf'     : fonts.vera.sdf(12),
+    }
+    for kind, font in fonts_by_kind.items():
+        yield measure(ctx, 'font.gen_vertices_left',
+                      lambda font=font: font.gen_vertices_left(TEXT),
+                      params={'font' : kind}, items=len(TEXT), unit='chars')
+
+
+@benchmark
+def bench_frame(ctx):
+    '''
+    End-to-end time to draw and resolve a frame of a plot holding a series of
+    each size, zoomed out to show all of it and zoomed in on a small part.
+    The plot is marked dirty every frame so that the series is redrawn rather
+    than copied from the plot's cache.
+    '''
+    w = ctx.window
+    for n in ctx.sizes:
+        X = np.linspace(0, 2 * math.pi, n)
+        p = ctx.new_plot(limits=(0, -1.1, 2 * math.pi, 1.1))
+        p.add_lines(X=X, Y=np.sin(X * 50))
+
+        def draw(p=p):
+            p.dirty = True
+            w.mark_dirty()
+            w._draw(0)
+
+        yield measure(ctx, 'window.frame', draw,
+                      params={'n' : n, 'view' : 'all'}, items=n,
+                      unit='points')
+
+        p._set_x_lim(math.pi, math.pi + 0.01)
+        yield measure(ctx, 'window.frame', draw,
+                      params={'n' : n, 'view' : 'zoomed'})
+    w.clear()
+
+
+@benchmark
+def bench_grid_frame(ctx):
+    '''
+    Time to draw a frame of a 3x3 grid of plots holding a series of each size
+    when only one of the plots has changed and when none of them have, with
+    the plots' caches enabled and disabled.
+    '''
+    w = ctx.window
+    for n in ctx.sizes[:-1]:
+        X = np.linspace(0, 2 * math.pi, n)
+        for cached in (True, False):
+            w.clear()
+            ps = [w.add_plot((3, 3, i + 1), limits=(0, -1.1, 2 * math.pi, 1.1),
+                             cached=cached)
+                  for i in range(9)]
+            for p in ps:
+                p.add_lines(X=X, Y=np.sin(X * 50))
+
+            def draw(live=ps[4]):
+                if live:
+                    live.dirty = True
+                w.mark_dirty()
+                w._draw(0)
+
+            yield measure(ctx, 'window.grid_frame', draw,
+                          params={'n' : n, 'cached' : cached, 'live' : 1})
+            yield measure(ctx, 'window.grid_frame',
+                          lambda draw=draw: draw(None),
+                          params={'n' : n, 'cached' : cached, 'live' : 0})
+    w.clear()
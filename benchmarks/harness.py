@@ -0,0 +1,191 @@
+'''
+A minimal benchmark harness.  Benchmark functions are registered with the
+@benchmark decorator; each one is passed the Context and generates its
+results with measure(), which times a callable over several repeats and
+returns the median time per call along with a throughput derived from it.
+
+Results are written as JSON so that runs on different commits can be compared
+with --compare.  Every result is identified by its name and its parameters.
+'''
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+from OpenGL import GL
+
+from glotlib.offscreen import OffscreenWindow
+
+
+MIN_TIME  = 0.1
+REPEAT    = 5
+THRESHOLD = 0.1
+
+SIZES       = (1000, 10000, 100000, 1000000, 10000000)
+QUICK_SIZES = (1000, 10000, 100000)
+
+BENCHMARKS = []
+
+
+def benchmark(f):
+    BENCHMARKS.append(f)
+    return f
+
+
+class Context:
+    '''
+    The state shared by all the benchmarks: a headless window whose GL context
+    is current and the list of data sizes to run at.
+    '''
+    def __init__(self, sizes, min_time=MIN_TIME, repeat=REPEAT):
+        self.sizes    = sizes
+        self.min_time = min_time
+        self.repeat   = repeat
+        self.window   = OffscreenWindow(800, 600, msaa=4)
+
+    def new_plot(self, **kwargs):
+        self.window.clear()
+        return self.window.add_plot(**kwargs)
+
+
+def measure(ctx, name, f, params=None, items=None, unit=None, setup=None):
+    '''
+    Times calls to f() and returns a result dict.  Calls are batched so that
+    each of the ctx.repeat timed batches lasts at least ctx.min_time, and the
+    median time per call is reported.  If setup is given it is called before
+    each batch, outside the timing.  If items is given, it is the number of
+    units of work done by each call and the result includes the throughput in
+    unit per second.  GL work is included in the time since glFinish() is
+    called at the end of each batch.
+    '''
+    def run_batch(n):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        for _ in range(n):
+            f()
+        GL.glFinish()
+        return time.perf_counter() - t0
+
+    n  = 1
+    dt = run_batch(n)
+    while dt < ctx.min_time:
+        n  = max(n * 2, int(n * ctx.min_time / max(dt, 1e-6)))
+        dt = run_batch(n)
+
+    times = [dt / n] + [run_batch(n) / n for _ in range(ctx.repeat - 1)]
+    r     = {
+        'name'    : name,
+        'params'  : params or {},
+        'seconds' : float(np.median(times)),
+        'min'     : float(np.min(times)),
+        'calls'   : n,
+    }
+    if items is not None:
+        r['rate']      = items / r['seconds']
+        r['rate_unit'] = '%s/s' % unit
+    return r
+
+
+def _key(r):
+    return (r['name'], tuple(sorted(r['params'].items())))
+
+
+def _format_params(params):
+    return ' '.join('%s=%s' % kv for kv in sorted(params.items()))
+
+
+def _format_result(r):
+    s = '%-28s %-22s %12.3f us' % (r['name'], _format_params(r['params']),
+                                   r['seconds'] * 1e6)
+    if 'rate' in r:
+        s += '  %12.4g %s' % (r['rate'], r['rate_unit'])
+    return s
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                       stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(old, new, threshold=THRESHOLD):
+    '''
+    Prints the ratio of new to old time for each result present in both runs,
+    flagging changes larger than the threshold fraction, and returns the
+    number of regressions.
+    '''
+    old_results = {_key(r): r for r in old['results']}
+    regressions = 0
+    for r in new['results']:
+        o = old_results.get(_key(r))
+        if o is None:
+            continue
+
+        ratio = r['seconds'] / o['seconds']
+        if ratio > 1 + threshold:
+            flag         = 'SLOWER'
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = 'faster'
+        else:
+            flag = ''
+        print('%-28s %-22s %8.3fx %s' % (r['name'],
+                                         _format_params(r['params']), ratio,
+                                         flag))
+    return regressions
+
+
+def run(ctx, pattern=None):
+    results = []
+    for f in BENCHMARKS:
+        if pattern and pattern not in f.__name__:
+            continue
+        for r in f(ctx):
+            print(_format_result(r))
+            sys.stdout.flush()
+            results.append(r)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', '-o',
+                        help='file to write the JSON results to')
+    parser.add_argument('--compare', '-c',
+                        help='JSON results of a previous run to compare with')
+    parser.add_argument('--filter', '-k',
+                        help='only run benchmarks whose name contains this')
+    parser.add_argument('--quick', action='store_true',
+                        help='only run at sizes up to %u points' %
+                        QUICK_SIZES[-1])
+    parser.add_argument('--min-time', type=float, default=MIN_TIME)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    rv = parser.parse_args()
+
+    ctx = Context(QUICK_SIZES if rv.quick else SIZES, min_time=rv.min_time,
+                  repeat=rv.repeat)
+    out = {
+        'commit'   : _git_commit(),
+        'time'     : time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python'   : platform.python_version(),
+        'machine'  : platform.machine(),
+        'renderer' : GL.glGetString(GL.GL_RENDERER).decode(),
+        'results'  : run(ctx, rv.filter),
+    }
+
+    if rv.output:
+        with open(rv.output, 'w', encoding='utf-8') as f:
+            json.dump(out, f, indent=2)
+
+    if rv.compare:
+        with open(rv.compare, encoding='utf-8') as f:
+            old = json.load(f)
+        if compare(old, out):
+            sys.exit(1)
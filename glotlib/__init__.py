@@ -1,8 +1,15 @@
 from . import miter_lines  # noqa: F401
+from .data_buffer import DataBuffer
 from .label import Label
-from .main import (init_fonts, animate, interact, stop, wakeup, get_frame_time,
-                   FPS, get_fps, periodic)
+from .main import (init_fonts, animate, interact, run, stop, wakeup,
+                   get_frame_time, FPS, get_fps, periodic)
 from .program import Program
+from .gl_state import get_stats as get_gl_stats
+from .gl_state import reset_stats as reset_gl_stats
+from .profiler import enable as enable_profiler
+from .profiler import disable as disable_profiler
+from .profiler import get_frames as get_profile
+from .profiler import get_summary as get_profile_summary
 from .window import Window
 
 from .constants import (  # noqa: F401
@@ -13,20 +20,32 @@ from .constants import (  # noqa: F401
     ASPECT_NONE,
     ASPECT_SQUARE,
 
+    RENORM_CPU,
+    RENORM_GPU,
+    RENORM_RAW,
+
     KEY_ESCAPE,
 )
 
 
 __all__ = [
     'animate',
+    'DataBuffer',
+    'disable_profiler',
+    'enable_profiler',
     'FPS',
     'get_fps',
     'get_frame_time',
+    'get_gl_stats',
+    'get_profile',
+    'get_profile_summary',
     'init_fonts',
     'interact',
     'periodic',
     'Label',
     'Program',
+    'reset_gl_stats',
+    'run',
     'stop',
     'wakeup',
     'Window',
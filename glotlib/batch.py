@@ -0,0 +1,134 @@
+'''
+Batch rendering of plot specifications to PNG images across a pool of worker
+processes.  Each worker owns its own headless GL context (see offscreen.py)
+and keeps it, along with its compiled programs, font atlases and offscreen
+windows, for all the jobs it renders, so that throughput scales with the
+number of cores.
+
+A specification is a dict built from plain Python and numpy values so that it
+can be sent to a worker:
+
+    {
+        'size'   : (w, h),      # Image size in pixels, default (800, 600).
+        'msaa'   : True,        # Whether to antialias, default True.
+        'path'   : 'out.png',   # Optional; see below.
+        'plots'  : [plot, ...],
+        'labels' : [label, ...],
+    }
+
+Each plot is a dict of keyword arguments for Window.add_plot(), such as bounds
+and limits, plus the following optional keys:
+
+    'series'  : a list of series dicts.
+    'x_label' : the text of the X axis label.
+    'y_label' : the text of the Y axis label.
+
+If a plot has no limits, its bounds are snapped to its data.  Each series is a
+dict with a 'kind' key, one of the keys of SERIES_KINDS and defaulting to
+'lines', whose remaining keys are keyword arguments for the matching Plot
+method; for instance {'X' : X, 'Y' : Y, 'width' : 2}.  Each label is a dict
+of keyword arguments for Window.add_label(), such as pos, text and anchor.
+
+The result of a job is the PNG-encoded image, or the path it was written to if
+the specification has a 'path' key; writing the file from the worker avoids
+sending the image back to the parent process.
+
+As for any OffscreenWindow, PYOPENGL_PLATFORM must be set to 'egl' before
+glotlib is imported, and the workers inherit it from the parent process.
+'''
+import multiprocessing
+
+from . import offscreen
+
+
+DEFAULT_SIZE = (800, 600)
+
+SERIES_KINDS = {
+    'lines'  : 'add_lines',
+    'points' : 'add_points',
+    'steps'  : 'add_steps',
+    'hline'  : 'add_hline',
+    'vline'  : 'add_vline',
+}
+
+# The offscreen windows of this process, keyed by (w, h, msaa), which are
+# reused from one job to the next.
+WINDOWS = {}
+
+
+def _get_window(size, msaa):
+    key = (size[0], size[1], msaa)
+    w   = WINDOWS.get(key)
+    if w is None:
+        w = offscreen.OffscreenWindow(size[0], size[1],
+                                      msaa=4 if msaa else None)
+        WINDOWS[key] = w
+    else:
+        w.clear()
+    return w
+
+
+def _add_plot(w, spec):
+    spec    = dict(spec)
+    series  = spec.pop('series', [])
+    x_label = spec.pop('x_label', None)
+    y_label = spec.pop('y_label', None)
+
+    p = w.add_plot(**spec)
+    for s in series:
+        s    = dict(s)
+        kind = s.pop('kind', 'lines')
+        if kind not in SERIES_KINDS:
+            raise Exception('Unknown series kind "%s".' % kind)
+        getattr(p, SERIES_KINDS[kind])(**s)
+
+    if x_label is not None:
+        p.set_x_label(x_label)
+    if y_label is not None:
+        p.set_y_label(y_label)
+    if 'limits' not in spec:
+        p.snap_bounds()
+
+    return p
+
+
+def render_spec(spec):
+    '''
+    Renders a single specification in this process and returns the result.
+    '''
+    w = _get_window(spec.get('size', DEFAULT_SIZE), spec.get('msaa', True))
+    for p in spec.get('plots', []):
+        _add_plot(w, p)
+    for l in spec.get('labels', []):
+        w.add_label(**l)
+
+    pixels = w.read_pixels()
+    path   = spec.get('path')
+    if path is not None:
+        offscreen.write_png(path, pixels)
+        return path
+    return offscreen.encode_png(pixels)
+
+
+def _render_indexed(job):
+    index, spec = job
+    return index, render_spec(spec)
+
+
+def render(specs, processes=None, ordered=True, chunksize=1):
+    '''
+    Renders an iterable of specifications across a pool of processes worker
+    processes, defaulting to one per core, and yields an (index, result)
+    tuple for each one as it completes, where index is the specification's
+    position in specs.  If ordered is False, results are yielded as soon as
+    they are ready rather than in the order of specs.  The specifications
+    are consumed lazily, so they can be generated on the fly.
+
+    The workers are started with the spawn method, since a GL context can't
+    be inherited across a fork, so the main module of the calling program
+    must be importable without side effects.
+    '''
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(processes) as pool:
+        imap = pool.imap if ordered else pool.imap_unordered
+        yield from imap(_render_indexed, enumerate(specs), chunksize)
@@ -8,4 +8,8 @@ MOUSE_BUTTON_MIDDLE = 2
 ASPECT_NONE     = 0
 ASPECT_SQUARE   = 1
 
+RENORM_CPU      = 0
+RENORM_GPU      = 1
+RENORM_RAW      = 2
+
 KEY_ESCAPE      = glfw.KEY_ESCAPE
@@ -0,0 +1,203 @@
+import weakref
+
+import numpy as np
+
+from . import vbo
+from . import renorm
+from . import constants
+from .lod import is_sorted
+from .series import Series, VertexStorageMixin
+
+
+IDENTITY = np.identity(4)
+
+
+class DataBuffer(VertexStorageMixin):
+    '''
+    A set of vertices that any number of series in different plots can draw,
+    each with its own color, width and view, while the data is held only once
+    in host memory and once in a GPU buffer.  This is intended for large data
+    shown in several plots at once, such as an overview plot and a zoomed
+    detail plot, so that the memory used and the cost of updating the data
+    don't scale with the number of plots showing it.  The views are created
+    by passing the buffer to Plot.add_lines() or Plot.add_points() with the
+    data keyword argument.
+
+    The vertices are encoded independently of any plot's renormalization
+    matrix, so the renorm_mode must be RENORM_GPU, which keeps the full
+    float64 precision of the data, or RENORM_RAW, which halves the memory at
+    the cost of float32 precision.  The level-of-detail pyramid for sorted
+    data is shared by all the views too.
+
+    GL objects can only be shared by plots whose windows use the same GL
+    context: all the plots of a Window, or of all the OffscreenWindows.  The
+    buffer must be created while that context is current, for instance after
+    creating the window.
+
+    The data setters have the same semantics as those of Series, and calling
+    them through one of the views is the same as calling them on the buffer.
+    '''
+    def __init__(self, points=None, *, X=None, Y=None,
+                 renorm_mode=constants.RENORM_GPU, streaming=False):
+        self.renorm = Series.RENORM_MAP[renorm_mode]
+        if self.renorm.RENORMALIZE:
+            raise Exception('DataBuffer requires RENORM_GPU or RENORM_RAW '
+                            'mode.')
+
+        if points is not None:
+            vertices = np.array(points, dtype=self.renorm.DTYPE)
+        else:
+            vertices = np.column_stack((X, Y))
+        vertices = np.asarray(vertices, dtype=self.renorm.DTYPE)
+        vertices = vertices.reshape((-1, 2))
+
+        self.vertices = vertices
+        self._storage = vertices
+        self.x_sorted = is_sorted(vertices[:, 0])
+        self.pyramid  = None
+        self.views    = weakref.WeakSet()
+        self.vert_vbo = vbo.DynamicVBO(self._encode(vertices[:, 0],
+                                                    vertices[:, 1]),
+                                       ncomponents=self.renorm.NCOMPONENTS,
+                                       streaming=streaming)
+
+    def _destroy(self):
+        '''
+        Deletes the buffer's GL objects.  Any series still drawing from it
+        must be destroyed first.
+        '''
+        self.vert_vbo._destroy()
+        if self.pyramid is not None:
+            self.pyramid._destroy()
+
+    def _encode(self, X, Y):
+        return renorm.encode(self.renorm, IDENTITY, X, Y)
+
+    def _changed(self, index):
+        '''
+        Called after the vertices from index onwards have been modified, to
+        invalidate the level-of-detail pyramid and the cached images of all
+        the plots drawing the buffer.
+        '''
+        if self.pyramid is not None:
+            self.pyramid.truncate(index)
+        for s in self.views:
+            s.plot.dirty = True
+
+    def set_x_data(self, X):
+        X = np.asarray(X, dtype=self.renorm.DTYPE)
+        self.vertices[:, 0] = X
+        self.x_sorted       = is_sorted(X)
+        self.vert_vbo.set_component_data(self.renorm.X_COMPONENTS,
+                                         self.renorm.encode_axis(X, 1, 0))
+        self._changed(0)
+
+    def set_y_data(self, Y):
+        Y = np.asarray(Y, dtype=self.renorm.DTYPE)
+        self.vertices[:, 1] = Y
+        self.vert_vbo.set_component_data(self.renorm.Y_COMPONENTS,
+                                         self.renorm.encode_axis(Y, 1, 0))
+        self._changed(0)
+
+    def set_x_y_data(self, X, Y):
+        X = np.asarray(X, dtype=self.renorm.DTYPE)
+        Y = np.asarray(Y, dtype=self.renorm.DTYPE)
+        self._set_vertices(X, Y)
+        self.x_sorted = is_sorted(X)
+        self.vert_vbo.set_data(self._encode(X, Y))
+        self._changed(0)
+
+    def sub_x_y_data(self, index, X, Y):
+        if len(X) == 0:
+            return
+
+        X = np.asarray(X, dtype=self.renorm.DTYPE)
+        Y = np.asarray(Y, dtype=self.renorm.DTYPE)
+        n = self._sub_vertices(index, X, Y)
+        self._update_x_sorted(index, index + len(X), n)
+        self.vert_vbo.sub_data(index, self._encode(X, Y))
+        self._changed(index)
+
+    def append_x_y_data(self, X, Y):
+        self.sub_x_y_data(len(self.vertices), X, Y)
+
+
+class BufferSeries(Series):
+    '''
+    A view of a DataBuffer in a plot.  It has its own color, width, point
+    width, visibility and VAOs, while the vertices, the VBO and the level-of-
+    detail pyramid belong to the buffer.  Data set through the view is set on
+    the buffer, so every view of the buffer shows it.
+    '''
+    # The data attributes initialized by Series.__init__() are properties
+    # here, so only the view's own state is initialized.
+    # pylint: disable=super-init-not-called
+    def __init__(self, plot, data, *, color=None, width=1, point_width=None,
+                 visible=True, lod=True, renorm_mode=None, streaming=None):
+        if (renorm_mode is not None and
+                Series.RENORM_MAP[renorm_mode] is not data.renorm):
+            raise ValueError('renorm_mode conflicts with the DataBuffer\'s '
+                             'renorm_mode.')
+        if streaming is not None and streaming != data.vert_vbo.streaming:
+            raise ValueError('streaming conflicts with the DataBuffer\'s '
+                             'streaming mode.')
+
+        self.plot        = plot
+        self.data        = data
+        self.renorm      = data.renorm
+        self.color       = color
+        self.width       = width
+        self.point_width = point_width
+        self.visible     = visible
+        self.lod         = lod
+        self.streaming   = data.vert_vbo.streaming
+        self._gen_vaos()
+        data.views.add(self)
+
+    def _destroy(self):
+        '''
+        Deletes the view's GL objects, leaving the buffer's alone.
+        '''
+        self.data.views.discard(self)
+        self._destroy_vaos()
+
+    @property
+    def vertices(self):
+        return self.data.vertices
+
+    @property
+    def x_sorted(self):
+        return self.data.x_sorted
+
+    @property
+    def vert_vbo(self):
+        return self.data.vert_vbo
+
+    @property
+    def pyramid(self):
+        return self.data.pyramid
+
+    @pyramid.setter
+    def pyramid(self, pyramid):
+        self.data.pyramid = pyramid
+
+    def _encode(self, X, Y):
+        return self.data._encode(X, Y)
+
+    def set_x_data(self, X):
+        self.data.set_x_data(X)
+
+    def set_y_data(self, Y):
+        self.data.set_y_data(Y)
+
+    def set_x_y_data(self, X, Y):
+        self.data.set_x_y_data(X, Y)
+
+    def sub_x_y_data(self, index, X, Y):
+        self.data.sub_x_y_data(index, X, Y)
+
+    def set_raw_data(self, vertices, x_sorted=None):
+        raise Exception('BufferSeries does not support set_raw_data().')
+
+    def append_raw_data(self, vertices):
+        raise Exception('BufferSeries does not support append_raw_data().')
@@ -1,5 +1,7 @@
 import importlib.resources
+import hashlib
 import sys
+import io
 import os
 
 import numpy as np
@@ -7,6 +9,23 @@ import freetype
 
 from OpenGL import GL
 
+from . import gl_state
+from . import programs
+
+
+# Bump this whenever the format of the cached atlases changes.
+ATLAS_CACHE_VERSION = 2
+
+# Width of a dynamic atlas and its initial height; it doubles in height
+# whenever it runs out of room.
+DYNAMIC_ATLAS_W = 1024
+DYNAMIC_ATLAS_H = 64
+
+# Size at which SDFAtlas glyphs are rasterized, and the distance in texels
+# over which their signed distance fields range from 0 to 255.
+SDF_SIZE   = 48
+SDF_SPREAD = 6
+
 
 def is_pow2(v):
     '''
@@ -75,11 +94,18 @@ class Glyph:
 
 
 class Font:
+    '''
+    A face rasterized at a specific size.  Glyph texture coordinates are in
+    texels; tex_scale converts them to normalized coordinates and is passed
+    to the text shader, so that the coordinates stay valid if the atlas is
+    resized.
+    '''
     def __init__(self, tex_data, glyphs, oversample_log2, ascender, height,
                  size):
         self.tex_data   = tex_data
-        self.tex_w      = tex_data.shape[1]
-        self.tex_h      = tex_data.shape[0]
+        self.tex_w      = None
+        self.tex_h      = None
+        self.tex_scale  = None
         self.glyphs     = glyphs
         self.oversample = (1 << oversample_log2)
         self.ascender   = ascender
@@ -87,21 +113,88 @@ class Font:
         self.size       = size
         self.tex        = GL.glGenTextures(1)
         self.bind_unit  = None
+        self._gen_glyph_arrays()
 
-        GL.glBindTexture(GL.GL_TEXTURE_2D, self.tex)
+        gl_state.bind_texture(0, GL.GL_TEXTURE_2D, self.tex)
         GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER,
                            GL.GL_NEAREST)
         GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER,
                            GL.GL_NEAREST)
-        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_R8, tex_data.shape[1],
-                        tex_data.shape[0], 0, GL.GL_RED, GL.GL_UNSIGNED_BYTE,
-                        tex_data)
+        self._upload_texture()
+
+    def _upload_texture(self):
+        '''
+        Uploads the entire atlas, reallocating the texture storage.
+        '''
+        self.tex_w     = self.tex_data.shape[1]
+        self.tex_h     = self.tex_data.shape[0]
+        self.tex_scale = (1 / self.tex_w, 1 / self.tex_h)
+
+        gl_state.bind_texture(0, GL.GL_TEXTURE_2D, self.tex)
+        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_R8, self.tex_w, self.tex_h,
+                        0, GL.GL_RED, GL.GL_UNSIGNED_BYTE, self.tex_data)
 
     def bind(self, unit):
-        GL.glActiveTexture(GL.GL_TEXTURE0 + unit)
-        GL.glBindTexture(GL.GL_TEXTURE_2D, self.tex)
+        gl_state.bind_texture(unit, GL.GL_TEXTURE_2D, self.tex)
         self.bind_unit = unit
 
+    @staticmethod
+    def program():
+        '''
+        Returns the Program used to draw text in this font.
+        '''
+        return programs.text
+
+    def _gen_glyph_index(self, chars):
+        '''
+        Returns the table mapping each codepoint to its row in the glyph
+        arrays, given the sorted list of chars that have rows.
+        '''
+        glyph_index = np.full(max(ord(chars[-1]) if chars else 0,
+                                  ord('\n')) + 2, -1, dtype=np.int32)
+        glyph_index[[ord(c) for c in chars]] = np.arange(1, len(chars) + 1)
+        glyph_index[ord('\n')] = 0
+        return glyph_index
+
+    def _gen_glyph_arrays(self):
+        '''
+        Packs the glyph metrics into arrays so that whole strings can be laid
+        out with array operations.  glyph_index maps a codepoint to a row in
+        the arrays, or to -1 if the font doesn't have it; codepoints past the
+        end of the table map to its last entry, which is always -1.  Row 0 is
+        for '\\n' and has no quad and no advance.  g_quads holds the six
+        vertices of each glyph's quad relative to the pen position, in window
+        units.
+        '''
+        chars = sorted(c for c in self.glyphs if c != '\n')
+        gs    = [self.glyphs[c] for c in chars]
+        X0    = np.array([0] + [g.bm_left for g in gs]) / self.oversample
+        Y1    = np.array([0] + [g.bm_top for g in gs]) / self.oversample
+        W     = np.array([0] + [g.bm_width for g in gs]) / self.oversample
+        H     = np.array([0] + [g.bm_height for g in gs]) / self.oversample
+        X1    = X0 + W
+        Y0    = Y1 - H
+
+        self.glyph_index      = self._gen_glyph_index(chars)
+        self.g_dx             = (np.array([0] + [g.dx for g in gs]) /
+                                 self.oversample)
+        self.g_visible        = (W != 0) | (H != 0)
+        self.g_quads          = np.empty((len(gs) + 1, 6, 2))
+        self.g_quads[:, :, 0] = np.column_stack((X0, X1, X0, X0, X1, X1))
+        self.g_quads[:, :, 1] = np.column_stack((Y0, Y1, Y1, Y0, Y0, Y1))
+        self.g_tex_coords     = np.array(
+            [[(0, 0)] * 6] + [g.tex_coords for g in gs], dtype=np.float32)
+
+    def _lookup(self, codes):
+        '''
+        Returns the rows in the glyph arrays for an array of codepoints,
+        raising KeyError for the first one that the font doesn't have.
+        '''
+        I = self.glyph_index[np.minimum(codes, len(self.glyph_index) - 1)]
+        if (I < 0).any():
+            raise KeyError(chr(codes[np.argmax(I < 0)]))
+        return I
+
     def gen_vertices_left(self, text, dy=1):
         '''
         Generates vertices for left-aligned text, returning a tuple:
@@ -110,65 +203,397 @@ class Font:
 
         For text to grow downwards, set dy = -1.  For text to grow upwards, set
         dy = 1.
+
+        The layout is done with array operations over the whole string: the
+        pen position of each character is a cumulative sum of the advances,
+        offset back to zero at the start of each line.
+        '''
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        I     = self._lookup(codes)
+
+        line_dy = dy * (self.height // (64 * self.oversample))
+        dx      = self.g_dx[I]
+        cs      = np.cumsum(dx)
+        pen_x   = cs - dx
+        q       = self.g_visible[I]
+        J       = I[q]
+        V       = self.g_quads[J]
+        if '\n' not in text:
+            width = float(cs[-1]) if len(cs) else 0
+            pen_y = 0
+        else:
+            # Offset each pen position by the advances on previous lines;
+            # start[i] is the index of the newline ending the line before
+            # character i, or -1 on the first line.
+            nl          = (I == 0)
+            start       = np.maximum.accumulate(
+                np.where(nl, np.arange(len(I)), -1))
+            base        = np.where(start >= 0, cs[start], 0)
+            lines       = np.cumsum(nl)
+            width       = float(np.max(cs - base))
+            pen_x      -= base
+            pen_y       = int(lines[-1]) * line_dy
+            V[:, :, 1] += lines[q, np.newaxis] * line_dy
+
+        V[:, :, 0] += pen_x[q, np.newaxis]
+        vertices    = V.astype(np.float32).reshape((-1, 2))
+        tex_coords  = self.g_tex_coords[J].reshape((-1, 2))
+
+        return vertices, tex_coords, max(width, 0), pen_y + self.ascender
+
+
+class ShelfPacker:
+    '''
+    Allocates rectangles in an atlas of fixed width and unbounded height by
+    packing them left to right into horizontal shelves.  A shelf's height is
+    set by the first rectangle placed in it, rounded up to a multiple of 4 so
+    that later glyphs of a similar height can share it.
+    '''
+    def __init__(self, width):
+        self.width   = width
+        self.height  = 0
+        self.shelves = []
+
+    def alloc(self, w, h):
+        '''
+        Returns the (x, y) position of a new w x h rectangle.
+        '''
+        assert w <= self.width
+        for shelf in self.shelves:
+            y, shelf_h, x = shelf
+            if h <= shelf_h and x + w <= self.width:
+                shelf[2] = x + w
+                return x, y
+
+        shelf_h      = round_up_pow2(max(h, 1), 4)
+        y            = self.height
+        self.height += shelf_h
+        self.shelves.append([y, shelf_h, w])
+        return 0, y
+
+
+class DynamicFont(Font):
+    '''
+    A Font whose atlas starts out empty.  Glyphs are rasterized the first time
+    they are laid out and shelf-packed into the atlas, and only the new
+    glyphs' rectangles are uploaded with glTexSubImage2D.  The atlas has a
+    fixed width and doubles in height when it runs out of room; since texture
+    coordinates are in texels, the glyphs already laid out remain valid.
+
+    In glyph_index, codepoints that the face has but that haven't been
+    rasterized yet map to -2.
+    '''
+    def __init__(self, face, oversample_log2, ascender, height, size):
+        self.face     = face
+        self.packer   = ShelfPacker(DYNAMIC_ATLAS_W)
+        self.unloaded = np.full(max(face.char_index) + 2, -1, dtype=np.int32)
+        self.unloaded[list(face.char_index)] = -2
+
+        tex_data = np.zeros((DYNAMIC_ATLAS_H, DYNAMIC_ATLAS_W), dtype=np.ubyte)
+        super().__init__(tex_data, {}, oversample_log2, ascender, height,
+                         size)
+
+    def _gen_glyph_index(self, chars):
+        glyph_index = self.unloaded.copy()
+        glyph_index[[ord(c) for c in chars]] = np.arange(1, len(chars) + 1)
+        glyph_index[ord('\n')] = 0
+        return glyph_index
+
+    def _lookup(self, codes):
+        I = self.glyph_index[np.minimum(codes, len(self.glyph_index) - 1)]
+        if (I == -2).any():
+            self._load_glyphs(np.unique(codes[I == -2]))
+        return super()._lookup(codes)
+
+    def _load_glyphs(self, codes):
+        '''
+        Rasterizes the glyphs for the codepoints into the atlas and regenerates
+        the glyph arrays.
+        '''
+        os_log2 = self.oversample.bit_length() - 1
+        do      = os_log2 / 2
+        face    = self.face.face
+        face.set_char_size(int(self.size * 64 * self.oversample))
+
+        tex_h = self.tex_h
+        rects = []
+        for cc in codes:
+            face.load_glyph(self.face.char_index[int(cc)])
+            g             = face.glyph
+            bm, left, top = self._render_glyph(g)
+            h, w          = bm.shape
+            x, y          = self.packer.alloc(w, h) if bm.size else (0, 0)
+            if self.packer.height > self.tex_data.shape[0]:
+                tex_data = np.zeros((ceil_pow2(self.packer.height),
+                                     self.tex_w), dtype=np.ubyte)
+                tex_data[:self.tex_data.shape[0]] = self.tex_data
+                self.tex_data = tex_data
+            self.tex_data[y:y + h, x:x + w] = bm
+            rects.append((x, y, w, h))
+
+            self.glyphs[chr(cc)] = Glyph(left, top, w, h, g.advance.x >> 6,
+                                         x + do, y + do, x + w - do,
+                                         y + h - do)
+
+        if self.tex_data.shape[0] != tex_h:
+            self._upload_texture()
+        else:
+            gl_state.bind_texture(0, GL.GL_TEXTURE_2D, self.tex)
+            GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
+            for x, y, w, h in rects:
+                if w and h:
+                    GL.glTexSubImage2D(
+                        GL.GL_TEXTURE_2D, 0, x, y, w, h, GL.GL_RED,
+                        GL.GL_UNSIGNED_BYTE,
+                        np.ascontiguousarray(self.tex_data[y:y + h, x:x + w]))
+            GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 4)
+
+        self._gen_glyph_arrays()
+
+    @staticmethod
+    def _render_glyph(g):
         '''
-        pen_x      = 0
-        pen_y      = 0
-        width      = 0
-        vertices   = []
-        tex_coords = []
-        for c in text:
-            if c == '\n':
-                width  = max(width, pen_x)
-                pen_x  = 0
-                pen_y += dy * (self.height // (64 * self.oversample))
-                continue
-
-            g = self.glyphs[c]
-            w = g.bm_width / self.oversample
-            h = g.bm_height / self.oversample
-            if w or h:
-                x = pen_x + g.bm_left / self.oversample
-                y = pen_y + g.bm_top / self.oversample - h
-                vertices += [(x, y),
-                             (x + w, y + h),
-                             (x, y + h),
-                             (x, y),
-                             (x + w, y),
-                             (x + w, y + h),
-                             ]
-                tex_coords += g.tex_coords
-
-            pen_x += g.dx / self.oversample
-
-        width      = max(width, pen_x)
-        vertices   = np.array(vertices, dtype=np.float32)
-        tex_coords = np.array(tex_coords, dtype=np.float32)
-
-        return vertices, tex_coords, width, pen_y + self.ascender
+        Returns the bitmap to store in the atlas for the loaded glyph g along
+        with its left and top bearings, as a tuple:
+
+            (bitmap, bm_left, bm_top)
+        '''
+        w  = g.bitmap.width
+        h  = g.bitmap.rows
+        bm = np.zeros((h, w), dtype=np.ubyte)
+        if w and h:
+            bm[:] = np.array(g.bitmap.buffer, dtype=np.ubyte).reshape(
+                (h, g.bitmap.pitch))[:, :w]
+        return bm, g.bitmap_left, g.bitmap_top
+
+
+def _edt(features):
+    '''
+    Returns the Euclidean distance from each texel to the nearest texel set in
+    the boolean array features, or inf if there is none.  This is the exact
+    separable transform computed by brute force over each column and then each
+    row, which is fast enough for glyph-sized bitmaps.
+    '''
+    Y = np.arange(features.shape[0])
+    X = np.arange(features.shape[1])
+    D = np.where(features[np.newaxis, :, :],
+                 ((Y[:, np.newaxis] - Y[np.newaxis, :])**2)[:, :, np.newaxis],
+                 np.inf)
+    G = D.min(axis=1)
+    D = G[:, np.newaxis, :] + (X[:, np.newaxis] - X[np.newaxis, :])**2
+    return np.sqrt(D.min(axis=2))
+
+
+def signed_distance_field(coverage, spread):
+    '''
+    Returns the signed distance field of a glyph's coverage bitmap, padded by
+    spread texels on each side.  Each texel holds the distance from its
+    center to the glyph's outline, positive inside the glyph, encoded as
+    128 + 127 * distance / spread and clamped to [0, 255].
+    '''
+    inside = np.pad(coverage >= 128, spread)
+    d_in   = _edt(~inside)
+    d_out  = _edt(inside)
+    sd     = np.where(inside, d_in - 0.5, 0.5 - d_out)
+    return np.clip(np.round(128 + sd * (127 / spread)), 0, 255).astype(
+        np.ubyte)
+
+
+class SDFAtlas(DynamicFont):
+    '''
+    A DynamicFont rasterized at SDF_SIZE whose atlas holds the signed distance
+    field of each glyph rather than its coverage.  Each glyph is padded by
+    SDF_SPREAD texels so that its outline can be reconstructed by the
+    text_sdf.frag shader at any scale or rotation; the texture is therefore
+    sampled with linear filtering.  A single SDFAtlas is shared by all the
+    SDFFont sizes of a face.
+    '''
+    def __init__(self, face, ascender, height):
+        super().__init__(face, 0, ascender, height, SDF_SIZE)
+
+        gl_state.bind_texture(0, GL.GL_TEXTURE_2D, self.tex)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER,
+                           GL.GL_LINEAR)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER,
+                           GL.GL_LINEAR)
+
+    @staticmethod
+    def _render_glyph(g):
+        bm, left, top = DynamicFont._render_glyph(g)
+        if not bm.size:
+            return bm, left, top
+        return (signed_distance_field(bm, SDF_SPREAD), left - SDF_SPREAD,
+                top + SDF_SPREAD)
+
+
+class SDFFont:
+    '''
+    A face at a specific size, rendered from the face's shared SDFAtlas.  Text
+    is laid out in the atlas and then scaled, so creating additional sizes
+    costs no texture memory.  SDFFont has the same interface as Font and can
+    be used anywhere a Font is expected.
+    '''
+    def __init__(self, atlas, size):
+        self.atlas     = atlas
+        self.size      = size
+        self.scale     = size / SDF_SIZE
+        self.ascender  = atlas.ascender * self.scale
+        self.height    = atlas.height * self.scale
+        self.bind_unit = None
+
+    @property
+    def tex_scale(self):
+        return self.atlas.tex_scale
+
+    def bind(self, unit):
+        self.atlas.bind(unit)
+        self.bind_unit = unit
+
+    @staticmethod
+    def program():
+        return programs.sdf_text
+
+    def gen_vertices_left(self, text, dy=1):
+        vertices, tex_coords, width, height = self.atlas.gen_vertices_left(
+            text, dy)
+        return (vertices * np.float32(self.scale), tex_coords,
+                width * self.scale, height * self.scale)
+
+
+def atlas_cache_dir():
+    '''
+    Returns the directory used to cache rasterized glyph atlases, or None if
+    the cache is disabled.  The GLOTLIB_CACHE_DIR environment variable
+    overrides the default of $XDG_CACHE_HOME/glotlib; setting it to an empty
+    string disables the cache.
+    '''
+    path = os.environ.get('GLOTLIB_CACHE_DIR')
+    if path is None:
+        base = (os.environ.get('XDG_CACHE_HOME') or
+                os.path.join(os.path.expanduser('~'), '.cache'))
+        path = os.path.join(base, 'glotlib')
+    return path or None
 
 
 class Face:
+    '''
+    A font face, from which Font objects for specific sizes are generated.
+    Rasterizing all the glyphs for a size is slow, so the resulting atlas is
+    cached on disk, keyed on a hash of the font file, the size and the
+    oversampling, and later processes memory-map it instead.  Each cache entry
+    is a .npy file holding the atlas texture and a .npz file holding the glyph
+    metrics.
+    '''
     def __init__(self, family, name):
         if sys.version_info < (3, 9):
             with importlib.resources.open_binary(
                     'glotlib.font_files.%s' % family, name) as byte_stream:
-                self.face = freetype.Face(byte_stream)
+                data = byte_stream.read()
         else:
-            name  = os.path.join(family, name)
+            path  = os.path.join(family, name)
             files = importlib.resources.files('glotlib.font_files')
-            with files.joinpath(name).open('rb') as byte_stream:
-                self.face = freetype.Face(byte_stream)
+            with files.joinpath(path).open('rb') as byte_stream:
+                data = byte_stream.read()
 
-        self.sizes = {}
+        self.face  = freetype.Face(io.BytesIO(data))
+        self.name  = os.path.splitext(name)[0]
+        self.hash  = hashlib.sha256(data).hexdigest()[:16]
+        self.sizes     = {}
+        self.sdf_atlas = None
 
-    def __call__(self, size, oversample_log2=0):
-        font = self.sizes.get((size, oversample_log2))
+        self.char_index = dict(self.face.get_chars())
+
+    def __call__(self, size, oversample_log2=0, dynamic=False):
+        font = self.sizes.get((size, oversample_log2, dynamic))
         if font is None:
-            font = self._load_size(size, oversample_log2)
-        self.sizes[(size, oversample_log2)] = font
+            if dynamic:
+                font = self._load_dynamic(size, oversample_log2)
+            else:
+                font = self._load_size(size, oversample_log2)
+        self.sizes[(size, oversample_log2, dynamic)] = font
         return font
 
-    def _load_size(self, size, oversample_log2):
+    def sdf(self, size):
+        '''
+        Returns an SDFFont for the size.
+        '''
+        if self.sdf_atlas is None:
+            asc            = self._scan_ascender(SDF_SIZE, 0)
+            self.sdf_atlas = SDFAtlas(self, asc, self.face.size.height)
+        return SDFFont(self.sdf_atlas, size)
+
+    def _cache_path(self, size, oversample_log2):
+        cache_dir = atlas_cache_dir()
+        if cache_dir is None:
+            return None
+
+        ft_vers = '.'.join(str(v) for v in freetype.version())
+        name    = '%s-%s-v%u-ft%s-%g-%u' % (self.name, self.hash,
+                                            ATLAS_CACHE_VERSION, ft_vers,
+                                            size, oversample_log2)
+        return os.path.join(cache_dir, name)
+
+    def _load_cached_atlas(self, size, oversample_log2):
+        '''
+        Returns the cached atlas for the size, with the texture memory-mapped,
+        or None if it isn't in the cache.
+        '''
+        path = self._cache_path(size, oversample_log2)
+        if path is None:
+            return None
+
+        try:
+            with np.load(path + '.npz') as f:
+                metrics = f['metrics']
+                asc     = float(f['ascender'])
+                height  = int(f['height'])
+            tex_data = np.load(path + '.npy', mmap_mode='r')
+        except (OSError, ValueError, KeyError):
+            return None
+
+        if np.ndim(metrics) != 2 or np.shape(metrics)[1] != 10:
+            return None
+        if np.ndim(tex_data) != 2:
+            return None
+
+        return tex_data, metrics, asc, height
+
+    def _save_cached_atlas(self, size, oversample_log2, atlas):
+        '''
+        Saves the atlas to the cache.  The files are written under temporary
+        names and then renamed so that a concurrent process never sees a
+        partially-written entry.  Failing to save is not an error.
+        '''
+        path = self._cache_path(size, oversample_log2)
+        if path is None:
+            return
+
+        tex_data, metrics, asc, height = atlas
+        tmp = '%s.%u.tmp' % (path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, 'wb') as f:
+                np.savez(f, metrics=metrics, ascender=asc, height=height)
+            os.replace(tmp, path + '.npz')
+            with open(tmp, 'wb') as f:
+                np.save(f, tex_data)
+            os.replace(tmp, path + '.npy')
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def _rasterize(self, size, oversample_log2):
+        '''
+        Rasterizes all the glyphs in the face at the specified size, returning
+        a tuple:
+
+            (atlas texture, glyph metrics, ascender, height)
+
+        Each row of the glyph metrics holds the codepoint followed by the
+        arguments to the Glyph constructor.
+        '''
         self.face.set_char_size(int(size * 64 * (1 << oversample_log2)))
 
         rows  = 1
@@ -194,13 +619,12 @@ class Face:
         tex_w    = 1024 if rows > 1 else ceil_pow2(x)
         tex_data = np.zeros((tex_h, tex_w), dtype=np.ubyte)
 
-        x     = 0
-        y     = 0
-        row_h = 0
-        do    = oversample_log2 / 2
-        glyphs = {}
+        x       = 0
+        y       = 0
+        row_h   = 0
+        do      = oversample_log2 / 2
+        metrics = []
         for cc, ci in self.face.get_chars():
-            c = chr(cc)
             self.face.load_glyph(ci)
             g = self.face.glyph
 
@@ -216,13 +640,50 @@ class Face:
             tex_data[tex_y:tex_y + g.bitmap.rows,
                      tex_x:tex_x + g.bitmap.width].flat = g.bitmap.buffer
 
-            glyphs[c] = Glyph(g.bitmap_left, g.bitmap_top, w, g.bitmap.rows,
-                              g.advance.x >> 6,
-                              (x + do) / tex_w, (y + do) / tex_h,
-                              (x + w - do) / tex_w,
-                              (y + g.bitmap.rows - do) / tex_h)
+            metrics.append((cc, g.bitmap_left, g.bitmap_top, w, g.bitmap.rows,
+                            g.advance.x >> 6,
+                            x + do, y + do, x + w - do,
+                            y + g.bitmap.rows - do))
 
             x += w
 
-        return Font(tex_data, glyphs, oversample_log2, asc,
-                    self.face.size.height, size)
+        metrics = np.array(metrics, dtype=np.float64).reshape((-1, 10))
+        return tex_data, metrics, asc, self.face.size.height
+
+    def _load_size(self, size, oversample_log2):
+        atlas = self._load_cached_atlas(size, oversample_log2)
+        if atlas is None:
+            atlas = self._rasterize(size, oversample_log2)
+            self._save_cached_atlas(size, oversample_log2, atlas)
+        tex_data, metrics, asc, height = atlas
+
+        glyphs = {}
+        for m in metrics:
+            glyphs[chr(int(m[0]))] = Glyph(int(m[1]), int(m[2]), int(m[3]),
+                                           int(m[4]), int(m[5]), m[6], m[7],
+                                           m[8], m[9])
+
+        return Font(tex_data, glyphs, oversample_log2, asc, height, size)
+
+    def _scan_ascender(self, size, oversample_log2):
+        '''
+        Returns the ascender for the size, which is the largest glyph bearing
+        in the face, found by loading each glyph's metrics without rendering
+        it; this matches the bitmap_top of the rendered glyphs that
+        _rasterize() uses.  Leaves the face set to the size.
+        '''
+        self.face.set_char_size(int(size * 64 * (1 << oversample_log2)))
+
+        top = 0
+        for ci in self.char_index.values():
+            self.face.load_glyph(ci, 0)  # FT_LOAD_DEFAULT
+            top = max(top, self.face.glyph.metrics.horiBearingY)
+        return -(-top // 64) / (1 << oversample_log2)
+
+    def _load_dynamic(self, size, oversample_log2):
+        '''
+        Returns an empty DynamicFont for the size.
+        '''
+        asc = self._scan_ascender(size, oversample_log2)
+        return DynamicFont(self, oversample_log2, asc, self.face.size.height,
+                           size)
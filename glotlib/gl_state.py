@@ -0,0 +1,120 @@
+'''
+Cache of the OpenGL binding state for the current context, used to skip
+redundant glUseProgram(), glBindVertexArray() and glBindTexture() calls.  For
+the cache to be accurate, all of those calls must be made through this module
+and reset() must be called whenever a different context is made current.
+
+The STATS counters record how many calls were made and how many were skipped,
+including the uniform calls skipped by the Program class.
+'''
+from OpenGL import GL
+
+
+STATS = {
+    'use_program'               : 0,
+    'use_program_skipped'       : 0,
+    'bind_vertex_array'         : 0,
+    'bind_vertex_array_skipped' : 0,
+    'bind_texture'              : 0,
+    'bind_texture_skipped'      : 0,
+    'uniform'                   : 0,
+    'uniform_skipped'           : 0,
+}
+
+PROGRAM        = None
+VERTEX_ARRAY   = None
+ACTIVE_TEXTURE = None
+TEXTURES       = {}
+
+
+def reset():
+    '''
+    Forgets all the cached state, for instance because a different context
+    has been made current.
+    '''
+    global PROGRAM
+    global VERTEX_ARRAY
+    global ACTIVE_TEXTURE
+
+    PROGRAM        = None
+    VERTEX_ARRAY   = None
+    ACTIVE_TEXTURE = None
+    TEXTURES.clear()
+
+
+def use_program(program):
+    global PROGRAM
+
+    if program == PROGRAM:
+        STATS['use_program_skipped'] += 1
+        return
+
+    GL.glUseProgram(program)
+    PROGRAM = program
+    STATS['use_program'] += 1
+
+
+def bind_vertex_array(vao):
+    global VERTEX_ARRAY
+
+    if vao == VERTEX_ARRAY:
+        STATS['bind_vertex_array_skipped'] += 1
+        return
+
+    GL.glBindVertexArray(vao)
+    VERTEX_ARRAY = vao
+    STATS['bind_vertex_array'] += 1
+
+
+def bind_texture(unit, target, texture):
+    '''
+    Binds the texture to the target on the specified texture unit, which also
+    becomes the active texture unit if the texture needed binding.
+    '''
+    global ACTIVE_TEXTURE
+
+    if TEXTURES.get((unit, target)) == texture:
+        STATS['bind_texture_skipped'] += 1
+        return
+
+    if unit != ACTIVE_TEXTURE:
+        GL.glActiveTexture(GL.GL_TEXTURE0 + unit)
+        ACTIVE_TEXTURE = unit
+    GL.glBindTexture(target, texture)
+    TEXTURES[(unit, target)] = texture
+    STATS['bind_texture'] += 1
+
+
+def delete_vertex_array(vao):
+    '''
+    Deletes the VAO.  Deleting the bound VAO reverts the binding to 0, and
+    the name may then be reused by a new VAO, so the cache must be updated.
+    '''
+    global VERTEX_ARRAY
+
+    GL.glDeleteVertexArrays(1, [vao])
+    if vao == VERTEX_ARRAY:
+        VERTEX_ARRAY = 0
+
+
+def delete_texture(texture):
+    '''
+    Deletes the texture, which also unbinds it from every unit it is bound
+    to.
+    '''
+    GL.glDeleteTextures(1, [texture])
+    for k, v in TEXTURES.items():
+        if v == texture:
+            TEXTURES[k] = 0
+
+
+def get_stats():
+    '''
+    Returns a copy of the STATS counters.
+    '''
+    return dict(STATS)
+
+
+def reset_stats():
+    for k in STATS:
+        STATS[k] = 0
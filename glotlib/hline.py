@@ -1,8 +1,10 @@
 import numpy as np
 from OpenGL import GL
 
+from . import gl_state
 from . import vbo
 from . import programs
+from .plot_cache import DrawAttribute
 
 
 INSTANCE_GEOMETRY = np.array(
@@ -16,6 +18,9 @@ INSTANCE_GEOMETRY = np.array(
 
 
 class HLine:
+    color = DrawAttribute()
+    width = DrawAttribute()
+
     def __init__(self, plot, y, color=None, width=1):
         self.plot     = plot
         self.y        = y
@@ -24,7 +29,7 @@ class HLine:
         self.vertices = [(-1, y), (1, y)]
 
         self.line_vao = GL.glGenVertexArrays(1)
-        GL.glBindVertexArray(self.line_vao)
+        gl_state.bind_vertex_array(self.line_vao)
 
         self.vert_vbo = vbo.VBO(self.vertices)
         self.vert_vbo._attrib_pointer(0)
@@ -40,7 +45,12 @@ class HLine:
         GL.glEnableVertexAttribArray(2)
         GL.glVertexAttribDivisor(2, 0)
 
-        GL.glBindVertexArray(0)
+        gl_state.bind_vertex_array(0)
+
+    def _destroy(self):
+        gl_state.delete_vertex_array(self.line_vao)
+        self.vert_vbo._destroy()
+        self.geom_vbo._destroy()
 
     def renormalize(self):
         y = self.y * self.plot.rmatrix[1][1] + self.plot.rmatrix[1][3]
@@ -56,7 +66,7 @@ class HLine:
         self.vert_vbo.vertices[1][0] = r
         self.vert_vbo._update_vbo()
 
-        GL.glBindVertexArray(self.line_vao)
+        gl_state.bind_vertex_array(self.line_vao)
         programs.square_line.use(self.width, z, mvp, color=self.color,
                                  resolution=resolution)
         GL.glDrawArraysInstanced(GL.GL_TRIANGLES, 0, len(INSTANCE_GEOMETRY), 1)
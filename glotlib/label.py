@@ -1,10 +1,11 @@
 from ctypes import c_void_p
 from enum import IntEnum
 
+import numpy as np
 from OpenGL import GL
 
+from . import gl_state
 from . import matrix
-from . import programs
 
 
 class HAlign(IntEnum):
@@ -32,36 +33,32 @@ ALIGNMENTS = {
 }
 
 
-class Label:
+class BaseLabel:
+    '''
+    The text layout and positioning shared by all labels.  The glyph quads
+    are generated in the label's own coordinates and the mvp field holds the
+    transform from those coordinates to window coordinates.  Subclasses
+    decide how the glyphs get to the GPU.
+    '''
     def __init__(self, window, pos, text, font=None, theta=0, anchor='SW',
                  visible=True):
         assert font
 
-        self.window    = window
-        self.font      = font
-        self.pos       = (round(pos[0]), round(pos[1]))
-        self.theta     = theta
-        self.visible   = visible
-        self.text      = None
-        self.mvp       = None
-        alignment      = ALIGNMENTS[anchor]
-        self.halign    = alignment[0]
-        self.valign    = alignment[1]
-        self.width     = 0
-        self.height    = 0
-        self.nvertices = 0
-
-        self.vao      = GL.glGenVertexArrays(1)
-        self.geom_vbo = GL.glGenBuffers(1)
-        self.tex_vbo  = GL.glGenBuffers(1)
-
-        GL.glBindVertexArray(self.vao)
-        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.geom_vbo)
-        GL.glVertexAttribPointer(0, 2, GL.GL_FLOAT, GL.GL_FALSE, 0, c_void_p(0))
-        GL.glEnableVertexAttribArray(0)
-        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.tex_vbo)
-        GL.glVertexAttribPointer(1, 2, GL.GL_FLOAT, GL.GL_FALSE, 0, c_void_p(0))
-        GL.glEnableVertexAttribArray(1)
+        self.window     = window
+        self.font       = font
+        self.pos        = (round(pos[0]), round(pos[1]))
+        self.theta      = theta
+        self.visible    = visible
+        self.text       = None
+        self.mvp        = None
+        alignment       = ALIGNMENTS[anchor]
+        self.halign     = alignment[0]
+        self.valign     = alignment[1]
+        self.width      = 0
+        self.height     = 0
+        self.nvertices  = 0
+        self.vertices   = None
+        self.tex_coords = None
 
         self.set_text(text)
 
@@ -73,6 +70,16 @@ class Label:
             matrix.rotate(self.theta) @
             matrix.translate(-dx, -dy)
             )
+        self._invalidate()
+
+    def _invalidate(self):
+        '''
+        Called whenever the label's text, position or visibility changes.
+        '''
+
+    def _set_glyphs(self, vertices, tex_coords):
+        self.vertices   = vertices
+        self.tex_coords = tex_coords
 
     def set_text(self, text):
         if text == self.text:
@@ -84,12 +91,7 @@ class Label:
         self.nvertices = len(vertices)
         self.width     = width
         self.height    = height
-        if self.nvertices:
-            GL.glBindVertexArray(self.vao)
-            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.geom_vbo)
-            GL.glBufferData(GL.GL_ARRAY_BUFFER, vertices, GL.GL_STATIC_DRAW)
-            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.tex_vbo)
-            GL.glBufferData(GL.GL_ARRAY_BUFFER, tex_coords, GL.GL_STATIC_DRAW)
+        self._set_glyphs(vertices, tex_coords)
 
         self._update_mvp()
         return True
@@ -102,35 +104,60 @@ class Label:
         self.theta = theta
         self._update_mvp()
 
+    def show(self):
+        self.visible = True
+        self._invalidate()
+        self.window.mark_dirty()
+
+    def hide(self):
+        self.visible = False
+        self._invalidate()
+        self.window.mark_dirty()
+
+
+class Label(BaseLabel):
+    '''
+    A label with its own VAO and VBOs, drawn with its own draw call.
+    '''
+    def __init__(self, window, pos, text, font=None, **kwargs):
+        self.vao      = GL.glGenVertexArrays(1)
+        self.geom_vbo = GL.glGenBuffers(1)
+        self.tex_vbo  = GL.glGenBuffers(1)
+
+        gl_state.bind_vertex_array(self.vao)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.geom_vbo)
+        GL.glVertexAttribPointer(0, 2, GL.GL_FLOAT, GL.GL_FALSE, 0, c_void_p(0))
+        GL.glEnableVertexAttribArray(0)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.tex_vbo)
+        GL.glVertexAttribPointer(1, 2, GL.GL_FLOAT, GL.GL_FALSE, 0, c_void_p(0))
+        GL.glEnableVertexAttribArray(1)
+
+        super().__init__(window, pos, text, font=font, **kwargs)
+
+    def _destroy(self):
+        gl_state.delete_vertex_array(self.vao)
+        GL.glDeleteBuffers(2, [self.geom_vbo, self.tex_vbo])
+
+    def _set_glyphs(self, vertices, tex_coords):
+        if len(vertices):
+            gl_state.bind_vertex_array(self.vao)
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.geom_vbo)
+            GL.glBufferData(GL.GL_ARRAY_BUFFER, vertices, GL.GL_STATIC_DRAW)
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.tex_vbo)
+            GL.glBufferData(GL.GL_ARRAY_BUFFER, tex_coords, GL.GL_STATIC_DRAW)
+
     def draw(self, mvp, color=(0, 0, 0, 1)):
         if not self.nvertices:
             return
 
         mvp = mvp @ self.mvp
-        GL.glBindVertexArray(self.vao)
+        gl_state.bind_vertex_array(self.vao)
         self.font.bind(0)
-        programs.text.use(0, mvp, self.font, color=color)
+        self.font.program().use(0, mvp, self.font, color=color)
         GL.glEnable(GL.GL_BLEND)
         GL.glDrawArrays(GL.GL_TRIANGLES, 0, self.nvertices)
         GL.glDisable(GL.GL_BLEND)
 
-    def draw_batched(self, mvp):
-        if not self.nvertices or not self.visible:
-            return
-
-        mvp = mvp @ self.mvp
-        programs.text.uniformMatrix4fv('u_mvp', mvp)
-        GL.glBindVertexArray(self.vao)
-        GL.glDrawArrays(GL.GL_TRIANGLES, 0, self.nvertices)
-
-    def show(self):
-        self.visible = True
-        self.window.mark_dirty()
-
-    def hide(self):
-        self.visible = False
-        self.window.mark_dirty()
-
 
 class FlexLabel(Label):
     def __init__(self, window, pos, *args, **kwargs):
@@ -148,3 +175,94 @@ class FlexLabel(Label):
         pos           = (pos[0] * self.window.w_w,
                          pos[1] * self.window.w_h)
         super().set_pos(pos)
+
+
+class BatchedLabel(BaseLabel):
+    '''
+    A label drawn as part of a LabelBatch.
+    '''
+    def __init__(self, batch, window, pos, text, **kwargs):
+        self.batch = batch
+        super().__init__(window, pos, text, **kwargs)
+
+    def _invalidate(self):
+        self.batch.dirty = True
+
+
+class LabelBatch:
+    '''
+    A set of labels sharing a font that are drawn with a single draw call.
+    The glyph quads of all the visible labels are transformed to window
+    coordinates on the CPU and packed into a single interleaved vertex buffer
+    of (x, y, u, v) vertices, which is only regenerated when the text,
+    position or visibility of one of the labels has changed.  The extent
+    field holds the (x0, y0, x1, y1) window coordinates of the rectangle
+    enclosing all the quads, or None if there are none.
+    '''
+    def __init__(self, window, font):
+        self.window    = window
+        self.font      = font
+        self.labels    = []
+        self.dirty     = True
+        self.nvertices = 0
+        self.extent    = None
+
+        self.vao = GL.glGenVertexArrays(1)
+        self.vbo = GL.glGenBuffers(1)
+
+        gl_state.bind_vertex_array(self.vao)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vbo)
+        GL.glVertexAttribPointer(0, 2, GL.GL_FLOAT, GL.GL_FALSE, 16,
+                                 c_void_p(0))
+        GL.glEnableVertexAttribArray(0)
+        GL.glVertexAttribPointer(1, 2, GL.GL_FLOAT, GL.GL_FALSE, 16,
+                                 c_void_p(8))
+        GL.glEnableVertexAttribArray(1)
+
+    def _destroy(self):
+        gl_state.delete_vertex_array(self.vao)
+        GL.glDeleteBuffers(1, [self.vbo])
+
+    def add_label(self, pos, text, **kwargs):
+        l = BatchedLabel(self, self.window, pos, text, font=self.font,
+                         **kwargs)
+        self.labels.append(l)
+        return l
+
+    def _update_vbo(self):
+        labels         = [l for l in self.labels if l.visible and l.nvertices]
+        self.nvertices = sum(l.nvertices for l in labels)
+        self.dirty     = False
+        self.extent    = None
+        if not self.nvertices:
+            return
+
+        vertices = np.empty((self.nvertices, 4), dtype=np.float32)
+        i        = 0
+        for l in labels:
+            V = vertices[i:i + l.nvertices]
+            V[:, 0:2] = l.vertices @ l.mvp[:2, :2].T + l.mvp[:2, 3]
+            V[:, 2:4] = l.tex_coords
+            i        += l.nvertices
+        x0, y0      = vertices[:, 0:2].min(axis=0)
+        x1, y1      = vertices[:, 0:2].max(axis=0)
+        self.extent = (x0, y0, x1, y1)
+
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vbo)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, vertices, GL.GL_DYNAMIC_DRAW)
+
+    def update(self):
+        if self.dirty:
+            self._update_vbo()
+
+    def draw(self, mvp, color=(0, 0, 0, 1)):
+        self.update()
+        if not self.nvertices:
+            return
+
+        gl_state.bind_vertex_array(self.vao)
+        self.font.bind(0)
+        self.font.program().use(0, mvp, self.font, color=color)
+        GL.glEnable(GL.GL_BLEND)
+        GL.glDrawArrays(GL.GL_TRIANGLES, 0, self.nvertices)
+        GL.glDisable(GL.GL_BLEND)
@@ -0,0 +1,175 @@
+import numpy as np
+
+from . import vbo
+
+
+# The finest level of detail groups the data into buckets of 2**MIN_LEVEL
+# vertices.  Each bucket is drawn as 2 vertices so coarser buckets are needed
+# before the decimation actually saves anything.
+MIN_LEVEL = 3
+
+
+def is_sorted(V):
+    '''
+    Returns True if the values in V are in non-decreasing order.  NaNs are
+    never considered sorted.
+    '''
+    return bool(np.all(V[1:] >= V[:-1]))
+
+
+class Level:
+    '''
+    A single level of the pyramid.  The data is divided into buckets of 2**k
+    vertices and for each complete bucket we keep the indices of the vertices
+    with the minimum and maximum y values.  The level's VBO holds those two
+    vertices for each bucket, in their original order.
+    '''
+    def __init__(self, k, ncomponents):
+        self.k        = k
+        self.nbuckets = 0
+        self.imin     = np.empty(0, dtype=np.int64)
+        self.imax     = np.empty(0, dtype=np.int64)
+        self.vbo      = vbo.VBO(np.empty((0, ncomponents), dtype=np.float32),
+                                ncomponents=ncomponents)
+        self.vbo_n    = 0
+
+    def __len__(self):
+        return self.nbuckets
+
+    def _destroy(self):
+        self.vbo._destroy()
+
+    def _grow(self, nbuckets):
+        self.imin = vbo.grow_rows(self.imin, self.nbuckets,
+                                  nbuckets - self.nbuckets)
+        self.imax = vbo.grow_rows(self.imax, self.nbuckets,
+                                  nbuckets - self.nbuckets)
+
+    def build_from_vertices(self, Y):
+        '''
+        Computes any missing buckets directly from the original Y values.
+        '''
+        nbuckets = len(Y) >> self.k
+        b0       = self.nbuckets
+        if nbuckets <= b0:
+            return
+
+        B  = 1 << self.k
+        YB = Y[b0 * B:nbuckets * B].reshape((-1, B))
+        I  = np.arange(b0, nbuckets, dtype=np.int64) * B
+        self._grow(nbuckets)
+        self.imin[b0:nbuckets] = I + np.argmin(YB, axis=1)
+        self.imax[b0:nbuckets] = I + np.argmax(YB, axis=1)
+        self.nbuckets          = nbuckets
+
+    def build_from_level(self, Y, finer):
+        '''
+        Computes any missing buckets by combining pairs of buckets from the
+        next-finer level.
+        '''
+        nbuckets = finer.nbuckets >> 1
+        b0       = self.nbuckets
+        if nbuckets <= b0:
+            return
+
+        imin0 = finer.imin[2 * b0:2 * nbuckets:2]
+        imin1 = finer.imin[2 * b0 + 1:2 * nbuckets:2]
+        imax0 = finer.imax[2 * b0:2 * nbuckets:2]
+        imax1 = finer.imax[2 * b0 + 1:2 * nbuckets:2]
+        self._grow(nbuckets)
+        self.imin[b0:nbuckets] = np.where(Y[imin0] <= Y[imin1], imin0, imin1)
+        self.imax[b0:nbuckets] = np.where(Y[imax0] >= Y[imax1], imax0, imax1)
+        self.nbuckets          = nbuckets
+
+    def truncate(self, n):
+        '''
+        Discards all buckets that include vertex n or later.
+        '''
+        self.nbuckets = min(self.nbuckets, n >> self.k)
+        self.vbo_n    = min(self.vbo_n, self.nbuckets)
+
+    def vertex_indices(self, b0, b1):
+        '''
+        Returns the indices of the original vertices that represent buckets b0
+        through b1 - 1, two per bucket in their original order.
+        '''
+        imin        = self.imin[b0:b1]
+        imax        = self.imax[b0:b1]
+        I           = np.empty(2 * (b1 - b0), dtype=np.int64)
+        I[0::2]     = np.minimum(imin, imax)
+        I[1::2]     = np.maximum(imin, imax)
+        return I
+
+    def update_vbo(self, vertices, encode):
+        '''
+        Encodes and uploads any buckets that aren't in the VBO yet.
+        '''
+        if self.vbo_n == self.nbuckets:
+            return
+
+        I = self.vertex_indices(self.vbo_n, self.nbuckets)
+        self.vbo.sub_data(2 * self.vbo_n,
+                          encode(vertices[I, 0], vertices[I, 1]))
+        self.vbo_n = self.nbuckets
+
+
+class MinMaxPyramid:
+    '''
+    A min/max decimation pyramid over a series with sorted X values.  Level k
+    of the pyramid represents each bucket of 2**k consecutive vertices by its
+    minimum and maximum vertices, which preserves the visual envelope of the
+    data when more than one bucket lands in each pixel column.
+
+    The pyramid is built lazily and incrementally: levels are only computed
+    when they are first drawn, and appending data to the series only computes
+    the newly-completed buckets.  Modifying existing data discards the buckets
+    covering the modified vertices.
+    '''
+    def __init__(self, ncomponents):
+        self.ncomponents = ncomponents
+        self.levels      = []
+
+    def _destroy(self):
+        for level in self.levels:
+            level._destroy()
+        self.levels = []
+
+    def truncate(self, n):
+        '''
+        Discards all buckets that cover vertex n or later.
+        '''
+        for level in self.levels:
+            level.truncate(n)
+
+    def invalidate_vbos(self):
+        '''
+        Forces all VBOs to be encoded again, typically because the plot has
+        renormalized.
+        '''
+        for level in self.levels:
+            level.vbo_n = 0
+
+    def max_level(self, n):
+        '''
+        Returns the coarsest level that is still useful for n vertices.
+        '''
+        return max(n.bit_length() - 2, MIN_LEVEL - 1)
+
+    def update(self, vertices, k, encode):
+        '''
+        Brings levels up to k up to date with the vertices and returns level k
+        with its VBO ready to draw.
+        '''
+        while len(self.levels) <= k - MIN_LEVEL:
+            self.levels.append(Level(MIN_LEVEL + len(self.levels),
+                                     self.ncomponents))
+
+        Y = vertices[:, 1]
+        self.levels[0].build_from_vertices(Y)
+        for finer, level in zip(self.levels[:k - MIN_LEVEL],
+                                self.levels[1:k - MIN_LEVEL + 1]):
+            level.build_from_level(Y, finer)
+
+        level = self.levels[k - MIN_LEVEL]
+        level.update_vbo(vertices, encode)
+        return level
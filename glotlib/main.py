@@ -1,3 +1,4 @@
+import asyncio
 import time
 import threading
 
@@ -6,6 +7,7 @@ from OpenGL import GL
 
 from . import programs
 from . import fonts
+from . import profiler
 
 
 INITED          = False
@@ -16,6 +18,10 @@ FRAME           = 0
 T0              = 0
 FPS             = 0
 SHOULD_INTERACT = False
+ASYNC_LOOP      = None
+ASYNC_WAKEUP    = None
+
+DEFAULT_REFRESH_RATE = 60
 
 
 def init():
@@ -30,8 +36,6 @@ def init():
 def init_fonts():
     global FONTS_INITED
 
-    assert INITED
-
     if FONTS_INITED:
         return
 
@@ -61,7 +65,51 @@ def get_fps():
     return FPS
 
 
-def animate():
+def _refresh_rate():
+    monitor = glfw.get_primary_monitor()
+    mode    = glfw.get_video_mode(monitor) if monitor else None
+    if mode and mode.refresh_rate:
+        return mode.refresh_rate
+    return DEFAULT_REFRESH_RATE
+
+
+def _idle_timeout(poll_period):
+    '''
+    Returns how long the event loop can wait for events before a window needs
+    drawing, or None if it can wait indefinitely.
+    '''
+    t         = time.time()
+    deadlines = [d for d in (w.next_deadline() for w in WINDOWS)
+                 if d is not None]
+    if poll_period:
+        deadlines.append(t + poll_period)
+    if not deadlines:
+        return None
+    return max(min(deadlines) - t, 0)
+
+
+def _wait_events(poll_period=None):
+    timeout = _idle_timeout(poll_period)
+    if timeout is None:
+        glfw.wait_events()
+    else:
+        glfw.wait_events_timeout(timeout)
+
+
+def animate(poll_idle=True):
+    '''
+    Runs the event loop for animated windows, drawing frames back to back for
+    as long as any window's update_geometry() returns True or a window is
+    marked dirty.
+
+    When no window needed drawing, the loop blocks until a window is marked
+    dirty, wakeup() is called, an input event arrives or the earliest time
+    requested with Window.request_frame() or allowed by a window's frame-
+    rate cap.  If poll_idle is True, which is the default, update_geometry()
+    is also polled once per refresh period of the primary monitor, for
+    windows that detect changes by polling; if all changes are signalled by
+    mark_dirty() or request_frame(), pass False to sleep until then.
+    '''
     global FRAME
     global FPS
     global T0
@@ -69,10 +117,11 @@ def animate():
     programs.load()
     GL.glBlendFunc(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
 
-    T0     = time.time()
-    fps_f0 = FRAME
-    fps_t0 = T0
-    del_ws = []
+    T0          = time.time()
+    fps_f0      = FRAME
+    fps_t0      = T0
+    del_ws      = []
+    poll_period = 1 / _refresh_rate() if poll_idle else None
 
     # glfw.swap_interval(1)
     # GL.glClearDepth(1.)
@@ -80,10 +129,16 @@ def animate():
     # GL.glDepthFunc(GL.GL_LESS)
     # GL.glEnable(GL.GL_BLEND)
 
-    draw_windows(0)
+    drew = draw_windows(0)
     while True:
         # GL.glFinish()
-        glfw.poll_events()
+        profiler.begin_frame()
+        if drew:
+            glfw.poll_events()
+            profiler.mark('poll')
+        else:
+            _wait_events(poll_period)
+            profiler.mark('idle')
 
         del_ws = [w for w in WINDOWS if w.should_close()]
         for w in del_ws:
@@ -92,10 +147,10 @@ def animate():
         if not WINDOWS:
             break
 
-        t = time.time()
-        if not draw_windows(t - T0):
-            time.sleep(0.005)
-        FRAME += 1
+        t    = time.time()
+        drew = draw_windows(t - T0)
+        if drew:
+            FRAME += 1
 
         fps_dt = t - fps_t0
         if fps_dt < 0.2:
@@ -123,7 +178,9 @@ def interact():
     SHOULD_INTERACT = True
     draw_windows(0)
     while SHOULD_INTERACT:
-        glfw.wait_events()
+        profiler.begin_frame()
+        _wait_events()
+        profiler.mark('idle')
 
         del_ws = [w for w in WINDOWS if w.should_close()]
         for w in del_ws:
@@ -136,8 +193,106 @@ def interact():
         draw_windows(t - T0)
 
 
+async def run(fps=None):
+    '''
+    Runs the event loop as an asyncio coroutine, so that glotlib can share
+    the main thread with other coroutines instead of owning it:
+
+        asyncio.run(glotlib.run())
+
+    Each frame, window system events are polled and the windows that need it
+    are redrawn, and then the coroutine sleeps until the next frame is due,
+    fps times per second, defaulting to the refresh rate of the primary
+    monitor.  If no window needed redrawing, the sleep ends early when
+    Window.mark_dirty() is called on a window that wasn't already dirty, when
+    data is pushed with Series.push_x_y_data() or when wakeup() is called, so
+    that new data is drawn without waiting for the next frame.  Modifying a
+    series or a plot directly doesn't end the sleep by itself; call
+    mark_dirty() on the window afterwards to have it drawn.  GLFW has no way
+    of waking up an asyncio loop for input events, so these are handled at
+    the next frame even while idle.
+
+    Other coroutines run on the render thread between frames, so they may
+    modify series directly instead of using Series.push_x_y_data().  The
+    coroutine returns when all the windows have been closed or stop() has
+    been called.
+    '''
+    global T0
+    global FRAME
+    global FPS
+    global SHOULD_INTERACT
+    global ASYNC_LOOP
+    global ASYNC_WAKEUP
+
+    programs.load()
+    GL.glBlendFunc(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
+
+    period       = 1 / (fps or _refresh_rate())
+    ASYNC_LOOP   = asyncio.get_running_loop()
+    ASYNC_WAKEUP = asyncio.Event()
+
+    T0     = time.time()
+    t_next = T0
+    fps_f0 = FRAME
+    fps_t0 = T0
+
+    SHOULD_INTERACT = True
+    draw_windows(0)
+    try:
+        while SHOULD_INTERACT:
+            profiler.begin_frame()
+            glfw.poll_events()
+            profiler.mark('poll')
+
+            del_ws = [w for w in WINDOWS if w.should_close()]
+            for w in del_ws:
+                w._destroy()
+                WINDOWS.remove(w)
+            if not WINDOWS:
+                break
+
+            t    = time.time()
+            drew = draw_windows(t - T0)
+            if drew:
+                FRAME += 1
+
+            t_next = max(t_next + period, time.time())
+            delay  = t_next - time.time()
+            if drew:
+                await asyncio.sleep(delay)
+            else:
+                try:
+                    await asyncio.wait_for(ASYNC_WAKEUP.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            ASYNC_WAKEUP.clear()
+            profiler.mark('idle')
+
+            fps_dt = t - fps_t0
+            if fps_dt >= 0.2:
+                FPS    = (FRAME - fps_f0) / fps_dt
+                fps_f0 = FRAME
+                fps_t0 = t
+    finally:
+        ASYNC_LOOP   = None
+        ASYNC_WAKEUP = None
+
+
+def _set_async_wakeup():
+    if ASYNC_WAKEUP is not None:
+        ASYNC_WAKEUP.set()
+
+
 def wakeup():
-    glfw.post_empty_event()
+    '''
+    Wakes up the event loop to redraw any dirty windows.  This can be called
+    from any thread.
+    '''
+    loop = ASYNC_LOOP
+    if loop is not None:
+        loop.call_soon_threadsafe(_set_async_wakeup)
+    else:
+        glfw.post_empty_event()
 
 
 def stop():
@@ -2,6 +2,7 @@ import numpy as np
 
 from OpenGL import GL
 
+from . import gl_state
 from . import programs
 
 
@@ -14,11 +15,19 @@ class MiterLines:
         self.bind_unit = None
         self._update(vertices)
 
-    def bind(self, unit):
-        GL.glBindVertexArray(self.vao)
-        GL.glActiveTexture(GL.GL_TEXTURE0 + unit)
-        GL.glBindTexture(GL.GL_TEXTURE_BUFFER, self.texture)
+        # The texture refers to the buffer object, so it sees any new data
+        # stored in the buffer without having to be attached again.
+        gl_state.bind_texture(0, GL.GL_TEXTURE_BUFFER, self.texture)
         GL.glTexBuffer(GL.GL_TEXTURE_BUFFER, GL.GL_RG32F, self.buffer)
+
+    def _destroy(self):
+        gl_state.delete_vertex_array(self.vao)
+        gl_state.delete_texture(self.texture)
+        GL.glDeleteBuffers(1, [self.buffer])
+
+    def bind(self, unit):
+        gl_state.bind_vertex_array(self.vao)
+        gl_state.bind_texture(unit, GL.GL_TEXTURE_BUFFER, self.texture)
         self.bind_unit = unit
 
     def use_program(self, width, z, mvp, color, resolution):
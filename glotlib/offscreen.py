@@ -0,0 +1,239 @@
+'''
+Headless rendering through EGL, for batch image export and pixel-exact
+regression tests on machines without a display or a GPU.  All the
+OffscreenWindows in a process share a single surfaceless EGL context and each
+one draws into its own framebuffer object.
+
+PyOpenGL must resolve GL functions through EGL, which it only does if the
+PYOPENGL_PLATFORM environment variable is set to 'egl' before OpenGL is first
+imported, so headless programs should either export it or set it in
+os.environ before importing glotlib.  With Mesa and no GPU, rendering falls
+back to the llvmpipe software renderer.
+'''
+import ctypes
+import struct
+import zlib
+
+import numpy as np
+from OpenGL import GL
+from OpenGL import EGL
+from OpenGL import platform
+from OpenGL.platform.egl import EGLPlatform
+from OpenGL.EGL.EXT.platform_base import eglGetPlatformDisplayEXT
+from OpenGL.error import NullFunctionError
+from OpenGL.raw.EGL._errors import EGLError
+
+from . import gl_state
+from . import profiler
+from . import programs
+from .window import BaseWindow
+
+
+# From EGL_MESA_platform_surfaceless.
+EGL_PLATFORM_SURFACELESS_MESA = 0x31DD
+
+DISPLAY = None
+CONTEXT = None
+
+
+def _initialize(dpy):
+    major = EGL.EGLint()
+    minor = EGL.EGLint()
+    try:
+        return bool(dpy) and bool(EGL.eglInitialize(dpy, ctypes.pointer(major),
+                                                    ctypes.pointer(minor)))
+    except EGLError:
+        return False
+
+
+def _get_display():
+    '''
+    Returns an initialized EGL display, preferring Mesa's surfaceless platform
+    since it needs neither a window system nor a GPU.
+    '''
+    try:
+        dpy = eglGetPlatformDisplayEXT(EGL_PLATFORM_SURFACELESS_MESA,
+                                       EGL.EGL_DEFAULT_DISPLAY, None)
+    except (NullFunctionError, EGLError):
+        dpy = EGL.EGL_NO_DISPLAY
+    if _initialize(dpy):
+        return dpy
+
+    dpy = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    if _initialize(dpy):
+        return dpy
+
+    raise Exception('Failed to initialize an EGL display.')
+
+
+def _init_context():
+    '''
+    Creates the shared OpenGL 3.3 core context the first time it is needed
+    and makes it current.
+    '''
+    global DISPLAY
+    global CONTEXT
+
+    if CONTEXT is not None:
+        _make_current()
+        return
+
+    if not isinstance(platform.PLATFORM, EGLPlatform):
+        raise Exception('OffscreenWindow requires PyOpenGL\'s EGL platform; '
+                        'set PYOPENGL_PLATFORM=egl before importing glotlib.')
+
+    dpy   = _get_display()
+    attrs = (EGL.EGLint * 5)(EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+                             EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+                             EGL.EGL_NONE)
+    cfg   = EGL.EGLConfig()
+    n     = EGL.EGLint()
+    if (not EGL.eglChooseConfig(dpy, attrs, ctypes.pointer(cfg), 1,
+                                ctypes.pointer(n)) or n.value == 0):
+        raise Exception('No EGL config supports OpenGL.')
+    if not EGL.eglBindAPI(EGL.EGL_OPENGL_API):
+        raise Exception('EGL does not support OpenGL.')
+
+    ctx_attrs = (EGL.EGLint * 7)(
+        EGL.EGL_CONTEXT_MAJOR_VERSION, 3,
+        EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+        EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK,
+        EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+        EGL.EGL_NONE)
+    ctx = EGL.eglCreateContext(dpy, cfg, EGL.EGL_NO_CONTEXT, ctx_attrs)
+    if not ctx:
+        raise Exception('Failed to create an OpenGL 3.3 core EGL context.')
+
+    DISPLAY = dpy
+    CONTEXT = ctx
+    _make_current()
+
+    programs.load()
+    GL.glBlendFunc(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
+
+
+def _make_current():
+    if EGL.eglGetCurrentContext() == CONTEXT:
+        return
+
+    if not EGL.eglMakeCurrent(DISPLAY, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE,
+                              CONTEXT):
+        raise Exception('Failed to make the EGL context current.')
+    gl_state.reset()
+
+
+def encode_png(pixels):
+    '''
+    Returns the PNG encoding of an (h, w, 3) or (h, w, 4) array of 8-bit RGB
+    or RGBA pixels, with the top row first.
+    '''
+    h, w, c = pixels.shape
+    assert c in (3, 4)
+    assert pixels.dtype == np.uint8
+
+    def chunk(tag, data):
+        return (struct.pack('>I', len(data)) + tag + data +
+                struct.pack('>I', zlib.crc32(tag + data)))
+
+    rows        = np.zeros((h, 1 + w * c), dtype=np.uint8)
+    rows[:, 1:] = pixels.reshape((h, w * c))
+    ihdr        = struct.pack('>IIBBBBB', w, h, 8, 2 if c == 3 else 6, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', ihdr) +
+            chunk(b'IDAT', zlib.compress(rows.tobytes(), 6)) +
+            chunk(b'IEND', b''))
+
+
+def write_png(path, pixels):
+    '''
+    Writes an array of pixels, as accepted by encode_png(), to a PNG file.
+    '''
+    with open(path, 'wb') as f:
+        f.write(encode_png(pixels))
+
+
+class OffscreenWindow(BaseWindow):
+    '''
+    A window that renders into a w x h framebuffer object instead of the
+    screen.  Plots and labels are added exactly as for a Window; the contents
+    are rendered by each call to read_pixels() or save_png().  Window and
+    framebuffer coordinates are the same, so line widths are in pixels.  The
+    window can be reused for other plots after a call to clear().
+
+    If msaa is specified, the window renders into a 4-sample framebuffer that
+    is resolved into a single-sample one before the pixels are read.
+    '''
+    def __init__(self, w, h, msaa=None, clear_color=(1, 1, 1)):
+        _init_context()
+
+        self.fbo      = GL.glGenFramebuffers(1)
+        self.rbo      = GL.glGenRenderbuffers(1)
+        self.ms_fbo   = None
+        self.ms_rbo   = None
+        self._attach(self.fbo, self.rbo, 0, w, h)
+        if msaa is not None:
+            self.ms_fbo = GL.glGenFramebuffers(1)
+            self.ms_rbo = GL.glGenRenderbuffers(1)
+            self._attach(self.ms_fbo, self.ms_rbo, 4, w, h)
+
+        super().__init__(w, h, w, h, msaa=msaa, clear_color=clear_color)
+        self.framebuffer = self.ms_fbo or self.fbo
+
+    @staticmethod
+    def _attach(fbo, rbo, samples, w, h):
+        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, rbo)
+        GL.glRenderbufferStorageMultisample(GL.GL_RENDERBUFFER, samples,
+                                            GL.GL_RGBA8, w, h)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, fbo)
+        GL.glFramebufferRenderbuffer(GL.GL_FRAMEBUFFER,
+                                     GL.GL_COLOR_ATTACHMENT0,
+                                     GL.GL_RENDERBUFFER, rbo)
+        status = GL.glCheckFramebufferStatus(GL.GL_FRAMEBUFFER)
+        if status != GL.GL_FRAMEBUFFER_COMPLETE:
+            raise Exception('Framebuffer incomplete: 0x%04X' % status)
+
+    def _destroy(self):
+        _make_current()
+        for fbo in (self.fbo, self.ms_fbo):
+            if fbo is not None:
+                GL.glDeleteFramebuffers(1, [fbo])
+        for rbo in (self.rbo, self.ms_rbo):
+            if rbo is not None:
+                GL.glDeleteRenderbuffers(1, [rbo])
+        self.fbo = self.ms_fbo = self.rbo = self.ms_rbo = None
+
+    def _draw(self, t):
+        _make_current()
+        return super()._draw(t)
+
+    def swap_buffers(self):
+        if self.ms_fbo is not None:
+            GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, self.ms_fbo)
+            GL.glBindFramebuffer(GL.GL_DRAW_FRAMEBUFFER, self.fbo)
+            GL.glBlitFramebuffer(0, 0, self.fb_w, self.fb_h,
+                                 0, 0, self.fb_w, self.fb_h,
+                                 GL.GL_COLOR_BUFFER_BIT, GL.GL_NEAREST)
+
+    def read_pixels(self, t=0):
+        '''
+        Renders the window at time t and returns its contents as an (h, w, 3)
+        array of 8-bit RGB pixels, with the top row first.  The window is
+        always redrawn, since changes to series data don't mark it dirty.
+        '''
+        profiler.begin_frame()
+        self._dirty = True
+        self._draw(t)
+
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, self.fbo)
+        GL.glPixelStorei(GL.GL_PACK_ALIGNMENT, 1)
+        data = GL.glReadPixels(0, 0, self.fb_w, self.fb_h, GL.GL_RGB,
+                               GL.GL_UNSIGNED_BYTE)
+        GL.glPixelStorei(GL.GL_PACK_ALIGNMENT, 4)
+
+        pixels = np.frombuffer(data, dtype=np.uint8)
+        return pixels.reshape((self.fb_h, self.fb_w, 3))[::-1]
+
+    def save_png(self, path, t=0):
+        '''
+        Renders the window at time t and saves its contents to a PNG file.
+        '''
+        write_png(path, self.read_pixels(t))
@@ -8,13 +8,16 @@ from . import matrix
 from . import constants
 from . import ticker
 from . import fonts
-from . import programs
 from . import colors
-from .label import Label
+from .label import LabelBatch
+from .plot_cache import PlotCache
 from .series import Series
 from .hline import HLine
 from .vline import VLine
 from .step_series import StepSeries
+from .rolling_series import RollingSeries
+from .series_batch import SeriesBatch
+from .data_buffer import BufferSeries
 
 
 PAD_L       = 0.05
@@ -27,12 +30,13 @@ class DragState:
     def __init__(self, plot, mbs):
         self.plot            = plot
         self.mbs             = mbs
-        self.click_fb_point  = plot._window_to_data(mbs.click_x, mbs.click_y)
+        self.click_fb_point  = plot._window_to_view(mbs.click_x, mbs.click_y)
 
     def handle_mouse_moved(self, x, y):
-        self.plot._gen_mvp_from_point(self.click_fb_point, (x, y))
-        self.plot._gen_ticks()
-        self.plot._update_shared_axes()
+        l, r, b, t = self.plot._get_view_bounds()
+        self.plot._set_pending_view(
+            *self.plot._lrbt_from_dimensions_and_point(
+                r - l, t - b, self.click_fb_point, (x, y)))
 
 
 class NoAspect:
@@ -88,7 +92,7 @@ class Plot:
     def __init__(self, window, bounds=(0, 0, 1, 1), limits=None, _colors=None,
                  max_h_ticks=MAX_H_TICKS, max_v_ticks=MAX_V_TICKS,
                  aspect=constants.ASPECT_NONE, sharex=None, sharey=None,
-                 visible=True, label_font=None, border_width=1):
+                 visible=True, label_font=None, border_width=1, cached=True):
         l, b, r, t = limits if limits else (-1, -1, 1, 1)
 
         self.window         = window
@@ -116,30 +120,41 @@ class Plot:
         self.mvp32          = None
         self.mouse_state    = None
         self.series         = []
+        self.series_batches = []
         self.graph_artists  = []
+        self.pending_view   = None
         self.border_lines   = glotlib.miter_lines.from_points([(0, 0)] * 6)
         self.border_width   = border_width
         self.h_ticks        = []
         self.v_ticks        = []
         self.snapped        = False
+        self.dirty          = True
+        self.chrome_dirty   = True
+        self.data_cache     = None
+        self.chrome_cache   = None
+        if cached:
+            self.data_cache   = PlotCache(window.msaa_samples)
+            self.chrome_cache = PlotCache(window.msaa_samples)
 
         self.sharex.add(self)
         self.sharey.add(self)
 
-        self.label_font = label_font or fonts.vera(12, 0)
+        self.label_font  = label_font or fonts.vera(12, 0, dynamic=True)
+        self.label_batch = LabelBatch(window, self.label_font)
 
         for _ in range(max_h_ticks):
-            self.h_ticks.append(Label(window, (0, 0), '', self.label_font,
-                                      anchor='N'))
+            self.h_ticks.append(self.label_batch.add_label((0, 0), '',
+                                                           anchor='N'))
         for _ in range(max_v_ticks):
-            self.v_ticks.append(Label(window, (0, 0), '', self.label_font,
-                                      anchor='E'))
+            self.v_ticks.append(self.label_batch.add_label((0, 0), '',
+                                                           anchor='E'))
 
-        self.x_label = Label(window, (0, 0), '', self.label_font, anchor='N',
-                             visible=False)
+        self.x_label = self.label_batch.add_label((0, 0), '', anchor='N',
+                                                  visible=False)
         self.x_label_side = 'bottom'
-        self.y_label = Label(window, (0, 0), '', self.label_font, anchor='S',
-                             visible=False, theta=math.pi / 2)
+        self.y_label = self.label_batch.add_label((0, 0), '', anchor='S',
+                                                  visible=False,
+                                                  theta=math.pi / 2)
         self.y_label_side = 'left'
 
         self._gen_bounds()
@@ -148,6 +163,21 @@ class Plot:
         self._gen_ticks()
         self._update_shared_axes()
 
+    def _destroy(self):
+        '''
+        Deletes the GL objects of the plot and everything drawn in it, and
+        stops sharing its axes with other plots.
+        '''
+        for ga in self.graph_artists:
+            ga._destroy()
+        self.border_lines._destroy()
+        self.label_batch._destroy()
+        for c in (self.data_cache, self.chrome_cache):
+            if c is not None:
+                c._destroy()
+        self.sharex.discard(self)
+        self.sharey.discard(self)
+
     def _get_data_bounds(self):
         l = self.mvpi[0][3] - self.mvpi[0][0]
         r = self.mvpi[0][3] + self.mvpi[0][0]
@@ -157,6 +187,32 @@ class Plot:
         r, t, _, _ = self.rmatrixi @ (r, t, 0, 1)
         return l, r, b, t
 
+    def _get_view_bounds(self):
+        '''
+        Returns the data bounds that the plot will be showing at the next
+        frame, including any pending pan or zoom.
+        '''
+        if self.pending_view is not None:
+            return self.pending_view
+        return self._get_data_bounds()
+
+    def _set_pending_view(self, l, r, b, t):
+        '''
+        Records the data bounds that the plot should show, without updating
+        its matrices, ticks or shared axes until the next frame is drawn, so
+        that any number of input events per frame cost a single update.
+        '''
+        self.pending_view = (l, r, b, t)
+        self.window.mark_dirty()
+
+    def _apply_pending_view(self):
+        if self.pending_view is None:
+            return
+
+        self._gen_mvp_from_limits(*self.pending_view)
+        self._gen_ticks()
+        self._update_shared_axes()
+
     def _update_shared_axes(self):
         l, r, b, t = self._get_data_bounds()
         for p in self.sharex:
@@ -184,6 +240,8 @@ class Plot:
         return l, r, b, t
 
     def _handle_resize(self):
+        self._apply_pending_view()
+
         p_w    = self.w
         p_h    = self.h
         xc, yc = self._window_to_data(self.x + self.w / 2, self.y + self.h / 2)
@@ -222,12 +280,16 @@ class Plot:
         self.fb_w  = round(w * self.window.fb_w / self.window.w_w)
         self.fb_h  = round(h * self.window.fb_h / self.window.w_h)
 
+        self.dirty        = True
+        self.chrome_dirty = True
+
     def _renormalize(self, l, r, b, t):
         self.rmatrix  = matrix.ortho(l, r, b, t, -1, 1, dtype=np.float64)
         self.rmatrixi = matrix.unortho(l, r, b, t, -1, 1, dtype=np.float64)
         self.mvp      = matrix.ortho(-1, 1, -1, 1, -1, 1, dtype=np.float64)
         self.mvpi     = matrix.unortho(-1, 1, -1, 1, -1, 1, dtype=np.float64)
         self.mvp32    = np.array(self.mvp, dtype=np.float32)
+        self.dirty    = True
         for ga in self.graph_artists:
             ga.renormalize()
 
@@ -281,9 +343,13 @@ class Plot:
         '''
         ml, mb, _, _ = self.rmatrix @ (l, b, 0, 1)
         mr, mt, _, _ = self.rmatrix @ (r, t, 0, 1)
-        self.mvp   = matrix.ortho(ml, mr, mb, mt, -1, 1, dtype=np.float64)
-        self.mvpi  = matrix.unortho(ml, mr, mb, mt, -1, 1, dtype=np.float64)
-        self.mvp32 = np.array(self.mvp, dtype=np.float32)
+        self.mvp          = matrix.ortho(ml, mr, mb, mt, -1, 1,
+                                         dtype=np.float64)
+        self.mvpi         = matrix.unortho(ml, mr, mb, mt, -1, 1,
+                                           dtype=np.float64)
+        self.mvp32        = np.array(self.mvp, dtype=np.float32)
+        self.pending_view = None
+        self.dirty        = True
         self.window.mark_dirty()
 
         K        = 2**(23 - 2)
@@ -300,11 +366,11 @@ class Plot:
 
         self.snapped = False
 
-    def _gen_mvp_from_dimensions_and_point(self, w, h, d_point, p_point):
+    def _lrbt_from_dimensions_and_point(self, w, h, d_point, p_point):
         '''
-        Generates mvp and mvpi such that we will be viewing a rectangle of
-        data dimensions w x h with the (x, y) data point d_point locked to the
-        center of the (x, y) plot pixel p_point.
+        Returns the bounds of a rectangle of data dimensions w x h with the
+        (x, y) data point d_point locked to the center of the (x, y) plot
+        pixel p_point.
         '''
         p_x_ratio  = (p_point[0] - self.x) / self.w
         p_y_ratio  = (p_point[1] - self.y) / self.h
@@ -312,7 +378,16 @@ class Plot:
         r          = l + w
         b          = d_point[1] - p_y_ratio * h
         t          = b + h
-        self._gen_mvp_from_limits(l, r, b, t)
+        return l, r, b, t
+
+    def _gen_mvp_from_dimensions_and_point(self, w, h, d_point, p_point):
+        '''
+        Generates mvp and mvpi such that we will be viewing a rectangle of
+        data dimensions w x h with the (x, y) data point d_point locked to the
+        center of the (x, y) plot pixel p_point.
+        '''
+        self._gen_mvp_from_limits(
+            *self._lrbt_from_dimensions_and_point(w, h, d_point, p_point))
 
     def _gen_mvp_from_point(self, d_point, p_point, rx=1, ry=1):
         '''
@@ -333,6 +408,18 @@ class Plot:
         v = self.rmatrixi @ self.mvpi @ (x, y, 0, 1)
         return v[0], v[1]
 
+    def _window_to_view(self, x, y):
+        '''
+        Converts a window coordinate to a data coordinate in the view the plot
+        will be showing at the next frame, including any pending pan or zoom.
+        '''
+        if self.pending_view is None:
+            return self._window_to_data(x, y)
+
+        l, r, b, t = self.pending_view
+        return (l + (x - self.x) * (r - l) / self.w,
+                b + (y - self.y) * (t - b) / self.h)
+
     def _data_to_window(self, x, y):
         '''
         Converts a data coordinate to a window coordinate.
@@ -379,22 +466,28 @@ class Plot:
         else:
             rx = ry = 1 - dy / 100
 
-        fx, fy = self._window_to_data(x, y)
-        self._gen_mvp_from_point((fx, fy), (x, y), rx=rx, ry=ry)
-        self._gen_ticks()
-        self._update_shared_axes()
-
-    def _add_series(self, cls, points=None, X=None, Y=None, color=None,
-                    **kwargs):
-        color = colors.make(color, self.color_iter)
+        l, r, b, t = self._get_view_bounds()
+        fx, fy     = self._window_to_view(x, y)
+        self._set_pending_view(*self._lrbt_from_dimensions_and_point(
+            rx * (r - l), ry * (t - b), (fx, fy), (x, y)))
 
+    @staticmethod
+    def _series_vertices(points, X, Y):
         if points is not None:
-            vs = np.array(points, dtype=np.float64)
-        else:
-            vs = np.column_stack((X, Y)).astype(np.float64, copy=False)
+            return np.array(points, dtype=np.float64)
+        return np.column_stack((X, Y)).astype(np.float64, copy=False)
 
-        s = cls(self, vs, color=color, **kwargs)
-        s.renormalize()
+    def _add_series(self, cls, points=None, X=None, Y=None, color=None, *,
+                    data=None, **kwargs):
+        color = colors.make(color, self.color_iter)
+        if data is not None:
+            if cls is not Series:
+                raise Exception('Only lines and points can be drawn from a '
+                                'DataBuffer.')
+            s = BufferSeries(self, data, color=color, **kwargs)
+        else:
+            vs = self._series_vertices(points, X, Y)
+            s  = cls(self, vs, color=color, **kwargs)
         self.series.append(s)
         self.graph_artists.append(s)
         return s
@@ -405,6 +498,28 @@ class Plot:
         be encoded in a list of (x, y) tuples using the points keyword argument,
         or they can be encoded as separate lists of X and Y coordinates using
         the X and Y keyword arguments.
+
+        The renorm_mode keyword argument can be either RENORM_CPU or
+        RENORM_GPU.  RENORM_GPU doubles the GPU memory used by the series but
+        makes renormalizing the plot while panning or zooming deep into the
+        data essentially free, which helps with very large series.  RENORM_RAW
+        keeps the data in float32 format so that float32 buffers can be handed
+        to the series' set_raw_data() and append_raw_data() methods without
+        any conversion or copying.
+
+        Large series with sorted X values are drawn from a min/max level-of-
+        detail pyramid when many vertices land in each pixel column; pass
+        lod=False to always draw every segment.
+
+        Pass streaming=True for series whose data is completely replaced every
+        frame, such as animations; full-array updates then orphan the GPU
+        buffer instead of waiting for the GPU to finish drawing from it.
+
+        Instead of points or X and Y, the data keyword argument can specify a
+        DataBuffer to draw, which shares its vertices with the other series
+        drawing the same buffer.  The renorm_mode and streaming modes then
+        come from the buffer; passing either argument is allowed only if it
+        matches the buffer and raises a ValueError otherwise.
         '''
         return self._add_series(Series, points=points, **kwargs)
 
@@ -413,7 +528,8 @@ class Plot:
         Adds a set of Points at the specified points.  The points can be
         encoded in a list of (x, y) tuples using the points keyword argument,
         or they can be encoded as separate lists of X and Y coordinates using
-        the X and Y keyword arguments.
+        the X and Y keyword arguments, or taken from a DataBuffer using the
+        data keyword argument.
         '''
         return self._add_series(Series, points=points, width=None,
                                 point_width=width, **kwargs)
@@ -424,6 +540,38 @@ class Plot:
         '''
         return self._add_series(StepSeries, points=points, **kwargs)
 
+    def add_rolling_lines(self, capacity, points=None, **kwargs):
+        '''
+        Adds a set of Lines that only keeps the most recent capacity points,
+        discarding the oldest points as new ones are appended.  This is
+        intended for strip charts that are continuously appended to, since the
+        cost of an append is proportional to the number of new points rather
+        than the total number of points in the series.
+        '''
+        return self._add_series(RollingSeries, points=points,
+                                capacity=capacity, **kwargs)
+
+    def add_batched_lines(self, points=None, X=None, Y=None, color=None,
+                          **kwargs):
+        '''
+        Adds a set of Lines like add_lines(), except that the lines are packed
+        into a SeriesBatch with the plot's other batched lines so that they
+        can all be drawn with a single draw call.  This is much faster for
+        plots with many traces, but batched lines can't have points and are
+        always drawn at full resolution.  The width and color keyword
+        arguments are supported.
+        '''
+        if not self.series_batches or self.series_batches[-1].is_full():
+            batch = SeriesBatch(self)
+            self.series_batches.append(batch)
+            self.graph_artists.append(batch)
+
+        color = colors.make(color, self.color_iter)
+        vs    = self._series_vertices(points, X, Y)
+        s     = self.series_batches[-1].add_series(vs, color=color, **kwargs)
+        self.series.append(s)
+        return s
+
     def add_hline(self, y, color=None, **kwargs):
         '''
         Adds a horizontal line at the specified y coordinate.
@@ -518,29 +666,115 @@ class Plot:
     def set_bounds(self, bounds, **kwargs):
         self.window.set_plot_bounds(self, bounds, **kwargs)
 
-    def draw(self, t):
-        GL.glViewport(0, 0, self.window.fb_w, self.window.fb_h)
+    def _draw_graph_artists(self, t):
+        for ga in self.graph_artists:
+            # TODO: I feel like this is where self.mvp32 goes.
+            ga.draw(t, 0, self.mvp, (self.w, self.h))
+
+    def _draw_chrome(self, x=0, y=0):
+        '''
+        Draws the border and the labels, with the framebuffer pixel (x, y) at
+        the origin of the bound framebuffer.
+        '''
+        GL.glViewport(-x, -y, self.window.fb_w, self.window.fb_h)
         self.border_lines.bind(0)
         self.border_lines.use_program(self.border_width, 0, self.window.mvp,
                                       (0, 0, 0, 1),
                                       (self.window.w_w, self.window.w_h))
         self.border_lines.draw()
 
-        self.label_font.bind(0)
-        programs.text.useProgram()
-        programs.text.uniform1f('u_z', 0)
-        programs.text.uniform4f('u_color', 0, 0, 0, 1)
-        programs.text.uniform1i('u_sampler', 0)
-        GL.glEnable(GL.GL_BLEND)
-        for h_t in self.h_ticks:
-            h_t.draw_batched(self.window.mvp)
-        for v_t in self.v_ticks:
-            v_t.draw_batched(self.window.mvp)
-        self.x_label.draw_batched(self.window.mvp)
-        self.y_label.draw_batched(self.window.mvp)
-        GL.glDisable(GL.GL_BLEND)
-
-        GL.glViewport(self.fb_x, self.fb_y, self.fb_w, self.fb_h)
-        for ga in self.graph_artists:
-            # TODO: I feel like this is where self.mvp32 goes.
-            ga.draw(t, 0, self.mvp, (self.w, self.h))
+        self.label_batch.draw(self.window.mvp)
+
+    def _chrome_rect(self):
+        '''
+        Returns the (x, y, w, h) rectangle of framebuffer pixels enclosing the
+        border and all the labels, clipped to the window.
+        '''
+        pad = self.border_width + 1
+        x0  = self.x - pad
+        y0  = self.y - pad
+        x1  = self.x + self.w + pad
+        y1  = self.y + self.h + pad
+
+        self.label_batch.update()
+        if self.label_batch.extent is not None:
+            l, b, r, t = self.label_batch.extent
+            x0 = min(x0, l - 1)
+            y0 = min(y0, b - 1)
+            x1 = max(x1, r + 1)
+            y1 = max(y1, t + 1)
+
+        x0 = max(math.floor(x0 * self.window.r_w), 0)
+        y0 = max(math.floor(y0 * self.window.r_h), 0)
+        x1 = min(math.ceil(x1 * self.window.r_w), self.window.fb_w)
+        y1 = min(math.ceil(y1 * self.window.r_h), self.window.fb_h)
+        return x0, y0, x1 - x0, y1 - y0
+
+    def _update_data_cache(self, t):
+        '''
+        Redraws the graph artists into the plot's data cache if anything
+        affecting them has changed since they were last drawn.  Returns True
+        if the graph artists should be drawn directly into the window instead,
+        because they are changing on consecutive frames.
+        '''
+        dirty, self.dirty = self.dirty, False
+        if self.data_cache.skip(dirty):
+            return True
+
+        rect = (self.fb_x, self.fb_y, self.fb_w, self.fb_h)
+        if self.data_cache.stale or not self.data_cache.fits(*rect):
+            self.data_cache.begin(*rect)
+            self._draw_graph_artists(t)
+            self.data_cache.end(self.window.framebuffer)
+        return False
+
+    def _update_chrome_cache(self):
+        '''
+        Redraws the border and labels into the plot's chrome cache if the
+        plot's bounds or any of its labels have changed since they were last
+        drawn.  Returns True if they should be drawn directly into the window
+        instead, because they are changing on consecutive frames, as the tick
+        labels do while the plot is being dragged.
+        '''
+        dirty             = self.chrome_dirty or self.label_batch.dirty
+        self.chrome_dirty = False
+        if self.chrome_cache.skip(dirty):
+            return True
+
+        if self.chrome_cache.stale:
+            x, y, w, h = self._chrome_rect()
+            if w <= 0 or h <= 0:
+                return True
+
+            self.chrome_cache.begin(x, y, w, h)
+            self._draw_chrome(x, y)
+            self.chrome_cache.end(self.window.framebuffer)
+        return False
+
+    def draw(self, t):
+        empty         = (self.fb_w <= 0 or self.fb_h <= 0)
+        direct_chrome = True
+        direct_data   = True
+        if self.data_cache is not None:
+            direct_chrome = self._update_chrome_cache()
+            direct_data   = empty or self._update_data_cache(t)
+
+        if direct_chrome:
+            self._draw_chrome()
+        else:
+            self.chrome_cache.draw(hole=(self.fb_x, self.fb_y,
+                                         self.fb_x + self.fb_w,
+                                         self.fb_y + self.fb_h))
+
+        if empty:
+            return
+        if direct_data:
+            # Points and wide lines can spill out of the viewport; clip them
+            # to the data area as the data cache does.
+            GL.glViewport(self.fb_x, self.fb_y, self.fb_w, self.fb_h)
+            GL.glScissor(self.fb_x, self.fb_y, self.fb_w, self.fb_h)
+            GL.glEnable(GL.GL_SCISSOR_TEST)
+            self._draw_graph_artists(t)
+            GL.glDisable(GL.GL_SCISSOR_TEST)
+        else:
+            self.data_cache.draw()
@@ -0,0 +1,194 @@
+from OpenGL import GL
+
+from . import gl_state
+from . import programs
+
+
+class DrawAttribute:
+    '''
+    A descriptor for the attributes of a graph artist that affect how it is
+    drawn, such as its color or visibility.  Assigning to one marks the
+    artist's plot dirty, so that its cached image gets redrawn.
+    '''
+    def __init__(self):
+        self.name = None
+
+    def __set_name__(self, _owner, name):
+        self.name = '_' + name
+
+    def __get__(self, obj, _owner=None):
+        if obj is None:
+            return self
+        return obj.__dict__[self.name]
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.name] = value
+        obj.plot.dirty = True
+
+
+class PlotCache:
+    '''
+    An offscreen image of part of a plot, covering a rectangle of the window
+    in framebuffer pixels.  Plots keep one for their graph artists and one
+    for their border and labels, which are only drawn into the cache when
+    something that affects them changes; on every other frame the cached
+    image is copied into the window, so that a static plot costs a couple of
+    textured quads no matter how much data it is showing.
+
+    The image is drawn with premultiplied alpha into a transparent texture and
+    blended over the framebuffer when copied into the window, so that its
+    antialiased edges blend with whatever is already underneath them, such as
+    the neighbouring plots, exactly as they would had the image been drawn
+    directly.  If the window is multisampled, the image is drawn into a
+    multisampled renderbuffer which is then resolved into the texture.
+
+    The image is stale until it has been drawn and must be marked stale again
+    whenever it no longer matches the plot.  Content that changes on
+    consecutive frames gains nothing from the cache, so the owner can use
+    skip() to draw such content directly until it settles down.
+    '''
+    def __init__(self, samples=None):
+        self.samples      = samples
+        self.x            = 0
+        self.y            = 0
+        self.w            = 0
+        self.h            = 0
+        self.stale        = True
+        self.dirty_frames = 0
+        self.texture      = GL.glGenTextures(1)
+        self.fbo          = GL.glGenFramebuffers(1)
+        self.vao          = GL.glGenVertexArrays(1)
+        self.ms_fbo       = None
+        self.ms_rbo       = None
+        if samples:
+            self.ms_fbo = GL.glGenFramebuffers(1)
+            self.ms_rbo = GL.glGenRenderbuffers(1)
+
+    def _destroy(self):
+        gl_state.delete_texture(self.texture)
+        gl_state.delete_vertex_array(self.vao)
+        for fbo in (self.fbo, self.ms_fbo):
+            if fbo is not None:
+                GL.glDeleteFramebuffers(1, [fbo])
+        if self.ms_rbo is not None:
+            GL.glDeleteRenderbuffers(1, [self.ms_rbo])
+
+    @staticmethod
+    def _check_status():
+        status = GL.glCheckFramebufferStatus(GL.GL_FRAMEBUFFER)
+        if status != GL.GL_FRAMEBUFFER_COMPLETE:
+            raise Exception('Framebuffer incomplete: 0x%04X' % status)
+
+    def _resize(self, w, h):
+        gl_state.bind_texture(0, GL.GL_TEXTURE_2D, self.texture)
+        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGBA8, w, h, 0, GL.GL_RGBA,
+                        GL.GL_UNSIGNED_BYTE, None)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER,
+                           GL.GL_NEAREST)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER,
+                           GL.GL_NEAREST)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.fbo)
+        GL.glFramebufferTexture2D(GL.GL_FRAMEBUFFER, GL.GL_COLOR_ATTACHMENT0,
+                                  GL.GL_TEXTURE_2D, self.texture, 0)
+        self._check_status()
+
+        if self.ms_fbo is not None:
+            GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, self.ms_rbo)
+            GL.glRenderbufferStorageMultisample(GL.GL_RENDERBUFFER,
+                                                self.samples, GL.GL_RGBA8,
+                                                w, h)
+            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.ms_fbo)
+            GL.glFramebufferRenderbuffer(GL.GL_FRAMEBUFFER,
+                                         GL.GL_COLOR_ATTACHMENT0,
+                                         GL.GL_RENDERBUFFER, self.ms_rbo)
+            self._check_status()
+
+        self.w = w
+        self.h = h
+
+    def skip(self, dirty):
+        '''
+        Called once per frame with whether the cached content has changed
+        since the previous frame.  Returns True if the content has changed on
+        consecutive frames and should be drawn directly instead of through the
+        cache.
+        '''
+        if not dirty:
+            self.dirty_frames = 0
+            return False
+
+        self.stale         = True
+        self.dirty_frames += 1
+        return self.dirty_frames > 1
+
+    def fits(self, x, y, w, h):
+        return (self.x, self.y, self.w, self.h) == (x, y, w, h)
+
+    def begin(self, x, y, w, h):
+        '''
+        Starts drawing a new image of the w x h framebuffer rectangle with its
+        bottom-left corner at pixel (x, y), clearing it to transparent black.
+        The viewport is set to cover the whole image and blending, wherever it
+        gets enabled, accumulates premultiplied alpha.
+        '''
+        if (self.w, self.h) != (w, h):
+            self._resize(w, h)
+        self.x = x
+        self.y = y
+
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.ms_fbo or self.fbo)
+        GL.glViewport(0, 0, w, h)
+        GL.glClearBufferfv(GL.GL_COLOR, 0, (0, 0, 0, 0))
+        GL.glBlendFuncSeparate(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA,
+                               GL.GL_ONE, GL.GL_ONE_MINUS_SRC_ALPHA)
+
+    def end(self, framebuffer):
+        '''
+        Finishes drawing the image and binds the specified framebuffer and
+        the usual blending function again.
+        '''
+        if self.ms_fbo is not None:
+            GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, self.ms_fbo)
+            GL.glBindFramebuffer(GL.GL_DRAW_FRAMEBUFFER, self.fbo)
+            GL.glBlitFramebuffer(0, 0, self.w, self.h, 0, 0, self.w, self.h,
+                                 GL.GL_COLOR_BUFFER_BIT, GL.GL_NEAREST)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, framebuffer)
+        GL.glBlendFunc(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
+        self.stale = False
+
+    def _rects(self, hole):
+        '''
+        Returns the (x, y, w, h) rectangles covering the image except for the
+        (x0, y0, x1, y1) hole.
+        '''
+        x0, y0 = self.x, self.y
+        x1, y1 = self.x + self.w, self.y + self.h
+        if hole is None:
+            return [(x0, y0, x1 - x0, y1 - y0)]
+
+        hx0 = min(max(hole[0], x0), x1)
+        hy0 = min(max(hole[1], y0), y1)
+        hx1 = min(max(hole[2], hx0), x1)
+        hy1 = min(max(hole[3], hy0), y1)
+        return [(x0, y0, x1 - x0, hy0 - y0),
+                (x0, hy1, x1 - x0, y1 - hy1),
+                (x0, hy0, hx0 - x0, hy1 - hy0),
+                (hx1, hy0, x1 - hx1, hy1 - hy0)]
+
+    def draw(self, hole=None):
+        '''
+        Blends the image over its rectangle of the bound framebuffer.  If the
+        image is known to be empty inside the (x0, y0, x1, y1) rectangle hole,
+        that part isn't copied at all.
+        '''
+        gl_state.bind_texture(0, GL.GL_TEXTURE_2D, self.texture)
+        gl_state.bind_vertex_array(self.vao)
+        programs.composite.use(0, (self.x, self.y))
+        GL.glEnable(GL.GL_BLEND)
+        GL.glBlendFunc(GL.GL_ONE, GL.GL_ONE_MINUS_SRC_ALPHA)
+        for x, y, w, h in self._rects(hole):
+            if w > 0 and h > 0:
+                GL.glViewport(x, y, w, h)
+                GL.glDrawArrays(GL.GL_TRIANGLE_STRIP, 0, 4)
+        GL.glBlendFunc(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
+        GL.glDisable(GL.GL_BLEND)
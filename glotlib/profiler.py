@@ -0,0 +1,296 @@
+'''
+Per-frame timing instrumentation.  While the profiler is enabled, the main
+loop and the windows record how long each frame spent in each of the PHASES,
+how long each plot took to draw and, using GL_TIME_ELAPSED queries, how long
+the GPU took to execute each window's draw commands.  The timings of the last
+capacity frames are kept in a fixed-size ring buffer and can be retrieved with
+get_frames(), get_plot_times() and get_summary(), or plotted live in a window
+with Window.add_profiler_overlay().
+
+All times are in seconds.  CPU time is attributed to a phase when the phase
+ends; a frame's total also includes any time spent outside the instrumented
+phases, such as in application code between frames.  GPU timings are collected
+without stalling the pipeline, so they usually arrive a few frames late and the
+gpu column of the most recent frames may still be NaN.
+
+When the profiler is disabled, the instrumentation costs one function call per
+phase.
+'''
+import collections
+import ctypes
+import time
+import weakref
+
+import numpy as np
+from OpenGL import GL
+import OpenGL.raw.GL.VERSION.GL_3_3 as raw_gl
+
+from .plot import Plot
+
+
+# The CPU phases of a frame, in the order in which they occur.
+PHASES = (
+    'poll',             # Handling window system events.
+    'ingest',           # Applying data pushed from other threads.
+    'view',             # Applying the pans and zooms input since last frame.
+    'update_geometry',  # Window.update_geometry() for each window.
+    'plots',            # Drawing the plots.
+    'labels',           # Drawing the window labels.
+    'draw',             # Window.draw() for each window.
+    'swap',             # Swapping or resolving the framebuffers.
+    'idle',             # Sleeping when no window needed redrawing.
+)
+
+# The columns of the ring buffer: the CPU phases, the GPU time and the total
+# wall time of the frame.
+COLUMNS = PHASES + ('gpu', 'total')
+COLUMN  = {c: i for i, c in enumerate(COLUMNS)}
+GPU     = COLUMN['gpu']
+TOTAL   = COLUMN['total']
+
+CAPACITY    = 512
+GPU_QUERIES = 8
+
+PROFILER = None
+
+
+class GPUTimer:
+    '''
+    A pool of GL_TIME_ELAPSED queries for a single window.  A query is only
+    read back once its result is available, and a frame goes untimed if all
+    the queries are still in flight.
+    '''
+    def __init__(self, nqueries=GPU_QUERIES):
+        self.free    = list(GL.glGenQueries(nqueries))
+        self.pending = collections.deque()
+        self.active  = None
+
+    def begin(self, frame):
+        if not self.free:
+            return
+        q = self.free.pop()
+        GL.glBeginQuery(GL.GL_TIME_ELAPSED, q)
+        self.active = (q, frame)
+
+    def end(self):
+        if self.active is None:
+            return
+        GL.glEndQuery(GL.GL_TIME_ELAPSED)
+        self.pending.append(self.active)
+        self.active = None
+
+    def collect(self):
+        '''
+        Returns a list of (frame, seconds) tuples for the queries that have
+        completed.
+        '''
+        results = []
+        ns      = ctypes.c_uint64()
+        while self.pending:
+            q, frame = self.pending[0]
+            if not GL.glGetQueryObjectiv(q, GL.GL_QUERY_RESULT_AVAILABLE):
+                break
+
+            # PyOpenGL's wrapper can't convert 64-bit results, so call the
+            # raw entry point.
+            raw_gl.glGetQueryObjectui64v(q, GL.GL_QUERY_RESULT,
+                                         ctypes.byref(ns))
+            results.append((frame, ns.value * 1e-9))
+            self.pending.popleft()
+            self.free.append(q)
+        return results
+
+
+class Profiler:
+    def __init__(self, capacity=CAPACITY, gpu=True):
+        self.capacity   = capacity
+        self.gpu        = gpu
+        self.frames     = np.full((capacity, len(COLUMNS)), np.nan)
+        self.plot_times = weakref.WeakKeyDictionary()
+        self.gpu_timers = weakref.WeakKeyDictionary()
+        self.frame      = -1
+        self.row        = None
+        self.t_frame    = None
+        self.t_mark     = None
+
+    def begin_frame(self):
+        t = time.perf_counter()
+        if self.row is not None:
+            self.row[TOTAL] = t - self.t_frame
+
+        self.frame       += 1
+        index             = self.frame % self.capacity
+        self.row          = self.frames[index]
+        self.row[:]       = 0
+        self.row[GPU]     = np.nan
+        self.row[TOTAL]   = np.nan
+        for times in self.plot_times.values():
+            times[index] = np.nan
+
+        self.t_frame = t
+        self.t_mark  = t
+
+    def mark(self, phase):
+        t = time.perf_counter()
+        if self.row is not None:
+            self.row[COLUMN[phase]] += t - self.t_mark
+        self.t_mark = t
+        return t
+
+    def mark_plot(self, plot):
+        t0 = self.t_mark
+        dt = self.mark('plots') - t0
+        if self.row is None:
+            return
+
+        times = self.plot_times.get(plot)
+        if times is None:
+            times = np.full(self.capacity, np.nan)
+            self.plot_times[plot] = times
+        times[self.frame % self.capacity] = dt
+
+    def begin_gpu(self, window):
+        if not self.gpu or self.row is None:
+            return
+
+        timer = self.gpu_timers.get(window)
+        if timer is None:
+            timer = GPUTimer()
+            self.gpu_timers[window] = timer
+
+        for frame, dt in timer.collect():
+            if self.frame - frame < self.capacity:
+                row      = self.frames[frame % self.capacity]
+                row[GPU] = np.nansum((row[GPU], dt))
+        timer.begin(self.frame)
+
+    def end_gpu(self, window):
+        timer = self.gpu_timers.get(window)
+        if timer is not None:
+            timer.end()
+
+    def _indices(self, n):
+        '''
+        Returns the ring buffer indices of the last n completed frames, oldest
+        first.
+        '''
+        n = min(self.frame, self.capacity - 1, n or self.capacity)
+        return np.arange(self.frame - n, self.frame) % self.capacity
+
+    def get_frames(self, n=None):
+        frames = self.frames[self._indices(n)]
+        return {c: frames[:, i] for i, c in enumerate(COLUMNS)}
+
+    def get_plot_times(self, plot, n=None):
+        times = self.plot_times.get(plot)
+        if times is None:
+            return np.full(len(self._indices(n)), np.nan)
+        return times[self._indices(n)]
+
+
+class Overlay(Plot):
+    '''
+    A plot showing the CPU phase timings of the last n frames as stacked
+    lines, in the order of PHASES, followed by the GPU time as a separate line,
+    in milliseconds.  The plot refreshes its data whenever the window is
+    redrawn; it does not cause redraws by itself.
+    '''
+    def __init__(self, window, n=CAPACITY // 2, max_ms=1000 / 30, **kwargs):
+        kwargs.setdefault('limits', (0, 0, n - 1, max_ms))
+        super().__init__(window, **kwargs)
+
+        X         = np.arange(n)
+        self.n    = n
+        self.cpu  = [self.add_lines(X=X, Y=np.zeros(n)) for _ in PHASES]
+        self.gpu  = self.add_lines(X=X, Y=np.zeros(n), width=2)
+        self.set_y_label('ms')
+
+    def draw(self, t):
+        if PROFILER is not None:
+            frames = PROFILER.get_frames(self.n)
+            pad    = self.n - len(frames['total'])
+            Y      = np.zeros(self.n)
+            for p, s in zip(PHASES, self.cpu):
+                Y[pad:] += frames[p] * 1000
+                s.set_y_data(Y)
+            Y[pad:] = np.nan_to_num(frames['gpu']) * 1000
+            self.gpu.set_y_data(Y)
+
+        super().draw(t)
+
+
+def enable(capacity=CAPACITY, gpu=True):
+    '''
+    Starts recording the timings of the next capacity frames, discarding any
+    previous recording.  If gpu is False, no GL_TIME_ELAPSED queries are
+    issued.
+    '''
+    global PROFILER
+    PROFILER = Profiler(capacity=capacity, gpu=gpu)
+
+
+def disable():
+    global PROFILER
+    PROFILER = None
+
+
+def _get():
+    if PROFILER is None:
+        raise Exception('The profiler is not enabled.')
+    return PROFILER
+
+
+def get_frames(n=None):
+    '''
+    Returns a dict mapping each of the COLUMNS to an array holding its timings
+    for the last n completed frames, or for all the frames in the ring buffer
+    if n is None, oldest first.
+    '''
+    return _get().get_frames(n)
+
+
+def get_plot_times(plot, n=None):
+    '''
+    Returns an array of the times taken to draw the plot in the last n
+    completed frames, oldest first, with NaN for frames where it wasn't drawn.
+    '''
+    return _get().get_plot_times(plot, n)
+
+
+def get_summary(n=None):
+    '''
+    Returns a dict mapping each of the COLUMNS to a (mean, max) tuple over the
+    last n completed frames.
+    '''
+    summary = {}
+    for c, times in get_frames(n).items():
+        if np.isnan(times).all():
+            summary[c] = (np.nan, np.nan)
+        else:
+            summary[c] = (np.nanmean(times), np.nanmax(times))
+    return summary
+
+
+def begin_frame():
+    if PROFILER is not None:
+        PROFILER.begin_frame()
+
+
+def mark(phase):
+    if PROFILER is not None:
+        PROFILER.mark(phase)
+
+
+def mark_plot(plot):
+    if PROFILER is not None:
+        PROFILER.mark_plot(plot)
+
+
+def begin_gpu(window):
+    if PROFILER is not None:
+        PROFILER.begin_gpu(window)
+
+
+def end_gpu(window):
+    if PROFILER is not None:
+        PROFILER.end_gpu(window)
@@ -1,11 +1,20 @@
 import importlib.resources
 import sys
 
+import numpy as np
 from OpenGL import GL
 from OpenGL.GL import shaders
 
+from . import gl_state
+
 
 class Program:
+    '''
+    A linked shader program.  The last value set for each uniform is cached so
+    that setting a uniform to the value it already has doesn't make any GL
+    calls; uniforms must only be set through the uniform methods and while
+    the program is in use.
+    '''
     def __init__(self, v_text, f_text, uniforms=None):
         self.v_shader = shaders.compileShader(v_text, GL.GL_VERTEX_SHADER)
         self.f_shader = shaders.compileShader(f_text, GL.GL_FRAGMENT_SHADER)
@@ -16,6 +25,7 @@ class Program:
                              for u in uniforms}
         else:
             self.uniforms = {}
+        self.uniform_values = {}
 
     @staticmethod
     def from_resource(anchor, v_path, f_path, **kwargs):
@@ -34,22 +44,55 @@ class Program:
                                      **kwargs)
 
     def useProgram(self):
-        GL.glUseProgram(self.shader)
+        gl_state.use_program(self.shader)
+
+    def _cache_uniform(self, u, value):
+        '''
+        Records the new value of a uniform, returning False if the uniform
+        already had that value and doesn't need to be set.
+        '''
+        if self.uniform_values.get(u) == value:
+            gl_state.STATS['uniform_skipped'] += 1
+            return False
+
+        self.uniform_values[u] = value
+        gl_state.STATS['uniform'] += 1
+        return True
 
     def uniform1i(self, u, i):
-        GL.glUniform1i(self.uniforms[u], i)
+        if self._cache_uniform(u, i):
+            GL.glUniform1i(self.uniforms[u], i)
 
     def uniform1f(self, u, f):
-        GL.glUniform1f(self.uniforms[u], f)
+        if self._cache_uniform(u, f):
+            GL.glUniform1f(self.uniforms[u], f)
 
     def uniform2f(self, u, f0, f1):
-        GL.glUniform2f(self.uniforms[u], f0, f1)
+        if self._cache_uniform(u, (f0, f1)):
+            GL.glUniform2f(self.uniforms[u], f0, f1)
+
+    def uniform2i(self, u, i0, i1):
+        if self._cache_uniform(u, (i0, i1)):
+            GL.glUniform2i(self.uniforms[u], i0, i1)
 
     def uniform4f(self, u, f0, f1, f2, f3):
-        GL.glUniform4f(self.uniforms[u], f0, f1, f2, f3)
+        if self._cache_uniform(u, (f0, f1, f2, f3)):
+            GL.glUniform4f(self.uniforms[u], f0, f1, f2, f3)
+
+    def uniform1fv(self, u, v):
+        v = np.asarray(v, dtype=np.float32)
+        if self._cache_uniform(u, v.tobytes()):
+            GL.glUniform1fv(self.uniforms[u], len(v), v)
+
+    def uniform4fv(self, u, v):
+        v = np.asarray(v, dtype=np.float32)
+        if self._cache_uniform(u, v.tobytes()):
+            GL.glUniform4fv(self.uniforms[u], len(v), v)
 
     def uniformMatrix4fv(self, u, m):
-        GL.glUniformMatrix4fv(self.uniforms[u], 1, GL.GL_TRUE, m)
+        m = np.asarray(m, dtype=np.float32)
+        if self._cache_uniform(u, m.tobytes()):
+            GL.glUniformMatrix4fv(self.uniforms[u], 1, GL.GL_TRUE, m)
 
     def attrib_location(self, name):
         return GL.glGetAttribLocation(self.shader, name)
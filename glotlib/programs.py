@@ -1,10 +1,15 @@
 from .program import BuiltinProgram
 
 
-miter_line  = None
-square_line = None
-frag_points = None
-text        = None
+miter_line        = None
+square_line       = None
+frag_points       = None
+split_square_line = None
+split_frag_points = None
+batch_square_line = None
+text              = None
+sdf_text          = None
+composite         = None
 
 
 class MiterLineProgram(BuiltinProgram):
@@ -69,16 +74,92 @@ class FragPointsProgram(BuiltinProgram):
         self.uniformMatrix4fv('u_mvp', mvp)
 
 
+class SplitSquareLineProgram(BuiltinProgram):
+    UNIFORMS = [
+        'u_mvp',
+        'u_origin_hi',
+        'u_origin_lo',
+        'u_scale',
+        'u_width',
+        'u_resolution',
+        'u_z',
+        'u_color',
+    ]
+
+    def __init__(self):
+        super().__init__('split_square_instanced_line.vert', 'frag.frag',
+                         uniforms=self.UNIFORMS)
+
+    def use(self, width, z, mvp, origin, scale, color=(0, 0, 0, 1),
+            resolution=None):
+        self.useProgram()
+        self.uniform1f('u_width', width)
+        self.uniform1f('u_z', z)
+        self.uniform4f('u_color', *color)
+        self.uniformMatrix4fv('u_mvp', mvp)
+        self.uniform2f('u_origin_hi', origin[0], origin[1])
+        self.uniform2f('u_origin_lo', origin[2], origin[3])
+        self.uniform2f('u_scale', *scale)
+        self.uniform2f('u_resolution', *resolution)
+
+
+class SplitFragPointsProgram(BuiltinProgram):
+    UNIFORMS = [
+        'u_mvp',
+        'u_origin_hi',
+        'u_origin_lo',
+        'u_scale',
+        'u_z',
+        'u_color',
+    ]
+
+    def __init__(self):
+        super().__init__('split_mvp_z.vert', 'points.frag',
+                         uniforms=self.UNIFORMS)
+
+    def use(self, z, mvp, origin, scale, color=(0, 0, 0, 1)):
+        self.useProgram()
+        self.uniform1f('u_z', z)
+        self.uniform4f('u_color', *color)
+        self.uniformMatrix4fv('u_mvp', mvp)
+        self.uniform2f('u_origin_hi', origin[0], origin[1])
+        self.uniform2f('u_origin_lo', origin[2], origin[3])
+        self.uniform2f('u_scale', *scale)
+
+
+class BatchSquareLineProgram(BuiltinProgram):
+    UNIFORMS = [
+        'u_mvp',
+        'u_widths',
+        'u_colors',
+        'u_resolution',
+        'u_z',
+    ]
+
+    def __init__(self):
+        super().__init__('batch_square_instanced_line.vert', 'batch.frag',
+                         uniforms=self.UNIFORMS)
+
+    def use(self, widths, z, mvp, colors, resolution=None):
+        self.useProgram()
+        self.uniform1fv('u_widths', widths)
+        self.uniform1f('u_z', z)
+        self.uniform4fv('u_colors', colors)
+        self.uniformMatrix4fv('u_mvp', mvp)
+        self.uniform2f('u_resolution', *resolution)
+
+
 class TextProgram(BuiltinProgram):
     UNIFORMS = [
         'u_mvp',
         'u_z',
         'u_color',
         'u_sampler',
+        'u_tex_scale',
     ]
 
-    def __init__(self):
-        super().__init__('text.vert', 'text.frag', uniforms=self.UNIFORMS)
+    def __init__(self, f_path='text.frag'):
+        super().__init__('text.vert', f_path, uniforms=self.UNIFORMS)
 
     def use(self, z, mvp, font, color=(0, 0, 0, 1)):
         self.useProgram()
@@ -86,15 +167,47 @@ class TextProgram(BuiltinProgram):
         self.uniform4f('u_color', *color)
         self.uniformMatrix4fv('u_mvp', mvp)
         self.uniform1i('u_sampler', font.bind_unit)
+        self.uniform2f('u_tex_scale', *font.tex_scale)
+
+
+class SDFTextProgram(TextProgram):
+    def __init__(self):
+        super().__init__('text_sdf.frag')
+
+
+class CompositeProgram(BuiltinProgram):
+    UNIFORMS = [
+        'u_sampler',
+        'u_origin',
+    ]
+
+    def __init__(self):
+        super().__init__('composite.vert', 'composite.frag',
+                         uniforms=self.UNIFORMS)
+
+    def use(self, unit, origin):
+        self.useProgram()
+        self.uniform1i('u_sampler', unit)
+        self.uniform2i('u_origin', *origin)
 
 
 def load():
     global miter_line
     global square_line
     global frag_points
+    global split_square_line
+    global split_frag_points
+    global batch_square_line
     global text
-
-    miter_line  = MiterLineProgram()
-    square_line = SquareLineProgram()
-    frag_points = FragPointsProgram()
-    text        = TextProgram()
+    global sdf_text
+    global composite
+
+    miter_line        = MiterLineProgram()
+    square_line       = SquareLineProgram()
+    frag_points       = FragPointsProgram()
+    split_square_line = SplitSquareLineProgram()
+    split_frag_points = SplitFragPointsProgram()
+    batch_square_line = BatchSquareLineProgram()
+    text              = TextProgram()
+    sdf_text          = SDFTextProgram()
+    composite         = CompositeProgram()
@@ -0,0 +1,125 @@
+import numpy as np
+
+from . import programs
+
+
+class CPURenorm:
+    '''
+    The VBO holds float32 vertices that have already been multiplied by the
+    plot's renormalization matrix.  This is the cheapest encoding to draw, but
+    every time the plot renormalizes all of the vertices have to be encoded
+    again on the CPU and uploaded to the GPU.
+    '''
+    DTYPE         = np.float64
+    NCOMPONENTS   = 2
+    X_COMPONENTS  = [0]
+    Y_COMPONENTS  = [1]
+    LINE_ATTRIBS  = [(0, 0)]
+    POINT_ATTRIBS = [(0, 0)]
+    RENORMALIZE   = True
+
+    @staticmethod
+    def encode_axis(V, scale, offset):
+        V  = V * scale
+        V += offset
+        return V[:, np.newaxis]
+
+    @staticmethod
+    def use_line_program(s, z, mvp, resolution):
+        programs.square_line.use(s.width, z, mvp, color=s.color,
+                                 resolution=resolution)
+
+    @staticmethod
+    def use_point_program(s, z, mvp):
+        programs.frag_points.use(z, mvp, color=s.color)
+
+
+class GPURenorm:
+    '''
+    The VBO holds each original float64 coordinate split into a float32 hi
+    part and a float32 lo part holding the rounding error of the hi part, so
+    each vertex takes 4 components: (x_hi, y_hi, x_lo, y_lo).  The shaders
+    subtract the plot's renormalization origin (split the same way) before
+    scaling, which preserves the precision of the original data near the
+    origin.  Renormalizing the plot only changes uniforms and never touches
+    the VBO, at the cost of twice the GPU memory and upload bandwidth.
+    '''
+    DTYPE         = np.float64
+    NCOMPONENTS   = 4
+    X_COMPONENTS  = [0, 2]
+    Y_COMPONENTS  = [1, 3]
+    LINE_ATTRIBS  = [(0, 0), (3, 2)]
+    POINT_ATTRIBS = [(0, 0), (1, 2)]
+    RENORMALIZE   = False
+
+    @staticmethod
+    def encode_axis(V, _scale, _offset):
+        hi = V.astype(np.float32)
+        return np.column_stack((hi, V - hi))
+
+    @staticmethod
+    def _origin_and_scale(rmatrix):
+        sx = rmatrix[0][0]
+        sy = rmatrix[1][1]
+        ox = -rmatrix[0][3] / sx
+        oy = -rmatrix[1][3] / sy
+        hi = np.array((ox, oy), dtype=np.float32)
+        lo = np.array((ox, oy), dtype=np.float64) - hi
+        return (hi[0], hi[1], lo[0], lo[1]), (sx, sy)
+
+    @staticmethod
+    def use_line_program(s, z, mvp, resolution):
+        origin, scale = GPURenorm._origin_and_scale(s.plot.rmatrix)
+        programs.split_square_line.use(s.width, z, mvp, origin, scale,
+                                       color=s.color, resolution=resolution)
+
+    @staticmethod
+    def use_point_program(s, z, mvp):
+        origin, scale = GPURenorm._origin_and_scale(s.plot.rmatrix)
+        programs.split_frag_points.use(z, mvp, origin, scale, color=s.color)
+
+
+class RawRenorm:
+    '''
+    The VBO holds the original vertices in float32 format, exactly as the
+    client supplied them, and the renormalization matrix is folded into the
+    MVP matrix instead.  The series also keeps its original vertices in
+    float32 format, which lets the client hand over a float32 buffer that is
+    uploaded without any conversion or copying.  Renormalizing the plot never
+    touches the VBO, but the precision is limited to that of float32 in the
+    original data coordinates, so this isn't suitable for data with a large
+    offset relative to its range, such as absolute timestamps.
+    '''
+    DTYPE         = np.float32
+    NCOMPONENTS   = 2
+    X_COMPONENTS  = [0]
+    Y_COMPONENTS  = [1]
+    LINE_ATTRIBS  = [(0, 0)]
+    POINT_ATTRIBS = [(0, 0)]
+    RENORMALIZE   = False
+
+    @staticmethod
+    def encode_axis(V, _scale, _offset):
+        return V[:, np.newaxis]
+
+    @staticmethod
+    def use_line_program(s, z, mvp, resolution):
+        programs.square_line.use(s.width, z, mvp @ s.plot.rmatrix,
+                                 color=s.color, resolution=resolution)
+
+    @staticmethod
+    def use_point_program(s, z, mvp):
+        programs.frag_points.use(z, mvp @ s.plot.rmatrix, color=s.color)
+
+
+def encode(renorm, rmatrix, X, Y):
+    '''
+    Encodes the float64 X and Y coordinates into an array of float32 vertices
+    suitable for uploading to a VBO using the specified renormalization class.
+    '''
+    E = np.empty((len(X), renorm.NCOMPONENTS), dtype=np.float32)
+    E[:, renorm.X_COMPONENTS] = renorm.encode_axis(X, rmatrix[0][0],
+                                                   rmatrix[0][3])
+    E[:, renorm.Y_COMPONENTS] = renorm.encode_axis(Y, rmatrix[1][1],
+                                                   rmatrix[1][3])
+    return E
@@ -0,0 +1,108 @@
+import numpy as np
+from OpenGL import GL
+
+from . import vbo
+from . import series
+
+
+class RollingSeries(series.Series):
+    '''
+    A Series that only keeps the most recent capacity vertices, for strip-chart
+    style plots.  The vertices are stored in a ring so that appending new data
+    only writes the new vertices to the GPU, regardless of how much data the
+    series is holding; the oldest vertices are simply overwritten.
+
+    The vertices field holds the original data for all the slots currently in
+    use, but once the ring has wrapped it is no longer in chronological order.
+    '''
+    def __init__(self, plot, vertices, capacity=None, **kwargs):
+        assert capacity and capacity >= 2
+
+        self.capacity = capacity
+        super().__init__(plot, [], **kwargs)
+        self._ring    = np.zeros((capacity, 2), dtype=self.renorm.DTYPE)
+
+        # Once the ring wraps the vertices aren't in X order, so they can't be
+        # culled or decimated.
+        self.x_sorted = False
+
+        vertices = np.asarray(vertices, dtype=self.renorm.DTYPE)
+        vertices = vertices.reshape((-1, 2))
+        self.append_x_y_data(vertices[:, 0], vertices[:, 1])
+
+    def _gen_vert_vbo(self, _vertices):
+        return vbo.CircularVBO(self.capacity,
+                               ncomponents=self.renorm.NCOMPONENTS)
+
+    def _draw_line_instances(self, _first, _last):
+        for first, count in self.vert_vbo.segment_ranges():
+            self._line_attrib_pointers(first)
+            GL.glDrawArraysInstanced(GL.GL_TRIANGLES, 0,
+                                     len(series.INSTANCE_GEOMETRY), count)
+
+    def renormalize(self):
+        if len(self.vertices) == 0 or not self.renorm.RENORMALIZE:
+            return
+
+        self.vert_vbo.set_slot_data(self._encode(self.vertices[:, 0],
+                                                 self.vertices[:, 1]))
+
+    def clear(self):
+        '''
+        Discard all the data in the series.
+        '''
+        self.vert_vbo.clear()
+        self.vertices = self._ring[:0]
+        self._changed(0)
+
+    def set_x_data(self, X):
+        raise Exception('RollingSeries does not support set_x_data().')
+
+    def set_y_data(self, Y):
+        raise Exception('RollingSeries does not support set_y_data().')
+
+    def sub_x_y_data(self, index, X, Y):
+        raise Exception('RollingSeries does not support sub_x_y_data().')
+
+    def set_x_y_data(self, X, Y):
+        '''
+        Replace all the data in the series.  Only the last capacity vertices
+        are kept.
+        '''
+        self.clear()
+        self.append_x_y_data(X, Y)
+
+    def append_x_y_data(self, X, Y):
+        '''
+        Append new vertices to the series, discarding the oldest vertices if
+        the series is at capacity.  The cost is proportional to the number of
+        new vertices.
+        '''
+        assert len(X) == len(Y)
+        X = np.asarray(X, dtype=self.renorm.DTYPE)[-self.capacity:]
+        Y = np.asarray(Y, dtype=self.renorm.DTYPE)[-self.capacity:]
+        if len(X) == 0:
+            return
+
+        slots = (self.vert_vbo.head + np.arange(len(X))) % self.capacity
+        self._ring[slots, 0] = X
+        self._ring[slots, 1] = Y
+        self.vert_vbo.push(self._encode(X, Y))
+
+        self.vertices = self._ring[:len(self.vert_vbo)]
+        self._changed(0)
+
+    def set_raw_data(self, vertices, x_sorted=None):
+        '''
+        Replace all the data in a RENORM_RAW series with a raw float32 buffer.
+        The ring always holds its own copy of the data.
+        '''
+        V = self._raw_vertices(vertices)
+        self.set_x_y_data(V[:, 0], V[:, 1])
+
+    def append_raw_data(self, vertices):
+        '''
+        Append a raw float32 buffer to a RENORM_RAW series.
+        '''
+        V = self._raw_vertices(vertices)
+        self.append_x_y_data(V[:, 0], V[:, 1])
@@ -1,8 +1,12 @@
 import numpy as np
 from OpenGL import GL
 
+from . import gl_state
 from . import vbo
-from . import programs
+from . import renorm
+from . import constants
+from .plot_cache import DrawAttribute
+from .lod import MinMaxPyramid, MIN_LEVEL, is_sorted
 
 
 INSTANCE_GEOMETRY = np.array(
@@ -14,38 +18,165 @@ INSTANCE_GEOMETRY = np.array(
      [0,  0.5],
      ], dtype=np.float32)
 
+# Series with fewer vertices than this are always drawn at full resolution.
+LOD_MIN_VERTICES = 65536
 
-class Series:
+# The level of detail is chosen so that each pixel column gets at least this
+# many min/max buckets.
+LOD_BUCKETS_PER_PIXEL = 2
+
+
+class StagedDataMixin:
+    '''
+    The push_x_y_data() method shared by Series and BatchedSeries, which
+    queues data in the window for the next frame to apply with the series'
+    set_x_y_data() or append_x_y_data() method.
+    '''
+    def push_x_y_data(self, X, Y, replace=False):
+        '''
+        Queues new data for the series and can be called from any thread,
+        unlike the other methods which must be called from the render thread.
+        The data is copied, so the caller is free to reuse X and Y.  Before
+        the window is next drawn, all the data pushed since the last frame is
+        concatenated and appended to the series with a single upload, and the
+        window is woken up to draw it.  If replace is True, the pushed data
+        replaces all the series data, including any data still queued.
+        '''
+        X = np.array(X, dtype=self.vertices.dtype)
+        Y = np.array(Y, dtype=self.vertices.dtype)
+        assert X.shape == Y.shape
+        self.plot.window._stage(self, X, Y, replace)
+
+    def _apply_staged(self, replace, chunks):
+        '''
+        Applies the chunks of data queued by push_x_y_data().
+        '''
+        if len(chunks) == 1:
+            X, Y = chunks[0]
+        else:
+            X = np.concatenate([c[0] for c in chunks])
+            Y = np.concatenate([c[1] for c in chunks])
+
+        if replace:
+            self.set_x_y_data(X, Y)
+        else:
+            self.append_x_y_data(X, Y)
+
+
+class VertexStorageMixin:
+    '''
+    The bookkeeping of the original vertices shared by Series, BatchedSeries
+    and DataBuffer.  The vertices are kept in a storage array that doubles in
+    size as data is appended; the vertices field is a view of the rows
+    currently in use.
+    '''
+    def _set_vertices(self, X, Y):
+        '''
+        Replaces all the vertices with the X and Y values.
+        '''
+        self.vertices = np.column_stack((X, Y))
+        self._storage = self.vertices
+
+    def _sub_vertices(self, index, X, Y):
+        '''
+        Substitutes the X and Y values into the vertices starting at index,
+        extending the vertices if the new data goes past the end of the
+        existing data.  Returns the number of vertices before the
+        substitution.
+        '''
+        n   = len(self.vertices)
+        end = index + len(X)
+        assert index <= n
+        if end > n:
+            self._storage = vbo.grow_rows(self._storage, n, end - n)
+            self.vertices = self._storage[:end]
+        self.vertices[index:end, 0] = X
+        self.vertices[index:end, 1] = Y
+        return n
+
+    def _update_x_sorted(self, index, end, n):
+        '''
+        Updates x_sorted after vertices index through end - 1 of the n
+        vertices there were before have been substituted.
+        '''
+        # Substituting in sorted data keeps the series sorted as long as the
+        # neighbouring vertices on either side are in order too.
+        if self.x_sorted or (index == 0 and end >= n):
+            self.x_sorted = is_sorted(
+                self.vertices[max(index - 1, 0):end + 1, 0])
+
+
+class Series(StagedDataMixin, VertexStorageMixin):
     '''
     Hardware representation of a data series.  This encodes the vertices into
     hardware buffers using float32 representation and binds the various buffers
     to a single VAO for efficient drawing.
 
     Setters are provided so that the underlying vertices can be updated
-    dynamically by the client.
+    dynamically by the client.  The original vertices are kept in a storage
+    array that doubles in size as data is appended; the vertices field is a
+    view of the rows currently in use.
+
+    The renorm_mode selects how the float32 hardware vertices are encoded; see
+    the classes in renorm.py.  With RENORM_RAW, set_raw_data() and
+    append_raw_data() accept float32 buffers that are uploaded to the GPU
+    without any conversion.
+
+    If the X values are sorted, only the vertices in the plot's visible X
+    range are drawn.  If lod is True and the series is large with sorted X
+    values, lines are drawn from a min/max decimation pyramid at a level of
+    detail matching the plot's width in pixels, so that the drawing cost
+    doesn't scale with the number of vertices; see lod.py.
+
+    If streaming is True then the vertex VBO is optimized for series whose
+    data is completely replaced every frame.
     '''
-    MIN_LEN = None
+    MIN_LEN    = None
+    RENORM_MAP = {
+        constants.RENORM_CPU : renorm.CPURenorm,
+        constants.RENORM_GPU : renorm.GPURenorm,
+        constants.RENORM_RAW : renorm.RawRenorm,
+    }
+
+    color       = DrawAttribute()
+    width       = DrawAttribute()
+    point_width = DrawAttribute()
+    visible     = DrawAttribute()
 
     def __init__(self, plot, vertices, color=None, width=1,
-                 point_width=None, visible=True):
+                 point_width=None, visible=True,
+                 renorm_mode=constants.RENORM_CPU, lod=True, streaming=False):
+        self.renorm = Series.RENORM_MAP[renorm_mode]
+        vertices    = np.asarray(vertices, dtype=self.renorm.DTYPE)
+        vertices    = vertices.reshape((-1, 2))
+
         self.plot        = plot
         self.vertices    = vertices
+        self._storage    = vertices
+        self._borrowed   = False
         self.color       = color
         self.width       = width
         self.point_width = point_width
         self.visible     = visible
+        self.lod         = lod
+        self.streaming   = streaming
+        self.x_sorted    = is_sorted(vertices[:, 0])
+        self.pyramid     = None
+        self.vert_vbo    = self._gen_vert_vbo(vertices)
+        self._gen_vaos()
 
+    def _gen_vaos(self):
+        '''
+        Creates the VAOs used to draw lines and points from the vertex VBO.
+        '''
         self.line_vao = GL.glGenVertexArrays(1)
-        GL.glBindVertexArray(self.line_vao)
+        gl_state.bind_vertex_array(self.line_vao)
 
-        self.vert_vbo = vbo.VBO(vertices)
-        self.vert_vbo._attrib_pointer(0)
-        GL.glEnableVertexAttribArray(0)
-        GL.glVertexAttribDivisor(0, 1)
-
-        self.vert_vbo._attrib_pointer(1, 8)
-        GL.glEnableVertexAttribArray(1)
-        GL.glVertexAttribDivisor(1, 1)
+        self._line_attrib_pointers(0)
+        for unit, _ in self.renorm.LINE_ATTRIBS:
+            for u in (unit, unit + 1):
+                GL.glEnableVertexAttribArray(u)
+                GL.glVertexAttribDivisor(u, 1)
 
         self.geom_vbo = vbo.StaticVBO(INSTANCE_GEOMETRY)
         self.geom_vbo._attrib_pointer(2)
@@ -54,11 +185,162 @@ class Series:
 
         self.point_vao = GL.glGenVertexArrays(1)
         GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vert_vbo.vbo)
-        GL.glBindVertexArray(self.point_vao)
-        self.vert_vbo._attrib_pointer(0)
-        GL.glEnableVertexAttribArray(0)
+        gl_state.bind_vertex_array(self.point_vao)
+        for unit, component in self.renorm.POINT_ATTRIBS:
+            self.vert_vbo._attrib_pointer(unit, 4 * component, 2)
+            GL.glEnableVertexAttribArray(unit)
+
+        gl_state.bind_vertex_array(0)
+
+    def _destroy(self):
+        '''
+        Deletes the series' GL objects.
+        '''
+        self._destroy_vaos()
+        self.vert_vbo._destroy()
+        if self.pyramid is not None:
+            self.pyramid._destroy()
+
+    def _destroy_vaos(self):
+        gl_state.delete_vertex_array(self.line_vao)
+        gl_state.delete_vertex_array(self.point_vao)
+        self.geom_vbo._destroy()
+
+    def _encode(self, X, Y):
+        return renorm.encode(self.renorm, self.plot.rmatrix, X, Y)
+
+    def _gen_vert_vbo(self, vertices):
+        return vbo.DynamicVBO(self._encode(vertices[:, 0], vertices[:, 1]),
+                              ncomponents=self.renorm.NCOMPONENTS,
+                              streaming=self.streaming)
+
+    def _line_attrib_pointers(self, first, v=None):
+        '''
+        Points the line VAO's p0 and p1 attributes at the segment starting with
+        vertex number first in the VBO v, which defaults to the series' vertex
+        VBO.  The line VAO must already be bound.
+        '''
+        v      = v or self.vert_vbo
+        stride = 4 * v.ncomponents
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, v.vbo)
+        for unit, component in self.renorm.LINE_ATTRIBS:
+            offset = stride * first + 4 * component
+            v._attrib_pointer(unit, offset, 2)
+            v._attrib_pointer(unit + 1, offset + stride, 2)
+
+    def _draw_segments(self, first, count, v=None):
+        if count <= 0:
+            return
+
+        self._line_attrib_pointers(first, v)
+        GL.glDrawArraysInstanced(GL.GL_TRIANGLES, 0, len(INSTANCE_GEOMETRY),
+                                 count)
+
+    def _visible_range(self):
+        '''
+        Returns the indices (first, last) of the first and last vertices that
+        need to be drawn for the plot's current view.  If the X values are
+        sorted then this is found by binary search, keeping the vertex just
+        outside the view on either side so that segments crossing the edges
+        of the view are still drawn.
+        '''
+        n = len(self.vertices)
+        if not self.x_sorted or n == 0:
+            return 0, n - 1
+
+        l, r, _, _ = self.plot._get_data_bounds()
+        X          = self.vertices[:, 0]
+        first      = int(np.searchsorted(X, l, side='left')) - 1
+        last       = int(np.searchsorted(X, r, side='right'))
+        return max(first, 0), min(last, n - 1)
+
+    def _select_lod(self, visible):
+        '''
+        Returns the pyramid level k that should be used to draw the specified
+        number of visible vertices at the plot's current width, or None to draw
+        at full resolution.
+        '''
+        n = len(self.vertices)
+        if not self.lod or not self.x_sorted or n < LOD_MIN_VERTICES:
+            return None
+
+        ppb = visible / (LOD_BUCKETS_PER_PIXEL * self.plot.fb_w)
+        if ppb < (1 << MIN_LEVEL):
+            return None
+
+        if self.pyramid is None:
+            self.pyramid = MinMaxPyramid(self.renorm.NCOMPONENTS)
+        k = min(int(ppb).bit_length() - 1, self.pyramid.max_level(n))
+        return k if k >= MIN_LEVEL else None
+
+    def _changed(self, index):
+        '''
+        Called after the vertices from index onwards have been modified, to
+        invalidate the level-of-detail pyramid and the plot's cached image.
+        '''
+        if self.pyramid is not None:
+            self.pyramid.truncate(index)
+        self.plot.dirty = True
+
+    def _draw_line_instances(self, first, last):
+        '''
+        Draws the segments joining vertices first through last.
+        '''
+        k = self._select_lod(last - first + 1)
+        if k is not None:
+            # Draw the complete buckets covering the range from the pyramid
+            # level.  If the range extends into the incomplete bucket at the
+            # end, finish at full resolution starting from the last vertex
+            # drawn from the pyramid.
+            level = self.pyramid.update(self.vertices, k, self._encode)
+            b0    = first >> k
+            b1    = min((last >> k) + 1, level.nbuckets)
+            if b0 < b1:
+                self._draw_segments(2 * b0, 2 * (b1 - b0) - 1, level.vbo)
+                if b1 < level.nbuckets:
+                    return
+                first = int(max(level.imin[b1 - 1], level.imax[b1 - 1]))
+
+        self._draw_segments(first, last - first)
+
+    def _raw_vertices(self, vertices):
+        '''
+        Returns a float32 (N, 2) view of a raw vertex buffer without copying
+        it.  The buffer can either be a contiguous float32 array with an even
+        number of elements or a contiguous structured array with two float32
+        fields holding x and y.
+        '''
+        if self.renorm is not renorm.RawRenorm:
+            raise Exception('Raw data requires RENORM_RAW mode.')
+
+        V = np.asarray(vertices)
+        if V.dtype.names:
+            fields = [V.dtype.fields[name] for name in V.dtype.names]
+            if (V.dtype.itemsize != 8 or
+                    [f[0] for f in fields] != [np.float32, np.float32] or
+                    [f[1] for f in fields] != [0, 4]):
+                raise Exception('Structured raw data must have exactly two '
+                                'float32 fields, x followed by y.')
+            V = V.view(np.float32)
+        if V.dtype != np.float32 or not V.flags.c_contiguous:
+            raise Exception('Raw data must be a contiguous float32 buffer.')
 
-        GL.glBindVertexArray(0)
+        return V.reshape((-1, 2))
+
+    def _own_vertices(self):
+        '''
+        Takes a private copy of a buffer borrowed by set_raw_data() before it
+        gets modified in place.  Since raw vertices don't need encoding, the
+        series and its VBO share the copy.
+        '''
+        if not self._borrowed:
+            return
+
+        self.vertices          = self.vertices.copy()
+        self._storage          = self.vertices
+        self.vert_vbo.vertices = self.vertices
+        self.vert_vbo._storage = self.vertices
+        self._borrowed         = False
 
     def show(self):
         self.visible = True
@@ -73,16 +355,16 @@ class Series:
         without any change to the original vertex data.
 
         This performs the normalization math in float64 format and then
-        converts it down to float32 when assigning to the VBO.
+        converts it down to float32 when assigning to the VBO.  If the series
+        renormalizes on the GPU then there is nothing to do.
         '''
-        if len(self.vertices) == 0:
+        if len(self.vertices) == 0 or not self.renorm.RENORMALIZE:
             return
 
-        X  = self.vertices[:, 0] * self.plot.rmatrix[0][0]
-        X += self.plot.rmatrix[0][3]
-        Y  = self.vertices[:, 1] * self.plot.rmatrix[1][1]
-        Y += self.plot.rmatrix[1][3]
-        self.vert_vbo.set_x_y_data(X, Y)
+        self.vert_vbo.set_data(self._encode(self.vertices[:, 0],
+                                            self.vertices[:, 1]))
+        if self.pyramid is not None:
+            self.pyramid.invalidate_vbos()
 
     def set_x_data(self, X):
         '''
@@ -90,11 +372,14 @@ class Series:
         array and update the VBO data stored on the GPU with the normalized
         vertex data.
         '''
-        X  = np.asarray(X, dtype=np.float64)
-        V  = X * self.plot.rmatrix[0][0]
-        V += self.plot.rmatrix[0][3]
+        self._own_vertices()
+        X = np.asarray(X, dtype=self.renorm.DTYPE)
+        V = self.renorm.encode_axis(X, self.plot.rmatrix[0][0],
+                                    self.plot.rmatrix[0][3])
         self.vertices[:, 0] = X
-        self.vert_vbo.set_x_data(V)
+        self.x_sorted       = is_sorted(X)
+        self.vert_vbo.set_component_data(self.renorm.X_COMPONENTS, V)
+        self._changed(0)
 
     def set_y_data(self, Y):
         '''
@@ -102,58 +387,93 @@ class Series:
         array and update the VBO data stored on the GPU with the normalized
         vertex data.
         '''
-        Y  = np.asarray(Y, dtype=np.float64)
-        V  = Y * self.plot.rmatrix[1][1]
-        V += self.plot.rmatrix[1][3]
+        self._own_vertices()
+        Y = np.asarray(Y, dtype=self.renorm.DTYPE)
+        V = self.renorm.encode_axis(Y, self.plot.rmatrix[1][1],
+                                    self.plot.rmatrix[1][3])
         self.vertices[:, 1] = Y
-        self.vert_vbo.set_y_data(V)
+        self.vert_vbo.set_component_data(self.renorm.Y_COMPONENTS, V)
+        self._changed(0)
 
     def set_x_y_data(self, X, Y):
-        X = np.asarray(X, dtype=np.float64)
-        Y = np.asarray(Y, dtype=np.float64)
-        self.vertices = np.column_stack((X, Y))
-
-        X  = X * self.plot.rmatrix[0][0]
-        X += self.plot.rmatrix[0][3]
-        Y  = Y * self.plot.rmatrix[1][1]
-        Y += self.plot.rmatrix[1][3]
-        self.vert_vbo.set_x_y_data(X, Y)
+        X = np.asarray(X, dtype=self.renorm.DTYPE)
+        Y = np.asarray(Y, dtype=self.renorm.DTYPE)
+        self._set_vertices(X, Y)
+        self._borrowed = False
+        self.x_sorted  = is_sorted(X)
+        self.vert_vbo.set_data(self._encode(X, Y))
+        self._changed(0)
 
     def sub_x_y_data(self, index, X, Y):
         if len(X) == 0:
             return
 
-        X = np.asarray(X, dtype=np.float64)
-        Y = np.asarray(Y, dtype=np.float64)
-        V = np.column_stack((X, Y))
-        overlap_v = V[:len(self.vertices) - index]
-        new_v     = V[len(self.vertices) - index:]
-        if len(overlap_v):
-            self.vertices[-len(overlap_v):] = overlap_v
-        self.vertices = np.concatenate((self.vertices, new_v))
-
-        X  = X * self.plot.rmatrix[0][0]
-        X += self.plot.rmatrix[0][3]
-        Y  = Y * self.plot.rmatrix[1][1]
-        Y += self.plot.rmatrix[1][3]
-        self.vert_vbo.sub_x_y_data(index, X, Y)
+        self._own_vertices()
+        X = np.asarray(X, dtype=self.renorm.DTYPE)
+        Y = np.asarray(Y, dtype=self.renorm.DTYPE)
+        n = self._sub_vertices(index, X, Y)
+        self._update_x_sorted(index, index + len(X), n)
+        self.vert_vbo.sub_data(index, self._encode(X, Y))
+        self._changed(index)
 
     def append_x_y_data(self, X, Y):
         self.sub_x_y_data(len(self.vertices), X, Y)
 
+    def set_raw_data(self, vertices, x_sorted=None):
+        '''
+        Replace all the data in a RENORM_RAW series with a raw float32 buffer;
+        see _raw_vertices() for the accepted formats.  The buffer is uploaded
+        to the GPU directly and the series keeps a reference to it instead of
+        a copy, so the client must not modify it until it has been replaced
+        by another call to set_raw_data() (passing the same buffer again after
+        refilling it is fine).  If the client knows whether the X values are
+        sorted it can pass x_sorted to skip checking them.
+        '''
+        V = self._raw_vertices(vertices)
+        if x_sorted is None:
+            x_sorted = is_sorted(V[:, 0])
+
+        self.vertices  = V
+        self._storage  = V
+        self._borrowed = True
+        self.x_sorted  = x_sorted
+        self.vert_vbo.set_data(V, copy=False)
+        self._changed(0)
+
+    def append_raw_data(self, vertices):
+        '''
+        Append a raw float32 buffer to a RENORM_RAW series.  The new vertices
+        are copied once, directly into the storage shared by the series and
+        its VBO.
+        '''
+        V = self._raw_vertices(vertices)
+        if len(V) == 0:
+            return
+
+        n = len(self.vertices)
+        if self.x_sorted or n == 0:
+            self.x_sorted = is_sorted(
+                np.concatenate((self.vertices[n - 1:, 0], V[:, 0])))
+
+        self.vert_vbo.sub_data(n, V)
+        self.vertices  = self.vert_vbo.vertices
+        self._storage  = self.vert_vbo._storage
+        self._borrowed = False
+        self._changed(n)
+
     def draw(self, _t, z, mvp, resolution):
         if not self.visible:
             return
 
-        if self.width and len(self.vert_vbo) >= 2:
-            GL.glBindVertexArray(self.line_vao)
-            programs.square_line.use(self.width, z, mvp, color=self.color,
-                                     resolution=resolution)
-            GL.glDrawArraysInstanced(GL.GL_TRIANGLES, 0, len(INSTANCE_GEOMETRY),
-                                     len(self.vert_vbo) - 1)
+        first, last = self._visible_range()
+
+        if self.width and last > first:
+            gl_state.bind_vertex_array(self.line_vao)
+            self.renorm.use_line_program(self, z, mvp, resolution)
+            self._draw_line_instances(first, last)
 
-        if self.point_width and len(self.vert_vbo) >= 1:
-            GL.glBindVertexArray(self.point_vao)
-            programs.frag_points.use(z, mvp, color=self.color)
+        if self.point_width and last >= first:
+            gl_state.bind_vertex_array(self.point_vao)
+            self.renorm.use_point_program(self, z, mvp)
             GL.glPointSize(self.point_width * self.plot.window.r_w)
-            GL.glDrawArrays(GL.GL_POINTS, 0, len(self.vert_vbo))
+            GL.glDrawArrays(GL.GL_POINTS, first, last - first + 1)
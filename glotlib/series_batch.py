@@ -0,0 +1,203 @@
+import numpy as np
+from OpenGL import GL
+
+from . import gl_state
+from . import vbo
+from . import renorm
+from . import programs
+from .plot_cache import DrawAttribute
+from .series import (INSTANCE_GEOMETRY, StagedDataMixin,
+                     VertexStorageMixin)
+
+
+# Must match MAX_SERIES in batch_square_instanced_line.vert.
+MAX_SERIES = 64
+
+
+class BatchedSeries(StagedDataMixin, VertexStorageMixin):
+    '''
+    A data series drawn as part of a SeriesBatch.  It has the same data
+    setters as a Series, apart from the raw data ones, and its color, width
+    and visibility can be changed at any time, but it is always drawn as lines
+    without points and without any culling or level-of-detail decimation.
+
+    The series occupies a region of capacity vertices in the batch's VBO,
+    starting at vertex first.
+    '''
+    color   = DrawAttribute()
+    width   = DrawAttribute()
+    visible = DrawAttribute()
+
+    def __init__(self, batch, index, vertices, color=None, width=1,
+                 visible=True):
+        self.batch    = batch
+        self.plot     = batch.plot
+        self.index    = index
+        self.vertices = vertices
+        self._storage = vertices
+        self.color    = color
+        self.width    = width
+        self.visible  = visible
+        self.first    = 0
+        self.capacity = 0
+
+    def show(self):
+        self.visible = True
+
+    def hide(self):
+        self.visible = False
+
+    def set_x_data(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        assert X.shape == (len(self.vertices),)
+        self.vertices[:, 0] = X
+        self.batch._update(self, 0, len(self.vertices))
+
+    def set_y_data(self, Y):
+        Y = np.asarray(Y, dtype=np.float64)
+        assert Y.shape == (len(self.vertices),)
+        self.vertices[:, 1] = Y
+        self.batch._update(self, 0, len(self.vertices))
+
+    def set_x_y_data(self, X, Y):
+        n = len(self.vertices)
+        self._set_vertices(np.asarray(X, dtype=np.float64),
+                           np.asarray(Y, dtype=np.float64))
+        self.batch._update(self, 0, n)
+
+    def sub_x_y_data(self, index, X, Y):
+        assert len(X) == len(Y)
+        if len(X) == 0:
+            return
+
+        n = self._sub_vertices(index, X, Y)
+        self.batch._update(self, index, n)
+
+    def append_x_y_data(self, X, Y):
+        self.sub_x_y_data(len(self.vertices), X, Y)
+
+
+class SeriesBatch:
+    '''
+    A set of up to MAX_SERIES line series that share a single VBO and VAO and
+    are drawn with a single instanced draw call, with the width and color of
+    each series passed in uniform arrays.  This keeps the number of GL calls
+    per frame constant for plots with many traces.
+
+    Each vertex in the VBO holds the normalized (x, y) coordinates and the
+    index of the series it belongs to.  Each series gets a power-of-2 region
+    of the VBO so that appending data rarely requires moving the other
+    series; unused vertices in a region have an index of -1.  The shader
+    discards the segments joining different series or unused vertices, so
+    the whole VBO can be drawn at once.
+    '''
+    def __init__(self, plot):
+        self.plot    = plot
+        self.members = []
+
+        self.line_vao = GL.glGenVertexArrays(1)
+        gl_state.bind_vertex_array(self.line_vao)
+
+        self.vert_vbo = vbo.DynamicVBO(np.empty((0, 3), dtype=np.float32),
+                                       ncomponents=3)
+        self.vert_vbo._attrib_pointer(0, 0, 3)
+        self.vert_vbo._attrib_pointer(1, 12, 3)
+        for u in (0, 1):
+            GL.glEnableVertexAttribArray(u)
+            GL.glVertexAttribDivisor(u, 1)
+
+        self.geom_vbo = vbo.StaticVBO(INSTANCE_GEOMETRY)
+        self.geom_vbo._attrib_pointer(2)
+        GL.glEnableVertexAttribArray(2)
+        GL.glVertexAttribDivisor(2, 0)
+
+        gl_state.bind_vertex_array(0)
+
+    def _destroy(self):
+        gl_state.delete_vertex_array(self.line_vao)
+        self.vert_vbo._destroy()
+        self.geom_vbo._destroy()
+
+    def is_full(self):
+        return len(self.members) >= MAX_SERIES
+
+    def add_series(self, vertices, **kwargs):
+        '''
+        Adds a new BatchedSeries with the specified vertices to the end of the
+        batch and returns it.
+        '''
+        assert not self.is_full()
+
+        s          = BatchedSeries(self, len(self.members), vertices, **kwargs)
+        s.first    = len(self.vert_vbo)
+        s.capacity = vbo.ceil_pow2(max(len(vertices), 1))
+        self.members.append(s)
+        self.vert_vbo.sub_data(s.first, self._encode(s, 0, s.capacity))
+        return s
+
+    def _encode(self, s, index, end):
+        '''
+        Returns the VBO vertices for slots index through end - 1 of the
+        series' region.  Slots past the end of the series' data are marked
+        unused.
+        '''
+        E       = np.empty((end - index, 3), dtype=np.float32)
+        E[:, 2] = -1
+        n       = max(min(len(s.vertices), end) - index, 0)
+        if n:
+            V         = s.vertices[index:index + n]
+            E[:n, :2] = renorm.encode(renorm.CPURenorm, self.plot.rmatrix,
+                                      V[:, 0], V[:, 1])
+            E[:n, 2]  = s.index
+        return E
+
+    def _layout(self):
+        '''
+        Reassigns the regions of all the series so that each one has room for
+        its data, then encodes and uploads the entire VBO.
+        '''
+        first = 0
+        for s in self.members:
+            s.first    = first
+            s.capacity = vbo.ceil_pow2(max(len(s.vertices), 1))
+            first     += s.capacity
+
+        E = np.empty((first, 3), dtype=np.float32)
+        for s in self.members:
+            E[s.first:s.first + s.capacity] = self._encode(s, 0, s.capacity)
+        self.vert_vbo.set_data(E)
+        self.plot.dirty = True
+
+    def _update(self, s, index, old_n):
+        '''
+        Uploads the series' data from index onwards after it has been
+        modified, clearing any slots up to old_n that are no longer in use.
+        '''
+        if len(s.vertices) > s.capacity:
+            self._layout()
+            return
+
+        end = max(len(s.vertices), old_n)
+        if index < end:
+            self.vert_vbo.sub_data(s.first + index, self._encode(s, index, end))
+            self.plot.dirty = True
+
+    def renormalize(self):
+        if self.members:
+            self._layout()
+
+    def draw(self, _t, z, mvp, resolution):
+        if len(self.vert_vbo) < 2:
+            return
+
+        widths = np.array([(s.width or 0) if s.visible else 0
+                           for s in self.members], dtype=np.float32)
+        if not widths.any():
+            return
+        colors = np.array([s.color for s in self.members], dtype=np.float32)
+
+        gl_state.bind_vertex_array(self.line_vao)
+        programs.batch_square_line.use(widths, z, mvp, colors,
+                                       resolution=resolution)
+        GL.glDrawArraysInstanced(GL.GL_TRIANGLES, 0, len(INSTANCE_GEOMETRY),
+                                 len(self.vert_vbo) - 1)
@@ -0,0 +1,10 @@
+#version 330
+
+flat in vec4 v_color;
+
+out vec4 fragColor;
+
+void main()
+{
+    fragColor = v_color;
+}
@@ -0,0 +1,43 @@
+// Instanced lines for a SeriesBatch; see square_instanced_line.vert for the
+// line geometry.  The third component of each vertex holds the index of the
+// series it belongs to, which selects the width and color from the uniform
+// arrays.  Segments joining the vertices of two different series, or unused
+// vertices with an index of -1, collapse to a single point and so draw nothing.
+#version 330
+
+#define MAX_SERIES 64
+
+layout (location = 0) in vec3 a_p0;
+layout (location = 1) in vec3 a_p1;
+layout (location = 2) in vec2 a_vertex;
+uniform mat4 u_mvp;
+uniform vec2 u_resolution;
+uniform float u_z;
+uniform float u_widths[MAX_SERIES];
+uniform vec4 u_colors[MAX_SERIES];
+
+flat out vec4 v_color;
+
+void main()
+{
+    int index = int(a_p0.z);
+    if (a_p0.z < 0 || a_p0.z != a_p1.z)
+    {
+        v_color     = vec4(0);
+        gl_Position = vec4(0, 0, 2, 1);
+        return;
+    }
+    v_color = u_colors[index];
+
+    vec2 p0 = (u_mvp * vec4(a_p0.xy, 0, 1)).xy;
+    vec2 p1 = (u_mvp * vec4(a_p1.xy, 0, 1)).xy;
+
+    vec2 v_K     = 0.5 * u_resolution;
+    vec2 v_line  = (p1 - p0) * v_K;
+    vec2 nv_line = normalize(vec2(-v_line.y, v_line.x));
+    vec2 nv      = nv_line * u_widths[index] * a_vertex.y / v_K;
+
+    p0 = (a_vertex.x == 0 ? p0 : p1);
+
+    gl_Position = vec4(p0 + nv, u_z, 1);
+}
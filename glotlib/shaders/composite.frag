@@ -0,0 +1,13 @@
+#version 330
+
+uniform sampler2D u_sampler;
+uniform ivec2     u_origin;
+
+out vec4 fragColor;
+
+void main()
+{
+    // The texture holds premultiplied alpha, for blending with GL_ONE and
+    // GL_ONE_MINUS_SRC_ALPHA.
+    fragColor = texelFetch(u_sampler, ivec2(gl_FragCoord.xy) - u_origin, 0);
+}
@@ -0,0 +1,9 @@
+#version 330
+
+// Covers the viewport with a triangle strip generated from the vertex IDs 0-3,
+// so no vertex data is needed.
+void main()
+{
+    vec2 v = vec2((gl_VertexID & 1) * 2 - 1, (gl_VertexID >> 1) * 2 - 1);
+    gl_Position = vec4(v, 0, 1);
+}
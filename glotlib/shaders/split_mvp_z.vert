@@ -0,0 +1,16 @@
+#version 330
+
+layout (location = 0) in vec2 a_vertex_hi;
+layout (location = 1) in vec2 a_vertex_lo;
+uniform mat4  u_mvp;
+uniform vec2  u_origin_hi;
+uniform vec2  u_origin_lo;
+uniform vec2  u_scale;
+uniform float u_z;
+
+void main()
+{
+    vec2 v = ((a_vertex_hi - u_origin_hi) + (a_vertex_lo - u_origin_lo)) *
+             u_scale;
+    gl_Position = u_mvp * vec4(v, u_z, 1);
+}
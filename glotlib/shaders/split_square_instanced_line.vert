@@ -0,0 +1,43 @@
+// Based on: https://wwwtyro.net/2019/11/18/instanced-lines.html
+#version 330
+
+layout (location = 0) in vec2 a_p0_hi;
+layout (location = 1) in vec2 a_p1_hi;
+layout (location = 2) in vec2 a_vertex;
+layout (location = 3) in vec2 a_p0_lo;
+layout (location = 4) in vec2 a_p1_lo;
+uniform mat4 u_mvp;
+uniform vec2 u_origin_hi;
+uniform vec2 u_origin_lo;
+uniform vec2 u_scale;
+uniform vec2 u_resolution;
+uniform float u_width;
+uniform float u_z;
+
+// Each data coordinate is split into a float32 hi part and a float32 lo part
+// holding the rounding error of the hi part.  The renormalization origin is
+// split the same way, so subtracting the origin keeps the precision of the
+// original float64 data near the origin and renormalizing the plot is just a
+// change of uniforms.
+vec2 renormalize(vec2 hi, vec2 lo)
+{
+    return ((hi - u_origin_hi) + (lo - u_origin_lo)) * u_scale;
+}
+
+void main()
+{
+    // Convert from geometry coordinates to clip coordinates == NDC since this
+    // is an orthographic projection.
+    vec2 p0 = (u_mvp * vec4(renormalize(a_p0_hi, a_p0_lo), 0, 1)).xy;
+    vec2 p1 = (u_mvp * vec4(renormalize(a_p1_hi, a_p1_lo), 0, 1)).xy;
+
+    // See square_instanced_line.vert for the details of the line geometry.
+    vec2 v_K     = 0.5 * u_resolution;
+    vec2 v_line  = (p1 - p0) * v_K;
+    vec2 nv_line = normalize(vec2(-v_line.y, v_line.x));
+    vec2 nv      = nv_line * u_width * a_vertex.y / v_K;
+
+    p0 = (a_vertex.x == 0 ? p0 : p1);
+
+    gl_Position = vec4(p0 + nv, u_z, 1);
+}
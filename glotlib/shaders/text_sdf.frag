@@ -0,0 +1,24 @@
+#version 330
+
+// Must match SDF_SPREAD in font.py.
+const float SPREAD = 6.0;
+
+uniform vec4 u_color;
+uniform sampler2D u_sampler;
+
+in vec2 texcoord;
+out vec4 fragColor;
+
+void main()
+{
+    // The outline is where the distance field crosses 128.  The field falls
+    // off by 127 / SPREAD per texel, so the number of texels per pixel gives
+    // the width of a pixel in field units, whatever the scale or rotation;
+    // blend over one pixel centered on the outline.
+    vec2  tc  = texcoord * vec2(textureSize(u_sampler, 0));
+    float tpp = 0.5 * (length(dFdx(tc)) + length(dFdy(tc)));
+    float w   = 0.5 * tpp * (127.0 / 255.0) / SPREAD;
+    float d   = texture(u_sampler, texcoord).r;
+    fragColor = vec4(0, 0, 0, smoothstep(128.0 / 255.0 - w, 128.0 / 255.0 + w,
+                                         d));
+}
@@ -62,3 +62,9 @@ class StepSeries(series.Series):
         vY[1::2] = Y[1:len(Y)]
 
         super().append_x_y_data(vX, vY)
+
+    def set_raw_data(self, vertices, x_sorted=None):
+        raise Exception('StepSeries does not support set_raw_data().')
+
+    def append_raw_data(self, vertices):
+        raise Exception('StepSeries does not support append_raw_data().')
@@ -9,6 +9,23 @@ def ceil_pow2(v):
     return (1 << math.ceil(math.log2(v)))
 
 
+def grow_rows(storage, n, k):
+    '''
+    Given a backing storage array whose first n rows are in use, returns a
+    storage array with room for at least n + k rows.  If the storage is too
+    small it is reallocated with a power-of-2 number of rows and the n rows in
+    use are copied over, so that a sequence of appends costs amortized O(k)
+    per append instead of O(n).
+    '''
+    if n + k <= len(storage):
+        return storage
+
+    new_storage     = np.empty((ceil_pow2(n + k),) + storage.shape[1:],
+                               dtype=storage.dtype)
+    new_storage[:n] = storage[:n]
+    return new_storage
+
+
 class VBO:
     '''
     This class holds a set of vertices in float32 format, bound to a hardware
@@ -16,16 +33,25 @@ class VBO:
     field in the VBO stores renormalized data while the Series object contains
     the original data.  The VBO remains bound to GL_ARRAY_BUFFER after
     initialization.
+
+    The vertices field is a view of the first len(self) rows of a larger
+    storage array, which grows by doubling as data is appended.
+
+    If streaming is True then every update that rewrites all of the vertices
+    first orphans the hardware buffer, so that the driver can hand us fresh
+    storage instead of stalling until the GPU has finished drawing from the
+    previous contents.
     '''
     def __init__(self, vertices=None, ncomponents=None,
-                 gl_type=GL.GL_DYNAMIC_DRAW):
-        self.vertices = None
-        self.gl_type  = gl_type
-        self.vbo      = GL.glGenBuffers(1)
-        self.capacity = 0
+                 gl_type=GL.GL_DYNAMIC_DRAW, streaming=False):
+        self.vertices  = None
+        self._storage  = None
+        self.gl_type   = gl_type
+        self.streaming = streaming
+        self.vbo       = GL.glGenBuffers(1)
+        self.capacity  = 0
 
         if vertices is not None and ncomponents:
-            assert len(vertices[0]) == ncomponents
             self.ncomponents = ncomponents
             self.set_data(vertices)
         elif ncomponents:
@@ -41,10 +67,14 @@ class VBO:
     def __len__(self):
         return len(self.vertices)
 
-    def _sub_vbo_tail(self, N):
+    def _destroy(self):
+        GL.glDeleteBuffers(1, [self.vbo])
+        self.vbo = None
+
+    def _sub_vbo(self, index, N):
         '''
-        Writes the last N values of self.vertices to the VBO, enlarging the
-        VBO buffer if necessary.
+        Writes the N values of self.vertices starting at index to the VBO,
+        enlarging the VBO buffer if necessary.
         '''
         GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vbo)
 
@@ -54,30 +84,60 @@ class VBO:
             GL.glBufferData(GL.GL_ARRAY_BUFFER,
                             4 * self.ncomponents * self.capacity,
                             None, self.gl_type)
-            N = len(self.vertices)
+            index = 0
+            N     = len(self.vertices)
+        elif self.streaming and N == len(self.vertices):
+            # Orphan the old buffer before rewriting it all; the GPU may still
+            # be reading it for the previous frame.
+            GL.glBufferData(GL.GL_ARRAY_BUFFER,
+                            4 * self.ncomponents * self.capacity,
+                            None, self.gl_type)
 
         # Sub in the new data.
-        offset = 4 * self.ncomponents * (len(self.vertices) - N)
+        offset = 4 * self.ncomponents * index
         size   = 4 * self.ncomponents * N
-        GL.glBufferSubData(GL.GL_ARRAY_BUFFER, offset, size, self.vertices[-N:])
+        GL.glBufferSubData(GL.GL_ARRAY_BUFFER, offset, size,
+                           self.vertices[index:index + N])
+
+    def _sub_vbo_tail(self, N):
+        '''
+        Writes the last N values of self.vertices to the VBO, enlarging the
+        VBO buffer if necessary.
+        '''
+        self._sub_vbo(len(self.vertices) - N, N)
 
     def _update_vbo(self):
         self._sub_vbo_tail(len(self.vertices))
 
-    def _attrib_pointer(self, unit, offset=0):
-        GL.glVertexAttribPointer(unit, self.ncomponents, GL.GL_FLOAT,
-                                 GL.GL_FALSE, 0, c_void_p(offset))
+    def _attrib_pointer(self, unit, offset=0, size=None):
+        '''
+        Points the vertex attribute at the specified unit into this VBO.  By
+        default the attribute covers all the components of each vertex, but a
+        smaller size can be specified to select a subset of the components
+        starting at the specified byte offset.
+        '''
+        GL.glVertexAttribPointer(unit, size or self.ncomponents, GL.GL_FLOAT,
+                                 GL.GL_FALSE, 4 * self.ncomponents,
+                                 c_void_p(offset))
 
-    def set_data(self, vertices):
+    def set_data(self, vertices, copy=True):
         '''
         Replace all data in the VBO with the new vertices, which must have the
-        same number of components as the original data.
+        same number of components as the original data.  If copy is False and
+        the vertices are already float32 then the VBO keeps a reference to the
+        vertices array instead of copying it.
         '''
-        vertices = np.array(vertices, dtype=np.float32)
+        if copy:
+            vertices = np.array(vertices, dtype=np.float32)
+        else:
+            vertices = np.asarray(vertices, dtype=np.float32)
         if len(vertices):
             assert self.ncomponents == vertices.shape[1]
+        else:
+            vertices = vertices.reshape((0, self.ncomponents))
 
         self.vertices = vertices
+        self._storage = vertices
         self._update_vbo()
 
     def set_component_data(self, index, V):
@@ -128,14 +188,96 @@ class VBO:
         end of the existing data.
         '''
         assert len(X) == len(Y)
-        assert index <= len(self.vertices)
-        sub_data     = np.column_stack((X, Y)).astype(np.float32, copy=False)
-        overlap_data = sub_data[:len(self.vertices) - index]
-        new_data     = sub_data[len(self.vertices) - index:]
-        if len(overlap_data):
-            self.vertices[-len(overlap_data):] = overlap_data
-        self.vertices = np.concatenate((self.vertices, new_data))
-        self._sub_vbo_tail(len(X))
+        self.sub_data(index, np.column_stack((X, Y)))
+
+    def sub_data(self, index, vertices):
+        '''
+        Substitutes whole vertices starting at the specified index.  The data
+        will be extended if the data to be substituted in goes past the end of
+        the existing data; the storage array doubles in size when it runs out
+        of room so that repeated appends don't copy all the existing data.
+        '''
+        n   = len(self.vertices)
+        end = index + len(vertices)
+        assert index <= n
+        if end > n:
+            self._storage = grow_rows(self._storage, n, end - n)
+            self.vertices = self._storage[:end]
+
+        self.vertices[index:end] = vertices
+        self._sub_vbo(index, len(vertices))
+
+
+class CircularVBO(VBO):
+    '''
+    A VBO holding a fixed-size ring of vertices.  Once the ring is full, new
+    vertices overwrite the oldest ones and only the touched slots are written
+    to the hardware buffer.  The buffer has one extra slot at the end that
+    mirrors slot 0 so that the segment joining the newest vertex at the end
+    of the ring to the oldest vertex at the start of the ring can be drawn
+    from contiguous memory.
+    '''
+    def __init__(self, size, ncomponents=2, gl_type=GL.GL_DYNAMIC_DRAW):
+        super().__init__(ncomponents=ncomponents, gl_type=gl_type)
+        self.size     = size
+        self.head     = 0
+        self.count    = 0
+        self.vertices = np.zeros((size + 1, ncomponents), dtype=np.float32)
+        self._storage = self.vertices
+        self.capacity = size + 1
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, self.vertices.nbytes, None,
+                        self.gl_type)
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.head  = 0
+        self.count = 0
+
+    def push(self, vertices):
+        '''
+        Appends the vertices to the ring, overwriting the oldest vertices if
+        the ring is full.  At most two contiguous ranges of the hardware buffer
+        are written, plus the mirror slot if slot 0 was touched.
+        '''
+        vertices = vertices[-self.size:]
+        k        = len(vertices)
+        i        = 0
+        while i < k:
+            n = min(k - i, self.size - self.head)
+            self.vertices[self.head:self.head + n] = vertices[i:i + n]
+            self._sub_vbo(self.head, n)
+            if self.head == 0:
+                self.vertices[self.size] = self.vertices[0]
+                self._sub_vbo(self.size, 1)
+            self.head = (self.head + n) % self.size
+            i += n
+
+        self.count = min(self.count + k, self.size)
+
+    def set_slot_data(self, vertices):
+        '''
+        Replaces the contents of the first len(vertices) slots without changing
+        the order of the ring, typically to renormalize all of the data.
+        '''
+        self.vertices[:len(vertices)] = vertices
+        self.vertices[self.size]      = self.vertices[0]
+        self._update_vbo()
+
+    def segment_ranges(self):
+        '''
+        Returns a list of (first, count) tuples giving the ranges of segments
+        that need to be drawn to join all the vertices from oldest to newest.
+        Segment i joins buffer slots i and i + 1.
+        '''
+        if self.count < 2:
+            return []
+        if self.count < self.size or self.head == 0:
+            return [(0, self.count - 1)]
+        if self.head == 1:
+            return [(1, self.size - 1)]
+        return [(self.head, self.size - self.head), (0, self.head - 1)]
 
 
 class StaticVBO(VBO):
@@ -144,5 +286,12 @@ class StaticVBO(VBO):
 
 
 class DynamicVBO(VBO):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, gl_type=GL.GL_DYNAMIC_DRAW, **kwargs)
+    '''
+    A VBO for data that changes often.  With streaming=True the data is
+    expected to be completely rewritten every frame, so the buffer uses the
+    GL_STREAM_DRAW usage hint and is orphaned on each full rewrite.
+    '''
+    def __init__(self, *args, streaming=False, **kwargs):
+        gl_type = GL.GL_STREAM_DRAW if streaming else GL.GL_DYNAMIC_DRAW
+        super().__init__(*args, gl_type=gl_type, streaming=streaming,
+                         **kwargs)
@@ -1,3 +1,6 @@
+import threading
+import time
+
 import glfw
 from OpenGL import GL
 
@@ -6,7 +9,9 @@ import glotlib.main
 from . import matrix
 from . import constants
 from . import fonts
+from . import gl_state
 from . import label
+from . import profiler
 
 
 # This is the padding on each side of the flexible window area.  Note that
@@ -104,9 +109,269 @@ class MouseButtonState:
         self.mods    = mods
 
 
-class Window:
+class BaseWindow:
+    '''
+    The state shared by all windows: the plots and labels, their layout and
+    drawing.  Subclasses provide the GL context and the surface being drawn
+    to, and must make the context current before calling this constructor.
+    '''
+    def __init__(self, w_w, w_h, fb_w, fb_h, msaa=None,
+                 clear_color=(1, 1, 1), max_fps=None):
+        self.w_w, self.w_h   = w_w, w_h
+        self.fb_w, self.fb_h = fb_w, fb_h
+        self.r_w = self.r_h  = 0
+        self.mvp = matrix.ortho(0, self.w_w, 0, self.w_h, -1, 1)
+        self._update_ratios()
+
+        glotlib.init_fonts()
+
+        self.clear_color = (*clear_color, 0)
+        GL.glClearColor(*self.clear_color)
+        GL.glClear(GL.GL_COLOR_BUFFER_BIT)
+        if msaa is not None:
+            GL.glEnable(GL.GL_MULTISAMPLE)
+            self.msaa_samples = GL.glGetIntegerv(GL.GL_SAMPLES)
+        else:
+            self.msaa_samples = None
+
+        self.framebuffer   = 0
+        self.plots         = []
+        self.labels        = []
+        self._dirty        = True
+        self._iconified    = False
+        self._staging_lock = threading.Lock()
+        self._staged       = {}
+        self.min_frame_dt  = 1 / max_fps if max_fps else 0
+        self._t_next_frame = 0
+        self._t_requested  = None
+
+    def _update_ratios(self):
+        # print('Screen dimensions %u x %u.  Framebuffer dimensions %u x %u.' %
+        #       (self.w_w, self.w_h, self.fb_w, self.fb_h))
+        self.r_w = self.fb_w / self.w_w if self.w_w else 0
+        self.r_h = self.fb_h / self.w_h if self.w_h else 0
+
+    def _stage(self, series, X, Y, replace):
+        '''
+        Queues data pushed to a series from any thread; see
+        Series.push_x_y_data().
+        '''
+        with self._staging_lock:
+            staged = self._staged.get(series)
+            if staged is None or replace:
+                self._staged[series] = (replace, [(X, Y)])
+            else:
+                staged[1].append((X, Y))
+        self.mark_dirty()
+
+    def _flush_staged(self):
+        '''
+        Applies the data queued for each series since the last frame.  The
+        window is marked dirty again here rather than relying on _stage():
+        data pushed after the previous frame swapped out the queue but before
+        it finished drawing found the window already dirty, and that frame
+        then cleared the flag without having drawn the data.
+        '''
+        if not self._staged:
+            return
+
+        with self._staging_lock:
+            staged, self._staged = self._staged, {}
+        for series, (replace, chunks) in staged.items():
+            series._apply_staged(replace, chunks)
+        self._dirty = True
+
+    def _draw(self, t):
+        self._flush_staged()
+        profiler.mark('ingest')
+
+        for p in self.plots:
+            p._apply_pending_view()
+        profiler.mark('view')
+
+        updated = self.update_geometry(t)
+        profiler.mark('update_geometry')
+
+        now = time.time()
+        if self._t_requested is not None and now >= self._t_requested:
+            self._t_requested = None
+            self._dirty       = True
+        if not updated and not self._dirty:
+            return False
+        if self._iconified:
+            return False
+        if now < self._t_next_frame:
+            # Over the frame-rate cap; draw when the next frame is due.
+            self._dirty = True
+            return False
+        self._dirty        = False
+        self._t_next_frame = now + self.min_frame_dt
+
+        profiler.begin_gpu(self)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.framebuffer)
+        GL.glClear(GL.GL_COLOR_BUFFER_BIT)
+        for p in self.plots:
+            if p.visible:
+                p.draw(t)
+                profiler.mark_plot(p)
+
+        GL.glViewport(0, 0, self.fb_w, self.fb_h)
+        for l in self.labels:
+            if l.visible:
+                l.draw(self.mvp)
+        profiler.mark('labels')
+
+        self.draw(t)
+        profiler.end_gpu(self)
+        profiler.mark('draw')
+
+        self.swap_buffers()
+        profiler.mark('swap')
+
+        return True
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def _wakeup(self):
+        pass
+
+    def request_frame(self, dt=0):
+        '''
+        Requests that the window be drawn again in dt seconds even if nothing
+        marks it dirty before then, for animations whose next change is known
+        in advance.  While waiting for the request, animate() can sleep
+        instead of polling update_geometry().
+        '''
+        t = time.time() + dt
+        if self._t_requested is None or t < self._t_requested:
+            self._t_requested = t
+            self._wakeup()
+
+    def next_deadline(self):
+        '''
+        Returns the time, as returned by time.time(), when the window next
+        needs to be drawn without being woken up, or None.  This is the time
+        of the earliest request_frame() or, if the window is dirty but was
+        held back by its frame-rate cap, when the next frame is allowed.
+        '''
+        deadline = self._t_requested
+        if self._dirty and not self._iconified:
+            t = max(self._t_next_frame, time.time())
+            if deadline is None or t < deadline:
+                deadline = t
+        return deadline
+
+    def update_geometry(self, _t):
+        return False
+
+    def draw(self, t):
+        pass
+
+    def swap_buffers(self):
+        pass
+
+    def add_plot(self, bounds=111, **kwargs):
+        '''
+        Adds a rectangular plot to the window.  The bounds value selects the
+        position of the plot and can have one of the following formats:
+
+            HWP - a set of 3 integers encoded either as a 3-digit decimal
+                  number with H, W, P in the hundreds, tens and ones positions,
+                  respectively, or as a 3-tuple (H, W, P).  H and W divide the
+                  window space into a grid of height H and width W and P
+                  selects the grid cell numbered from 1 to H*W left-to-right
+                  and then top-to-bottom.
+
+            HWR - a 3-tuple (H, W, (r0, r1)) where the H and W values are the
+                  same as HWP format but the plot rectangle will have the
+                  bounds of the smallest rectangle that fully encloses both the
+                  grid cells at positions r0 and r1.
+
+            (x0, y0, x1, y1) - a 4-tuple specifying the bottom-left and top-
+                  right positions of the bounding rectangle, expressed as a
+                  fraction from 0 to 1 which scaled with the dimensions of the
+                  enclosing window.
+
+        The limits 4-tuple can be used to specify the (x0, y0, x1, y1) data
+        limits that the plot will initially be looking at.
+
+        The colors parameter can specify a list of (R, G, B, A) colors to cycle
+        through for each new curve added to the plot, as floating-point values
+        from 0 to 1.
+
+        The max_h_ticks and max_v_ticks parameters can be used to specify the
+        maximum number of ticks to display on the plot, which can be useful to
+        limit spam on smaller plots.
+
+        The aspect parameter can be either Plot.ASPECT_NONE or
+        Plot.ASPECT_SQUARE, the latter which enforces the plot's data view
+        edges so that squares in the data space are rendered as squares in the
+        screen space.
+
+        By default, the series and lines drawn in the plot are rendered into
+        an offscreen image that is only redrawn when the plot's data, view or
+        size changes, and the border, ticks and axis labels into another one
+        that is only redrawn when the view, size or labels change, so that
+        static plots cost almost nothing to draw while other plots in the
+        window are being updated.  Pass cached=False to always draw them
+        directly, for instance if a custom graph artist changes without
+        marking the plot dirty.
+        '''
+        p = glotlib.plot.Plot(self, bounds=_bounds(bounds), **kwargs)
+        self.plots.append(p)
+        return p
+
+    def set_plot_bounds(self, plot, bounds, **kwargs):
+        plot.bounds = _bounds(bounds, **kwargs)
+        plot._handle_resize()
+
+    def add_label(self, *args, font=None, **kwargs):
+        font = font or fonts.vera(12, 0, dynamic=True)
+        l    = label.FlexLabel(self, *args, font=font, **kwargs)
+        self.labels.append(l)
+        return l
+
+    def add_profiler_overlay(self, bounds=111, **kwargs):
+        '''
+        Adds a plot showing the timings recorded by the profiler over the last
+        n frames, which must be enabled separately with
+        glotlib.enable_profiler().  The bounds are the same as for add_plot()
+        and the remaining keyword arguments are passed to profiler.Overlay.
+        '''
+        p = profiler.Overlay(self, bounds=_bounds(bounds), **kwargs)
+        self.plots.append(p)
+        return p
+
+    def clear(self):
+        '''
+        Removes all the plots and labels from the window, deleting their GL
+        objects, so that the window can be reused for something else.
+        '''
+        with self._staging_lock:
+            self._staged = {}
+        for p in self.plots:
+            p._destroy()
+        for l in self.labels:
+            l._destroy()
+        self.plots  = []
+        self.labels = []
+        self.mark_dirty()
+
+    def find_plot(self, x, y):
+        for p in self.plots:
+            if p.visible and p.x <= x < p.x + p.w and p.y <= y < p.y + p.h:
+                return p
+        return None
+
+
+class Window(BaseWindow):
+    '''
+    A window on the screen.  If max_fps is specified, the window is drawn at
+    most that many times per second, however often it is marked dirty.
+    '''
     def __init__(self, w, h, x=100, y=100, name='', msaa=None,
-                 clear_color=(1, 1, 1)):
+                 clear_color=(1, 1, 1), max_fps=None):
         glotlib.main.add_window(self)
 
         glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
@@ -134,39 +399,18 @@ class Window:
         glfw.set_window_iconify_callback(self.window,
                                          self._handle_window_iconified)
         glfw.make_context_current(self.window)
+        gl_state.reset()
 
-        self.w_w, self.w_h   = glfw.get_window_size(self.window)
-        self.fb_w, self.fb_h = glfw.get_framebuffer_size(self.window)
-        self.r_w = self.r_h  = 0
-        self.mvp = matrix.ortho(0, self.w_w, 0, self.w_h, -1, 1)
-        self._update_ratios()
-
-        glotlib.init_fonts()
-
-        GL.glClearColor(*clear_color, 0)
-        GL.glClear(GL.GL_COLOR_BUFFER_BIT)
-        if msaa is not None:
-            GL.glEnable(GL.GL_MULTISAMPLE)
-            self.msaa_samples = GL.glGetIntegerv(GL.GL_SAMPLES)
-        else:
-            self.msaa_samples = None
+        w_w, w_h   = glfw.get_window_size(self.window)
+        fb_w, fb_h = glfw.get_framebuffer_size(self.window)
+        super().__init__(w_w, w_h, fb_w, fb_h, msaa=msaa,
+                         clear_color=clear_color, max_fps=max_fps)
 
         self.mouse_button_state = [None] * (glfw.MOUSE_BUTTON_LAST + 1)
 
-        self.plots      = []
-        self.labels     = []
-        self._dirty     = True
-        self._iconified = False
-
     def _destroy(self):
         glfw.destroy_window(self.window)
 
-    def _update_ratios(self):
-        # print('Screen dimensions %u x %u.  Framebuffer dimensions %u x %u.' %
-        #       (self.w_w, self.w_h, self.fb_w, self.fb_h))
-        self.r_w = self.fb_w / self.w_w if self.w_w else 0
-        self.r_h = self.fb_h / self.w_h if self.w_h else 0
-
     def _handle_window_size_changed(self, _window, w, h):
         if self._iconified:
             return
@@ -255,29 +499,6 @@ class Window:
         else:
             self.handle_key_press(key)
 
-    def _draw(self, t):
-        if not self.update_geometry(t) and not self._dirty:
-            return False
-        if self._iconified:
-            return False
-        self._dirty = False
-
-        GL.glClear(GL.GL_COLOR_BUFFER_BIT)
-        for p in self.plots:
-            if p.visible:
-                p.draw(t)
-
-        GL.glViewport(0, 0, self.fb_w, self.fb_h)
-        for l in self.labels:
-            if l.visible:
-                l.draw(self.mvp)
-
-        self.draw(t)
-
-        self.swap_buffers()
-
-        return True
-
     def resize(self, w, h):
         glfw.set_window_size(self.window, w, h)
 
@@ -286,69 +507,8 @@ class Window:
             self._dirty = True
             glotlib.wakeup()
 
-    def update_geometry(self, _t):
-        return False
-
-    def draw(self, t):
-        pass
-
-    def add_plot(self, bounds=111, **kwargs):
-        '''
-        Adds a rectangular plot to the window.  The bounds value selects the
-        position of the plot and can have one of the following formats:
-
-            HWP - a set of 3 integers encoded either as a 3-digit decimal
-                  number with H, W, P in the hundreds, tens and ones positions,
-                  respectively, or as a 3-tuple (H, W, P).  H and W divide the
-                  window space into a grid of height H and width W and P
-                  selects the grid cell numbered from 1 to H*W left-to-right
-                  and then top-to-bottom.
-
-            HWR - a 3-tuple (H, W, (r0, r1)) where the H and W values are the
-                  same as HWP format but the plot rectangle will have the
-                  bounds of the smallest rectangle that fully encloses both the
-                  grid cells at positions r0 and r1.
-
-            (x0, y0, x1, y1) - a 4-tuple specifying the bottom-left and top-
-                  right positions of the bounding rectangle, expressed as a
-                  fraction from 0 to 1 which scaled with the dimensions of the
-                  enclosing window.
-
-        The limits 4-tuple can be used to specify the (x0, y0, x1, y1) data
-        limits that the plot will initially be looking at.
-
-        The colors parameter can specify a list of (R, G, B, A) colors to cycle
-        through for each new curve added to the plot, as floating-point values
-        from 0 to 1.
-
-        The max_h_ticks and max_v_ticks parameters can be used to specify the
-        maximum number of ticks to display on the plot, which can be useful to
-        limit spam on smaller plots.
-
-        The aspect parameter can be either Plot.ASPECT_NONE or
-        Plot.ASPECT_SQUARE, the latter which enforces the plot's data view
-        edges so that squares in the data space are rendered as squares in the
-        screen space.
-        '''
-        p = glotlib.plot.Plot(self, bounds=_bounds(bounds), **kwargs)
-        self.plots.append(p)
-        return p
-
-    def set_plot_bounds(self, plot, bounds, **kwargs):
-        plot.bounds = _bounds(bounds, **kwargs)
-        plot._handle_resize()
-
-    def add_label(self, *args, font=None, **kwargs):
-        font = font or fonts.vera(12, 0)
-        l    = label.FlexLabel(self, *args, font=font, **kwargs)
-        self.labels.append(l)
-        return l
-
-    def find_plot(self, x, y):
-        for p in self.plots:
-            if p.visible and p.x <= x < p.x + p.w and p.y <= y < p.y + p.h:
-                return p
-        return None
+    def _wakeup(self):
+        glotlib.wakeup()
 
     def close(self):
         glfw.set_window_should_close(self.window, glfw.TRUE)
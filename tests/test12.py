@@ -0,0 +1,45 @@
+import math
+
+import numpy as np
+
+import glotlib
+
+
+CAPACITY = 20000
+RATE     = 2000
+DY       = 30000
+
+
+class Window(glotlib.Window):
+    def __init__(self):
+        super().__init__(900, 700, msaa=4)
+
+        self.plot   = self.add_plot(limits=(0, DY - 1, 10, DY + 1))
+        self.series = self.plot.add_rolling_lines(CAPACITY, X=[], Y=[],
+                                                  width=1)
+        self.index  = 0
+        self.label  = self.add_label((0, 1), '', anchor='NW')
+
+    def update_geometry(self, t):
+        N = int(t * RATE) - self.index
+        if N <= 0:
+            return False
+
+        X = (self.index + np.arange(N)) / RATE
+        Y = np.sin(2 * math.pi * X) + 0.1 * np.random.normal(size=N) + DY
+        self.series.append_x_y_data(X, Y)
+        self.plot.snap_bounds()
+
+        self.index += N
+        self.label.set_text('Points: %u' % self.index)
+
+        return True
+
+
+def main():
+    Window()
+    glotlib.animate()
+
+
+if __name__ == '__main__':
+    main()
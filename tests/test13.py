@@ -0,0 +1,88 @@
+import math
+import time
+
+import glfw
+import numpy as np
+
+import glotlib
+
+
+NVERTICES = 500000
+NSERIES   = 3
+X         = np.arange(NVERTICES) * 2 * math.pi / (NVERTICES - 1)
+DY        = 30000
+FRAMES    = 200
+MODES     = [False, True]
+
+
+class Window(glotlib.Window):
+    '''
+    Benchmarks full-array updates every frame, alternating between the default
+    upload path and the streaming one every FRAMES frames and reporting the
+    mean frame time of each.  Vsync is disabled so that the frame time isn't
+    capped by the display.
+    '''
+    def __init__(self):
+        super().__init__(900, 700, msaa=4)
+        glfw.swap_interval(0)
+
+        self.plot   = self.add_plot(limits=(0, DY - 1, 2 * math.pi, DY + 1))
+        self.series = {
+            streaming : [self.plot.add_lines(X=X, Y=np.sin(X) + DY, width=1,
+                                             streaming=streaming)
+                         for _ in range(NSERIES)]
+            for streaming in MODES
+        }
+        self.label  = self.add_label((0, 1), '', anchor='NW')
+        self.means  = {streaming : None for streaming in MODES}
+        self.mode   = 0
+        self.frame  = 0
+        self.t0     = None
+        self._show_mode()
+
+    def _show_mode(self):
+        for streaming, series in self.series.items():
+            for s in series:
+                if streaming == MODES[self.mode]:
+                    s.show()
+                else:
+                    s.hide()
+
+    def _update_label(self):
+        text = []
+        for streaming, mean in self.means.items():
+            name = 'Streaming' if streaming else 'Default'
+            if mean is None:
+                text.append('%s: ---' % name)
+            else:
+                text.append('%s: %.2f ms' % (name, mean * 1000))
+        self.label.set_text('  '.join(text))
+
+    def update_geometry(self, t):
+        now = time.time()
+        if self.frame == 0:
+            self.t0 = now
+        elif self.frame == FRAMES:
+            streaming             = MODES[self.mode]
+            self.means[streaming] = (now - self.t0) / FRAMES
+            self._update_label()
+
+            self.mode  = (self.mode + 1) % len(MODES)
+            self.frame = 0
+            self.t0    = now
+            self._show_mode()
+        self.frame += 1
+
+        for i, s in enumerate(self.series[MODES[self.mode]]):
+            s.set_y_data(np.sin(X + (i + 1) * t) + DY)
+
+        return True
+
+
+def main():
+    Window()
+    glotlib.animate()
+
+
+if __name__ == '__main__':
+    main()
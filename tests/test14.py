@@ -0,0 +1,37 @@
+import math
+
+import numpy as np
+
+import glotlib
+
+
+NTRACES   = 60
+NVERTICES = 1000
+X         = np.arange(NVERTICES) * 2 * math.pi / (NVERTICES - 1)
+
+
+class Window(glotlib.Window):
+    def __init__(self):
+        super().__init__(900, 700, msaa=4)
+
+        self.plot   = self.add_plot(limits=(0, -1, 2 * math.pi, NTRACES))
+        self.series = [self.plot.add_batched_lines(X=X, Y=np.sin(X) + i,
+                                                   width=1 + (i % 3))
+                       for i in range(NTRACES)]
+        self.label  = self.add_label((0, 1), '', anchor='NW')
+
+    def update_geometry(self, t):
+        for i, s in enumerate(self.series):
+            s.set_y_data(np.sin(X + (1 + i / NTRACES) * t) + i)
+        self.label.set_text('FPS: %.1f' % glotlib.get_fps())
+
+        return True
+
+
+def main():
+    Window()
+    glotlib.animate()
+
+
+if __name__ == '__main__':
+    main()
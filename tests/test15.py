@@ -0,0 +1,39 @@
+import glotlib
+from glotlib import fonts
+
+
+SIZES = [8, 10, 12, 16, 24, 36, 48, 72]
+
+
+class Window(glotlib.Window):
+    '''
+    Draws text at a range of sizes from a single signed distance field atlas,
+    along with a rotating label and the same text from a regular atlas for
+    comparison.
+    '''
+    def __init__(self):
+        super().__init__(900, 700, msaa=4)
+
+        y = 0.02
+        for size in SIZES:
+            self.add_label((0.02, y), '%u: Woven silk pyjamas 0.123e-4' % size,
+                           font=fonts.vera.sdf(size))
+            y += (size + 6) / 700
+        self.add_label((0.02, y), '12: Woven silk pyjamas 0.123e-4',
+                       font=fonts.vera(12, 0))
+
+        self.label = self.add_label((0.75, 0.75), 'exchanged for blue quartz.',
+                                    font=fonts.vera.sdf(20), anchor='C')
+
+    def update_geometry(self, t):
+        self.label.set_theta(t / 4)
+        return True
+
+
+def main():
+    Window()
+    glotlib.animate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+
+# OffscreenWindow renders through EGL, so PyOpenGL must be told before it is
+# first imported.
+os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+
+# pylint: disable=wrong-import-position
+from glotlib.offscreen import OffscreenWindow  # noqa: E402
+
+
+NPLOTS    = 20
+NVERTICES = 10000
+
+
+def main(rv):
+    '''
+    Renders a series of plots without a display and saves each one to a PNG
+    file, reporting the time taken per image.
+    '''
+    w = OffscreenWindow(rv.width, rv.height, msaa=4)
+    p = w.add_plot(limits=(0, -1.1, 2 * math.pi, 1.1))
+    X = np.linspace(0, 2 * math.pi, NVERTICES)
+    s = p.add_lines(X=X, Y=np.sin(X), width=1)
+    l = w.add_label((0.5, 0.97), '', anchor='C')
+
+    t0 = time.time()
+    for i in range(NPLOTS):
+        s.set_y_data(np.sin(X * (i + 1)) * np.exp(-X / (i + 1)))
+        l.set_text('Plot %u' % i)
+        w.save_png(rv.prefix + '%02u.png' % i)
+    dt = time.time() - t0
+
+    print('%.2f ms per image' % (dt * 1000 / NPLOTS))
+
+
+def _main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--prefix', default='offscreen_')
+    main(parser.parse_args())
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,62 @@
+import argparse
+import math
+import time
+
+import numpy as np
+
+import glotlib.batch
+
+
+NVERTICES = 10000
+
+
+def gen_specs(rv):
+    '''
+    Generates the specification of each plot to render.
+    '''
+    X = np.linspace(0, 2 * math.pi, NVERTICES)
+    for i in range(rv.nplots):
+        Y = np.sin(X * (i + 1)) * np.exp(-X / (i + 1))
+        yield {
+            'size'   : (rv.width, rv.height),
+            'path'   : rv.prefix + '%03u.png' % i,
+            'plots'  : [{
+                'limits'  : (0, -1.1, 2 * math.pi, 1.1),
+                'x_label' : 'X',
+                'y_label' : 'Y',
+                'series'  : [
+                    {'kind' : 'lines', 'X' : X, 'Y' : Y, 'width' : 1},
+                    {'kind' : 'hline', 'y' : 0},
+                ],
+            }],
+            'labels' : [{'pos' : (0.5, 0.97), 'text' : 'Plot %u' % i,
+                         'anchor' : 'C'}],
+        }
+
+
+def main(rv):
+    '''
+    Renders a batch of plots across a pool of worker processes without a
+    display, saving each one to a PNG file as it completes.
+    '''
+    t0 = time.time()
+    for _, path in glotlib.batch.render(gen_specs(rv), processes=rv.processes,
+                                        ordered=False):
+        print(path)
+    dt = time.time() - t0
+
+    print('%.2f ms per image' % (dt * 1000 / rv.nplots))
+
+
+def _main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--nplots', type=int, default=100)
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--prefix', default='batch_')
+    main(parser.parse_args())
+
+
+if __name__ == '__main__':
+    _main()
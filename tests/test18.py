@@ -0,0 +1,48 @@
+import math
+
+import numpy as np
+
+import glotlib
+
+
+NVERTICES = 1000000
+
+
+class Window(glotlib.Window):
+    '''
+    Animates a large series above an overlay plotting the profiler's per-frame
+    timings, and prints a summary of them every 2 seconds.
+    '''
+    def __init__(self):
+        super().__init__(900, 700, msaa=4)
+
+        self.plot    = self.add_plot((3, 1, (1, 2)),
+                                     limits=(0, -1.1, 2 * math.pi, 1.1))
+        self.X       = np.linspace(0, 2 * math.pi, NVERTICES)
+        self.series  = self.plot.add_lines(X=self.X, Y=np.sin(self.X),
+                                           streaming=True)
+        self.overlay = self.add_profiler_overlay((3, 1, 3), n=200)
+        self.label   = self.add_label((0, 1), '', anchor='NW')
+        self.t_print = 2
+
+    def update_geometry(self, t):
+        self.series.set_y_data(np.sin(self.X * (2 + np.sin(t))))
+
+        if t >= self.t_print:
+            self.t_print = t + 2
+            summary = glotlib.get_profile_summary(100)
+            print(', '.join('%s %.2f' % (k, v[0] * 1000)
+                            for k, v in summary.items()))
+
+        self.label.set_text('FPS: %.1f' % glotlib.get_fps())
+        return True
+
+
+def main():
+    glotlib.enable_profiler()
+    Window()
+    glotlib.animate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+import glotlib
+
+
+RATE  = 100000
+CHUNK = 100
+
+
+def acquire(series, t0):
+    '''
+    Simulates an acquisition thread producing RATE samples per second in
+    chunks of CHUNK samples and pushing them straight into the series.
+    '''
+    n = 0
+    while True:
+        X  = (n + np.arange(CHUNK)) / RATE
+        Y  = np.sin(2 * math.pi * 5 * X) + np.random.normal(0, 0.05, CHUNK)
+        n += CHUNK
+        series.push_x_y_data(X, Y)
+        time.sleep(max(t0 + n / RATE - time.time(), 0))
+
+
+def main():
+    w = glotlib.Window(900, 650, msaa=4)
+    p = w.add_plot(limits=(0, -1.5, 10, 1.5))
+    s = p.add_lines(X=[], Y=[])
+    threading.Thread(target=acquire, args=(s, time.time()),
+                     daemon=True).start()
+    glotlib.interact()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import asyncio
+import math
+
+import numpy as np
+
+import glotlib
+
+
+RATE  = 1000
+CHUNK = 20
+
+
+async def acquire(series):
+    '''
+    Simulates an asyncio data client receiving RATE samples per second in
+    chunks of CHUNK samples, appending them straight to the series since it
+    runs on the render thread.
+    '''
+    n = 0
+    while True:
+        await asyncio.sleep(CHUNK / RATE)
+        X  = (n + np.arange(CHUNK)) / RATE
+        Y  = np.sin(2 * math.pi * X) + np.random.normal(0, 0.05, CHUNK)
+        n += CHUNK
+        series.append_x_y_data(X, Y)
+        series.plot.window.mark_dirty()
+
+
+async def amain():
+    w = glotlib.Window(900, 650, msaa=4)
+    p = w.add_plot(limits=(0, -1.5, 10, 1.5))
+    s = p.add_lines(X=[], Y=[])
+    task = asyncio.create_task(acquire(s))
+    await glotlib.run()
+    task.cancel()
+
+
+def main():
+    asyncio.run(amain())
+
+
+if __name__ == '__main__':
+    main()
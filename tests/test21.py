@@ -0,0 +1,52 @@
+import math
+
+import numpy as np
+
+import glotlib
+
+
+RATE    = 200
+MAX_FPS = 30
+
+
+class Window(glotlib.Window):
+    '''
+    Receives data points from a periodic callback at RATE Hz but redraws at
+    most MAX_FPS times per second, and otherwise sleeps; the CPU usage should
+    be close to zero.  A clock label ticks once per second using
+    request_frame().
+    '''
+    def __init__(self):
+        super().__init__(900, 650, msaa=4, max_fps=MAX_FPS)
+
+        self.plot   = self.add_plot(limits=(0, -1.5, 10, 1.5))
+        self.series = self.plot.add_lines(X=[], Y=[])
+        self.label  = self.add_label((0.01, 0.01), '')
+        self.second = -1
+        self.last_x = 0
+
+        glotlib.periodic(1 / RATE, self.update_periodic)
+
+    def update_geometry(self, t):
+        if int(t) != self.second:
+            self.second = int(t)
+            self.label.set_text('Time: %u  FPS: %.1f' %
+                                (self.second, glotlib.get_fps()))
+            self.request_frame(self.second + 1 - t)
+            return True
+        return False
+
+    def update_periodic(self, t):
+        x = t % 10
+        y = math.sin(t) + np.random.normal(0, 0.05)
+        self.series.push_x_y_data([x], [y], replace=x < self.last_x)
+        self.last_x = x
+
+
+def main():
+    Window()
+    glotlib.animate(poll_idle=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import math
+
+import numpy as np
+
+import glotlib
+
+
+N = 1000000
+
+
+class Window(glotlib.Window):
+    '''
+    A 3x3 grid of plots holding a million points each, of which only the
+    center plot is animated.  The other eight plots are drawn from their
+    caches, so the frame rate is set by the center plot alone; dragging or
+    zooming one of the static plots redraws only that plot.  Compare with
+    the frame rate shown when running with --uncached.
+    '''
+    def __init__(self, cached=True):
+        super().__init__(1200, 900, msaa=4)
+
+        X = np.linspace(0, 2 * math.pi, N)
+        for i in range(9):
+            p = self.add_plot((3, 3, i + 1), limits=(0, -1.5, 2 * math.pi, 1.5),
+                              cached=cached, max_h_ticks=5, max_v_ticks=5)
+            s = p.add_lines(X=X, Y=np.sin(X * (i + 1)))
+            if i == 4:
+                self.live = s
+
+        self.X     = X
+        self.label = self.add_label((0.01, 0.01), '')
+
+    def update_geometry(self, t):
+        self.live.set_y_data(np.sin(self.X * 5 + t))
+        self.label.set_text('FPS: %.1f' % glotlib.get_fps())
+        return True
+
+
+def main(rv):
+    Window(cached=not rv.uncached)
+    glotlib.animate()
+
+
+def _main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--uncached', action='store_true')
+    main(parser.parse_args())
+
+
+if __name__ == '__main__':
+    _main()
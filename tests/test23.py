@@ -0,0 +1,51 @@
+import math
+
+import numpy as np
+
+import glotlib
+
+
+N = 5000000
+
+
+class Window(glotlib.Window):
+    '''
+    Shows the same 5M points in an overview plot and in a zoomed detail plot
+    with wider lines and points, all drawn from a single DataBuffer so that
+    the data is held and uploaded only once.  For the first ten seconds, new
+    points are appended to the buffer every second, updating both plots.
+    '''
+    def __init__(self):
+        super().__init__(1000, 800, msaa=4)
+
+        X = np.linspace(0, 100, N)
+        Y = np.sin(X) + np.sin(X * 37) * 0.1
+        self.data = glotlib.DataBuffer(X=X, Y=Y)
+
+        self.overview = self.add_plot(211, limits=(0, -1.5, 110, 1.5))
+        self.overview.add_lines(data=self.data)
+        self.detail = self.add_plot(212, limits=(49, -1.5, 51, 1.5))
+        self.detail.add_lines(data=self.data, width=2)
+        self.detail.add_points(data=self.data, width=3)
+
+        self.second = 0
+
+    def update_geometry(self, t):
+        if int(t) == self.second or self.second >= 10:
+            return False
+
+        self.second = int(t)
+        x0          = self.data.vertices[-1, 0]
+        X           = x0 + np.linspace(0, 1, N // 100 + 1)[1:]
+        Y           = np.sin(X) + np.sin(X * 37) * 0.1 + math.sin(t)
+        self.data.append_x_y_data(X, Y)
+        return True
+
+
+def main():
+    Window()
+    glotlib.animate()
+
+
+if __name__ == '__main__':
+    main()
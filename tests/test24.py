@@ -0,0 +1,42 @@
+import os
+
+# OffscreenWindow renders through EGL, so PyOpenGL must be told before it is
+# first imported.
+os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+
+# pylint: disable=wrong-import-position
+from glotlib.offscreen import OffscreenWindow  # noqa: E402
+
+
+class Window(OffscreenWindow):
+    '''
+    Pushes data into a series from update_geometry(), which runs after the
+    frame has already swapped out the staged data, just as a producer thread
+    pushing while a frame is being drawn would.  The pushed data must still
+    be drawn by the next frame.
+    '''
+    def __init__(self):
+        super().__init__(200, 150)
+
+        p           = self.add_plot(limits=(0, 0, 6, 6))
+        self.series = p.add_lines(X=[0, 1, 2], Y=[0, 1, 2])
+
+    def update_geometry(self, t):
+        if t == 0:
+            self.series.push_x_y_data([3, 4, 5], [3, 4, 5])
+        return False
+
+
+def main():
+    w = Window()
+    if not w._draw(0):
+        raise Exception('First frame was not drawn.')
+    if not w._draw(1):
+        raise Exception('Frame with pushed data was not drawn.')
+    if len(w.series.vertices) != 6:
+        raise Exception('Pushed data was not applied.')
+    print('Pushed data drawn.')
+
+
+if __name__ == '__main__':
+    main()
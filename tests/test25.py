@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+
+# OffscreenWindow renders through EGL, so PyOpenGL must be told before it is
+# first imported.
+os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+
+# pylint: disable=wrong-import-position
+from glotlib.offscreen import OffscreenWindow  # noqa: E402
+
+
+FRAMES = 3
+
+# With MSAA, resolves landing exactly halfway between two levels round
+# differently for cached and direct drawing, as do the rare samples lying
+# exactly on the edge shared by two line segments.
+MSAA_TOLERANCE = 1
+MSAA_OUTLIERS  = 10
+
+
+def build(cached, msaa):
+    '''
+    Builds a 2x2 grid of plots whose antialiased borders, tick labels and
+    axis labels overlap their neighbours, with a series drawn in the
+    background color and points straddling the edges of the data area.
+    '''
+    w = OffscreenWindow(400, 300, msaa=msaa)
+    X = np.linspace(0, 10, 200)
+    for i in range(4):
+        p = w.add_plot((2, 2, i + 1), limits=(0, -1, 10, 1), cached=cached)
+        p.add_lines(X=X, Y=np.sin(X + i), width=2)
+        p.add_lines(X=X, Y=np.cos(X), color=(1, 1, 1, 1), width=3)
+        p.add_points(X=[0, 10, 5], Y=[1, -1, 0], width=8)
+        p.set_x_label('X label %u' % i)
+        p.set_y_label('Y label %u' % i)
+    return w
+
+
+def compare(msaa):
+    '''
+    Renders the grid with and without the plot caches for several frames and
+    raises an Exception if the images differ.  The first frame draws into the
+    caches and the later ones are composited from them.
+    '''
+    cached = build(True, msaa)
+    direct = build(False, msaa)
+    for t in range(FRAMES):
+        A = cached.read_pixels(t).astype(int)
+        B = direct.read_pixels(t).astype(int)
+        d = np.abs(A - B).max(axis=2)
+        if msaa is None:
+            outliers = np.count_nonzero(d)
+        else:
+            outliers = np.count_nonzero(d > MSAA_TOLERANCE)
+        print('msaa=%s frame %u: %u pixels differ, max difference %u' %
+              (msaa, t, np.count_nonzero(d), d.max()))
+        if outliers > (0 if msaa is None else MSAA_OUTLIERS):
+            raise Exception('Cached and direct drawing differ.')
+
+
+def main():
+    compare(None)
+    compare(4)
+    print('Cached and direct drawing match.')
+
+
+if __name__ == '__main__':
+    main()